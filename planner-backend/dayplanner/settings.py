@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,6 +55,10 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Inactive unless REQUEST_PROFILING_DIR is set
+    "tasks.profiling.RequestProfilingMiddleware",
+    # Last, so it times the view alone; inactive unless REQUEST_INSTRUMENTATION is on
+    "tasks.instrumentation.RequestInstrumentationMiddleware",
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -93,10 +98,89 @@ WSGI_APPLICATION = "dayplanner.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.environ.get("DAYPLANNER_DB_PATH", BASE_DIR / "db.sqlite3"),
     }
 }
 
+# Pragmas run on every new SQLite connection (see tasks.signals.apply_sqlite_pragmas)
+SQLITE_PRAGMAS = {}
+
+# DAYPLANNER_DB_PROFILE=production tunes SQLite for concurrent readers and writers:
+# WAL lets reads proceed during a write, IMMEDIATE transactions take the write lock
+# up front (so busy_timeout can wait for it instead of failing with "database is
+# locked"), and connections are reused across requests.
+if os.environ.get("DAYPLANNER_DB_PROFILE") == "production":
+    DATABASES["default"].update({
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+    })
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 20000,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Rendered task list responses, see tasks/list_cache.py
+    "task_lists": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "task-lists",
+        "TIMEOUT": 60,
+        "OPTIONS": {
+            "MAX_ENTRIES": 1000,
+        },
+    },
+    # Rendered VEVENTs of the .ics feeds keyed by task id and updated_at, see tasks/ical.py
+    "ical_events": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ical-events",
+        "TIMEOUT": 24 * 60 * 60,
+        "OPTIONS": {
+            "MAX_ENTRIES": 50000,
+        },
+    },
+}
+
+TASK_LIST_CACHE_ALIAS = "task_lists"
+ICAL_CACHE_ALIAS = "ical_events"
+
+# Seconds a process serves project names and colors from memory before rereading
+# them; saves in the same process take effect at once (see tasks/project_cache.py)
+PROJECT_CACHE_TIMEOUT = float(os.environ.get("DAYPLANNER_PROJECT_CACHE_TIMEOUT", "60"))
+
+# Serve the task list/detail/stats API with the async views in tasks.async_api;
+# asgi.py turns this on, WSGI deployments keep the sync views
+ASYNC_API_VIEWS = os.environ.get("DAYPLANNER_ASYNC_VIEWS", "").lower() in ("1", "true", "yes")
+
+# Per-request query counts and timings as Server-Timing headers and logs, plus the
+# slow-query log and N+1 warnings (see tasks/instrumentation.py)
+REQUEST_INSTRUMENTATION = os.environ.get("DAYPLANNER_INSTRUMENTATION", "").lower() in ("1", "true", "yes")
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("DAYPLANNER_SLOW_QUERY_MS", "100"))
+# Identical SQL shapes per request before the request is flagged as a likely N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+# Staff requests with an X-Profile header or ?profile=1 are profiled into this
+# directory (see tasks/profiling.py); unset turns profiling off entirely
+REQUEST_PROFILING_DIR = os.environ.get("DAYPLANNER_PROFILE_DIR") or None
+REQUEST_PROFILING_TOP = 40
+
+# Default day used by the scheduling endpoints for free slots and proposals
+PLANNER_WORKING_HOURS = ("09:00", "17:00")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
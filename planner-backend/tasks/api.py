@@ -1,14 +1,41 @@
+import base64
+import datetime
+import hashlib
 import logging
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
 from django.contrib.auth.models import User
-from django.http import JsonResponse
-from .models import Task
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from . import change_feed, ical, list_cache, project_cache, recurrence, scheduling, search, transfer
+from .instrumentation import timed
+from .signals import DATE_INDEX, record_bulk_changes, update_counted_rule_end
+from .models import (
+    DEFAULT_COLOR, IMPORTANCE_COLORS, Project, Task, TaskComment, TaskOccurrenceException, TaskQuerySet,
+    TaskRecurrence, TaskStatCounter, TaskTombstone, Team, TeamMembership, format_duration,
+)
 from django.shortcuts import get_object_or_404
 import json
 
 logger = logging.getLogger(__name__)
 
+# Keyset pagination settings for the task list
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_CHUNK_SIZE = 2000
+
+# Stable sort key for the task list; ``id`` breaks ties between equal keys
+TASK_LIST_ORDERING = ('-priority_rank', '-created_at', '-id')
+
+TRUTHY_VALUES = ['true', '1', 'yes']
+
 def serialize_task(task):
     """Helper function to serialize task data consistently"""
     project_info = task.project_info
@@ -27,52 +54,466 @@ def serialize_task(task):
         'importance': task.importance,
         'importance_display': task.get_importance_display(),
         'importance_color': task.importance_color,
-        'project': task.project,
+        'project': project_cache.slug(task.project_id),
         'project_info': project_info,
         'formatted_start_time': task.formatted_start_time,
         'formatted_end_time': task.formatted_end_time,
         'formatted_duration': task.formatted_duration,
         'is_overdue': task.is_overdue,
+        'is_recurring': task.is_recurring,
         'created_at': task.created_at.isoformat(),
         'updated_at': task.updated_at.isoformat(),
     }
 
+# Columns read by serialize_task_rows; ``overdue_flag`` comes from TaskQuerySet.with_overdue()
+TASK_ROW_FIELDS = (
+    'id', 'title', 'description', 'completed', 'scheduled_date', 'has_specific_time',
+    'scheduled_start_time', 'scheduled_end_time', 'duration_hours', 'duration_minutes',
+    'importance', 'project', 'created_at', 'updated_at', 'overdue_flag', 'is_recurring',
+)
+ROW_INDEX = {name: index for index, name in enumerate(TASK_ROW_FIELDS)}
+
+IMPORTANCE_DISPLAY = dict(Task.IMPORTANCE_CHOICES)
+
+# Every minute of the day pre-formatted, indexed by hour * 60 + minute
+CLOCK_24H = [datetime.time(hour, minute).strftime('%H:%M') for hour in range(24) for minute in range(60)]
+CLOCK_12H = [datetime.time(hour, minute).strftime('%I:%M %p') for hour in range(24) for minute in range(60)]
+
+def serialize_task_rows(rows, comment_count=False):
+    """Fast path of ``serialize_task`` for ``values_list(*TASK_ROW_FIELDS)`` tuples
+
+    Produces exactly the same dicts without instantiating ``Task``; per-value
+    lookups (importance, project metadata, durations) are computed once. With
+    ``comment_count`` the rows carry a ``comment_count`` column next (see
+    ``list_row_fields``). Rows of recurring task occurrences end with their
+    original date, which is added as ``occurrence_date``.
+    """
+    projects = {}
+    durations = {}
+    dates = {}
+
+    for (task_id, title, description, completed, scheduled_date, has_specific_time,
+         start_time, end_time, duration_hours, duration_minutes,
+         importance, project_id, created_at, updated_at, overdue_flag, is_recurring, *extra) in rows:
+
+        start_24h = end_24h = start_12h = end_12h = formatted_duration = None
+        if start_time:
+            minute_of_day = start_time.hour * 60 + start_time.minute
+            start_24h = CLOCK_24H[minute_of_day]
+            if has_specific_time:
+                start_12h = CLOCK_12H[minute_of_day]
+        if end_time:
+            minute_of_day = end_time.hour * 60 + end_time.minute
+            end_24h = CLOCK_24H[minute_of_day]
+            if has_specific_time:
+                end_12h = CLOCK_12H[minute_of_day]
+        if not has_specific_time:
+            duration_key = (duration_hours, duration_minutes)
+            formatted_duration = durations.get(duration_key)
+            if formatted_duration is None:
+                formatted_duration = durations[duration_key] = format_duration(duration_hours, duration_minutes)
+
+        if scheduled_date is None:
+            date_str = None
+        elif scheduled_date in dates:
+            date_str = dates[scheduled_date]
+        else:
+            date_str = dates[scheduled_date] = scheduled_date.strftime('%Y-%m-%d')
+
+        if project_id in projects:
+            project, project_info = projects[project_id]
+        else:
+            project, project_info = projects[project_id] = (project_cache.slug(project_id), project_cache.info(project_id))
+
+        data = {
+            'id': task_id,
+            'title': title,
+            'description': description,
+            'completed': completed,
+            'scheduled_date': date_str,
+            'has_specific_time': has_specific_time,
+            'scheduled_start_time': start_24h,
+            'scheduled_end_time': end_24h,
+            'duration_hours': duration_hours,
+            'duration_minutes': duration_minutes,
+            'importance': importance,
+            'importance_display': IMPORTANCE_DISPLAY.get(importance, importance),
+            'importance_color': IMPORTANCE_COLORS.get(importance, DEFAULT_COLOR),
+            'project': project,
+            'project_info': project_info,
+            'formatted_start_time': start_12h,
+            'formatted_end_time': end_12h,
+            'formatted_duration': formatted_duration,
+            'is_overdue': bool(overdue_flag),
+            'is_recurring': is_recurring,
+            'created_at': created_at.isoformat(),
+            'updated_at': updated_at.isoformat(),
+        }
+        if comment_count:
+            data['comment_count'], *extra = extra
+        if extra:
+            data['occurrence_date'] = extra[0].isoformat()
+        yield data
+
+def filter_tasks(tasks, params, now=None, occurrences=None):
+    """Apply the task list query-string filters to a queryset
+
+    The ``date`` filter matches one-off tasks by date and recurring templates by
+    id from ``occurrences`` (see ``list_occurrences``), whose occurrences already
+    passed the ``completed`` and ``overdue`` filters.
+    """
+    project_filter = params.get('project')
+    importance_filter = params.get('importance')
+    completed_filter = params.get('completed')
+    date_filter = params.get('date')
+    overdue_filter = params.get('overdue')
+    search_text = params.get('q', '').strip()
+
+    if project_filter:
+        project_id = project_cache.id_for_slug(project_filter)
+        if project_id is None:
+            return tasks.none()
+        tasks = tasks.filter(project_id=project_id)
+
+    if importance_filter:
+        tasks = tasks.filter(importance=importance_filter)
+
+    # Filters a recurring task's occurrences answer for themselves
+    row_filters = Q()
+
+    if completed_filter is not None:
+        is_completed = completed_filter.lower() in TRUTHY_VALUES
+        row_filters &= Q(completed=is_completed)
+
+    if date_filter:
+        row_filters &= Q(scheduled_date=date_filter, is_recurring=False)
+
+    if overdue_filter and overdue_filter.lower() in TRUTHY_VALUES:
+        row_filters &= TaskQuerySet.overdue_condition(now)
+
+    if date_filter and occurrences:
+        row_filters |= Q(id__in=list(occurrences))
+    tasks = tasks.filter(row_filters)
+
+    if search_text:
+        tasks = search.filter_matching(tasks, search_text)
+
+    return tasks
+
+def _parse_positive_int(value, default):
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Expected a positive integer, got {value!r}')
+    if number <= 0:
+        raise ValueError(f'Expected a positive integer, got {value!r}')
+    return number
+
+def _encode_cursor_values(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def _decode_cursor_values(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+def encode_cursor(task_data):
+    """Build an opaque cursor pointing just after a serialized task in list order"""
+    rank = Task.IMPORTANCE_RANKS.get(task_data['importance'], Task.IMPORTANCE_RANKS['medium'])
+    return _encode_cursor_values([rank, task_data['created_at'], task_data['id']])
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by ``encode_cursor``"""
+    try:
+        rank, created_at, task_id = _decode_cursor_values(cursor)
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError
+        return int(rank), created_at, int(task_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def after_cursor(cursor_values):
+    """Keyset condition selecting rows that sort after the cursor"""
+    rank, created_at, task_id = cursor_values
+    return (
+        Q(priority_rank__lt=rank)
+        | Q(priority_rank=rank, created_at__lt=created_at)
+        | Q(priority_rank=rank, created_at=created_at, id__lt=task_id)
+    )
+
+def stream_tasks_json(task_data):
+    """Yield the ``{"tasks": [...]}`` payload piece by piece"""
+    yield '{"tasks": ['
+    for index, data in enumerate(task_data):
+        prefix = ', ' if index else ''
+        yield prefix + json.dumps(data, cls=DjangoJSONEncoder)
+    yield ']}'
+
+def wants_comment_count(params):
+    return params.get('comment_count', '').lower() in TRUTHY_VALUES
+
+def list_row_fields(params):
+    """Columns of the list's rows: ``TASK_ROW_FIELDS``, plus ``comment_count`` if asked for"""
+    return TASK_ROW_FIELDS + ('comment_count',) if wants_comment_count(params) else TASK_ROW_FIELDS
+
+# Filters evaluated per occurrence of a recurring task rather than on its template
+OCCURRENCE_PARAMS = ('date', 'completed', 'overdue')
+
+def template_params(params):
+    """``params`` without the filters an occurrence answers itself"""
+    params = params.copy()
+    for name in OCCURRENCE_PARAMS:
+        params.pop(name, None)
+    return params
+
+def occurrence_filter(params):
+    """Predicate applying the ``date``, ``completed`` and ``overdue`` filters to occurrence rows"""
+    day = _parse_date_param(params, 'date') if params.get('date') else None
+    completed = params.get('completed')
+    if completed is not None:
+        completed = completed.lower() in TRUTHY_VALUES
+    overdue = params.get('overdue', '').lower() in TRUTHY_VALUES
+
+    def matches(row):
+        return (
+            (day is None or row[ROW_INDEX['scheduled_date']] == day)
+            and (completed is None or row[ROW_INDEX['completed']] == completed)
+            and (not overdue or row[ROW_INDEX['overdue_flag']])
+        )
+    return matches
+
+def window_occurrence_rows(params, start, end, now):
+    """Rows of recurring task occurrences between ``start`` and ``end`` that pass the list filters"""
+    templates = filter_tasks(Task.objects.all(), template_params(params), now)
+    if wants_comment_count(params):
+        templates = templates.with_comment_count()
+    matches = occurrence_filter(params)
+    fields = list_row_fields(params)
+    return [row for row in recurrence.occurrence_rows(templates, start, end, fields, now) if matches(row)]
+
+def list_occurrences(request, now):
+    """Occurrence rows on the list's ``date`` by template id, or None without a ``date`` filter
+
+    Kept on the request, which needs them for the ETag, the row query and the body.
+    """
+    if not hasattr(request, 'list_occurrences'):
+        occurrences = None
+        if request.GET.get('date'):
+            day = _parse_date_param(request.GET, 'date')
+            occurrences = {}
+            for row in window_occurrence_rows(request.GET, day, day, now):
+                occurrences.setdefault(row[0], []).append(row)
+        request.list_occurrences = occurrences
+    return request.list_occurrences
+
+def expand_occurrences(rows, occurrences):
+    """``rows`` with each recurring template replaced by its occurrences from ``list_occurrences``"""
+    if not occurrences:
+        return rows
+    recurring = ROW_INDEX['is_recurring']
+    return (
+        expanded
+        for row in rows
+        for expanded in (occurrences.get(row[0], ()) if row[recurring] else (row,))
+    )
+
+def _version_etag(*parts):
+    return hashlib.sha1(json.dumps(parts, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+def task_list_etag(request):
+    """Strong ETag for a task list query, from one aggregate over the filtered rows
+
+    Any write to a matching row bumps ``updated_at`` or the row count, and rows
+    only become overdue as time passes, so the overdue count catches payload
+    changes that no write caused.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    now = timezone.now()
+    try:
+        occurrences = list_occurrences(request, now)
+        tasks = filter_tasks(Task.objects.order_by(), request.GET, now, occurrences)
+        version = tasks.aggregate(**task_list_version(now))
+        if wants_comment_count(request.GET):
+            version.update(list_comments(tasks).aggregate(**comment_list_version()))
+    except (ValueError, ValidationError):
+        # Let the view report invalid filters
+        return None
+    return list_etag_from_version(request, version)
+
+def task_list_version(now):
+    """Aggregates over the filtered rows that make up the list ETag"""
+    return {
+        'row_count': Count('id'),
+        'latest_update': Max('updated_at'),
+        'overdue_count': Count('id', filter=TaskQuerySet.overdue_condition(now)),
+    }
+
+def list_comments(tasks):
+    return TaskComment.objects.filter(task__in=tasks.values('id')).order_by()
+
+def comment_list_version():
+    """Aggregates over the listed tasks' comments that ``comment_count`` adds to the list ETag
+
+    Adding a comment raises the highest id and deleting one lowers the count, so
+    any change to a listed count changes one of them.
+    """
+    return {'comment_total': Count('id'), 'latest_comment': Max('id')}
+
+def list_etag_from_version(request, version):
+    filters = list_cache.normalize_filters(request.GET)
+    if filters is not None:
+        params = sorted(filters.items())
+    else:
+        params = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    overdue_count = version['overdue_count']
+    # Occurrences turn overdue without a write, like rows
+    for rows in (getattr(request, 'list_occurrences', None) or {}).values():
+        overdue_count += sum(1 for row in rows if row[ROW_INDEX['overdue_flag']])
+    comments = [version[name] for name in comment_list_version() if name in version]
+    etag = _version_etag(params, version['row_count'], version['latest_update'], overdue_count, *comments)
+    # The list cache reuses this version so cached bodies always match the ETag
+    request.task_list_etag = etag
+    return etag
+
+def task_detail_etag(request, task_id):
+    """Strong ETag for a single task from its ``updated_at`` and overdue state"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    version = task_detail_version(task_id).first()
+    if version is None:
+        return None
+    return _version_etag(task_id, version[0], bool(version[1]))
+
+def task_detail_version(task_id):
+    return Task.objects.with_overdue().filter(id=task_id).values_list('updated_at', 'overdue_flag')
+
+def task_list_queryset(params, now, occurrences=None):
+    """Filtered, overdue-annotated and ordered tasks for a list request"""
+    tasks = (
+        filter_tasks(Task.objects.all(), params, now, occurrences)
+        .with_overdue(now)
+        .order_by(*TASK_LIST_ORDERING)
+    )
+    if wants_comment_count(params):
+        tasks = tasks.with_comment_count()
+    if is_search(params):
+        if params.get('cursor'):
+            raise ValueError('Search results are ranked by relevance; use limit without cursor')
+        tasks = search.order_by_relevance(tasks, *TASK_LIST_ORDERING)
+    return tasks
+
+def is_search(params):
+    return bool(params.get('q', '').strip())
+
+def wants_full_list(params):
+    return 'limit' not in params and 'cursor' not in params
+
+def task_page_rows(tasks, params):
+    """(limit, row queryset holding one extra row to detect a next page)"""
+    limit = min(_parse_positive_int(params.get('limit'), DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+    cursor = params.get('cursor')
+    if cursor:
+        tasks = tasks.filter(after_cursor(decode_cursor(cursor)))
+    return limit, tasks.values_list(*list_row_fields(params))[:limit + 1]
+
+def task_list_response(rows, limit=None, occurrences=None, comment_count=False, ranked=False):
+    """JSON response for the full list, or for one page when ``limit`` is given
+
+    ``ranked`` pages (search results) carry no cursor: ranks are not stable
+    across requests, so a longer page is the way to see more of them.
+    """
+    with timed('serialize'):
+        if limit is None:
+            data = list(serialize_task_rows(expand_occurrences(rows, occurrences), comment_count))
+            logger.info(f"Retrieved {len(data)} tasks")
+            return JsonResponse({'tasks': data})
+
+        rows = list(rows)
+        has_more = len(rows) > limit
+        data = list(serialize_task_rows(expand_occurrences(rows[:limit], occurrences), comment_count))
+        next_cursor = encode_cursor(data[-1]) if has_more and not ranked else None
+        logger.info(f"Retrieved page of {len(data)} tasks")
+        return JsonResponse({'tasks': data, 'next_cursor': next_cursor, 'has_more': has_more})
+
+def task_create_fields(data, user):
+    """Model fields for a POSTed task; raises ValueError for a 400"""
+    if not data.get('title', '').strip():
+        raise ValueError('Title is required')
+
+    task_data = {
+        'title': data['title'].strip(),
+        'description': data.get('description', '').strip(),
+        'user': user,
+        'importance': data.get('importance', 'medium'),
+        'has_specific_time': data.get('has_specific_time', True),
+        'project_id': project_cache.resolve(data.get('project'), user.id),
+    }
+
+    if data.get('scheduled_date'):
+        task_data['scheduled_date'] = data['scheduled_date']
+
+    # Handle time vs duration - Fixed the syntax error
+    if data.get('has_specific_time'):
+        if data.get('scheduled_start_time') and data.get('scheduled_end_time'):
+            task_data['scheduled_start_time'] = data['scheduled_start_time']
+            task_data['scheduled_end_time'] = data['scheduled_end_time']
+    else:
+        duration_hours = data.get('duration_hours', 0)
+        duration_minutes = data.get('duration_minutes', 0)
+
+        # Validate duration
+        total_minutes = (duration_hours * 60) + duration_minutes
+        if total_minutes <= 0:
+            raise ValueError('Duration must be greater than 0')
+
+        task_data['duration_hours'] = duration_hours
+        task_data['duration_minutes'] = duration_minutes
+    return task_data
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@condition(etag_func=task_list_etag)
 def api_task_list(request):
     """API endpoint for tasks"""
     if request.method == 'GET':
         try:
-            project_filter = request.GET.get('project')
-            importance_filter = request.GET.get('importance')
-            completed_filter = request.GET.get('completed')
-            date_filter = request.GET.get('date')
-            overdue_filter = request.GET.get('overdue')
-            
-            tasks = Task.objects.all().order_by('-importance', '-created_at')
+            now = timezone.now()
+            occurrences = list_occurrences(request, now)
+            tasks = task_list_queryset(request.GET, now, occurrences)
+            fields = list_row_fields(request.GET)
+            comment_count = wants_comment_count(request.GET)
 
-            if project_filter:
-                tasks = tasks.filter(project=project_filter)
-            
-            if importance_filter:
-                tasks = tasks.filter(importance=importance_filter)
-            
-            if completed_filter is not None:
-                is_completed = completed_filter.lower() in ['true', '1', 'yes']
-                tasks = tasks.filter(completed=is_completed)
-            
-            if date_filter:
-                tasks = tasks.filter(scheduled_date=date_filter)
+            if request.GET.get('stream', '').lower() in TRUTHY_VALUES:
+                chunk_size = _parse_positive_int(request.GET.get('chunk_size'), STREAM_CHUNK_SIZE)
+                logger.info(f"Streaming tasks in chunks of {chunk_size}")
+                rows = tasks.values_list(*fields).iterator(chunk_size=chunk_size)
+                return StreamingHttpResponse(
+                    stream_tasks_json(serialize_task_rows(expand_occurrences(rows, occurrences), comment_count)),
+                    content_type='application/json',
+                )
 
-            if overdue_filter and overdue_filter.lower() in ['true', '1', 'yes']:
-                tasks = [task for task in tasks if task.is_overdue and not task.completed]
+            cache_key = list_cache.cache_key(request.GET, getattr(request, 'task_list_etag', None))
+            if cache_key:
+                content = list_cache.get(cache_key)
+                if content is not None:
+                    return HttpResponse(content, content_type='application/json')
+
+            if wants_full_list(request.GET):
+                rows = tasks.values_list(*fields).iterator(chunk_size=STREAM_CHUNK_SIZE)
+                response = task_list_response(rows, occurrences=occurrences, comment_count=comment_count)
             else:
-                tasks = list(tasks)
-        
-            data = [serialize_task(task) for task in tasks]
-            logger.info(f"Retrieved {len(data)} tasks")
-            return JsonResponse({'tasks': data})
-            
+                limit, rows = task_page_rows(tasks, request.GET)
+                response = task_list_response(rows, limit, occurrences, comment_count, is_search(request.GET))
+
+            if cache_key:
+                list_cache.store(cache_key, response.content)
+            return response
+
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             logger.error(f"Error retrieving tasks: {str(e)}")
             return JsonResponse({'error': 'Failed to retrieve tasks'}, status=500)
@@ -87,38 +528,11 @@ def api_task_list(request):
                 defaults={'email': 'demo@example.com'}
             )
 
-            if not data.get('title', '').strip():
-                return JsonResponse({'error': 'Title is required'}, status=400)
-            
-            task_data = {
-                'title': data['title'].strip(),
-                'description': data.get('description', '').strip(),
-                'user': user,
-                'importance': data.get('importance', 'medium'),
-                'has_specific_time': data.get('has_specific_time', True),
-                'project': data.get('project') if data.get('project') else None,
-            }
-            
-            if data.get('scheduled_date'):
-                task_data['scheduled_date'] = data['scheduled_date']
-            
-            # Handle time vs duration - Fixed the syntax error
-            if data.get('has_specific_time'):
-                if data.get('scheduled_start_time') and data.get('scheduled_end_time'):
-                    task_data['scheduled_start_time'] = data['scheduled_start_time']
-                    task_data['scheduled_end_time'] = data['scheduled_end_time']
-            else:
-                duration_hours = data.get('duration_hours', 0)
-                duration_minutes = data.get('duration_minutes', 0)
-                
-                # Validate duration
-                total_minutes = (duration_hours * 60) + duration_minutes
-                if total_minutes <= 0:
-                    return JsonResponse({'error': 'Duration must be greater than 0'}, status=400)
-                
-                task_data['duration_hours'] = duration_hours
-                task_data['duration_minutes'] = duration_minutes
-            
+            try:
+                task_data = task_create_fields(data, user)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
             task = Task.objects.create(**task_data)
             
             logger.info(f"Task created successfully: {task.id}")
@@ -132,65 +546,81 @@ def api_task_list(request):
             logger.error(f"Error creating task: {str(e)}")
             return JsonResponse({'error': str(e)}, status=500)
 
+def apply_task_changes(task, data, create_projects=True):
+    """Apply a PUT-style payload to ``task`` without saving it
+
+    Raises ValueError for input the API reports as a 400. With
+    ``create_projects=False`` a built-in project slug that has no project yet
+    leaves ``project_id`` unset (see ``project_cache.resolve``).
+    """
+    # Update fields if provided
+    if 'title' in data:
+        title = data['title'].strip()
+        if not title:
+            raise ValueError('Title cannot be empty')
+        task.title = title
+    if 'description' in data:
+        task.description = data['description'].strip()
+    if 'completed' in data:
+        task.completed = data['completed']
+    if 'scheduled_date' in data:
+        task.scheduled_date = data['scheduled_date'] if data['scheduled_date'] else None
+        if task.is_recurring and task.scheduled_date:
+            # The template's date is the rule's first occurrence: it must still fit the rule
+            rule = TaskRecurrence.objects.filter(task=task).values_list('weekdays', 'until').first()
+            if rule is not None:
+                first = Task._meta.get_field('scheduled_date').to_python(task.scheduled_date)
+                recurrence.check_first_date(first, *rule)
+    if 'importance' in data:
+        task.importance = data['importance']
+    if 'project' in data:
+        task.project_id = project_cache.resolve(data['project'], task.user_id, create=create_projects)
+    if 'has_specific_time' in data:
+        task.has_specific_time = data['has_specific_time']
+
+    # Handle time vs duration updates
+    if data.get('has_specific_time', task.has_specific_time):
+        if 'scheduled_start_time' in data:
+            task.scheduled_start_time = data['scheduled_start_time']
+        if 'scheduled_end_time' in data:
+            task.scheduled_end_time = data['scheduled_end_time']
+        # Clear duration fields
+        task.duration_hours = None
+        task.duration_minutes = None
+    else:
+        if 'duration_hours' in data or 'duration_minutes' in data:
+            hours = data.get('duration_hours', task.duration_hours or 0)
+            minutes = data.get('duration_minutes', task.duration_minutes or 0)
+
+            # Validate duration
+            total_minutes = (hours * 60) + minutes
+            if total_minutes <= 0:
+                raise ValueError('Duration must be greater than 0')
+
+            task.duration_hours = hours
+            task.duration_minutes = minutes
+        # Clear time fields
+        task.scheduled_start_time = None
+        task.scheduled_end_time = None
+
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "DELETE"])
+@condition(etag_func=task_detail_etag)
 def api_task_detail(request, task_id):
     """API endpoint for specific task"""
     try:
         task = get_object_or_404(Task, id=task_id)
         
         if request.method == 'GET':
-            return JsonResponse(serialize_task(task))
+            with timed('serialize'):
+                return JsonResponse(serialize_task(task))
         
         elif request.method == 'PUT':
             try:
                 data = json.loads(request.body)
                 logger.info(f"Updating task {task_id} with data: {data}")
 
-                # Update fields if provided
-                if 'title' in data:
-                    title = data['title'].strip()
-                    if not title:
-                        return JsonResponse({'error': 'Title cannot be empty'}, status=400)
-                    task.title = title
-                if 'description' in data:
-                    task.description = data['description'].strip()
-                if 'completed' in data:
-                    task.completed = data['completed']
-                if 'scheduled_date' in data:
-                    task.scheduled_date = data['scheduled_date'] if data['scheduled_date'] else None
-                if 'importance' in data:
-                    task.importance = data['importance']
-                if 'project' in data:
-                    task.project = data['project'] if data['project'] else None
-                if 'has_specific_time' in data:
-                    task.has_specific_time = data['has_specific_time']
-                
-                # Handle time vs duration updates
-                if data.get('has_specific_time', task.has_specific_time):
-                    if 'scheduled_start_time' in data:
-                        task.scheduled_start_time = data['scheduled_start_time']
-                    if 'scheduled_end_time' in data:
-                        task.scheduled_end_time = data['scheduled_end_time']
-                    # Clear duration fields
-                    task.duration_hours = None
-                    task.duration_minutes = None
-                else:
-                    if 'duration_hours' in data or 'duration_minutes' in data:
-                        hours = data.get('duration_hours', task.duration_hours or 0)
-                        minutes = data.get('duration_minutes', task.duration_minutes or 0)
-                        
-                        # Validate duration
-                        total_minutes = (hours * 60) + minutes
-                        if total_minutes <= 0:
-                            return JsonResponse({'error': 'Duration must be greater than 0'}, status=400)
-                        
-                        task.duration_hours = hours
-                        task.duration_minutes = minutes
-                    # Clear time fields
-                    task.scheduled_start_time = None
-                    task.scheduled_end_time = None
-                
+                apply_task_changes(task, data)
                 task.save()
                 
                 logger.info(f"Task {task_id} updated successfully")
@@ -198,6 +628,8 @@ def api_task_detail(request, task_id):
 
             except json.JSONDecodeError:
                 return JsonResponse({'error': 'Invalid JSON'}, status=400)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
             except Exception as e:
                 logger.error(f"Error updating task {task_id}: {str(e)}")
                 return JsonResponse({'error': str(e)}, status=500)
@@ -212,84 +644,980 @@ def api_task_detail(request, task_id):
         return JsonResponse({'error': str(e)}, status=500)
     
 
+def serialize_recurrence(rule):
+    return {
+        'task_id': rule.task_id,
+        'frequency': rule.frequency,
+        'interval': rule.interval,
+        'weekdays': recurrence.weekday_codes(rule.weekdays),
+        'until': rule.until.isoformat() if rule.until else None,
+        'count': rule.count,
+        'ends_on': rule.ends_on.isoformat() if rule.ends_on else None,
+    }
+
+@csrf_exempt
+@require_http_methods(["GET", "PUT", "DELETE"])
+def api_task_recurrence(request, task_id):
+    """API endpoint for the repeat rule of a task
+
+    PUT makes the task the template of a recurring task whose first occurrence is
+    its ``scheduled_date``. DELETE turns it back into a one-off task on that date
+    and drops the exceptions of its occurrences.
+    """
+    try:
+        task = get_object_or_404(Task, id=task_id)
+
+        if request.method == 'GET':
+            return JsonResponse(serialize_recurrence(get_object_or_404(TaskRecurrence, task=task)))
+
+        if request.method == 'PUT':
+            data = json.loads(request.body)
+            if not task.scheduled_date:
+                raise ValueError('Recurring tasks need a scheduled date')
+            fields = recurrence.rule_fields(data, task.scheduled_date)
+            with transaction.atomic():
+                rule, _ = TaskRecurrence.objects.update_or_create(task=task, defaults=fields)
+                task.is_recurring = True
+                # A template write moves list ETags and cached calendar events along
+                task.save()
+            logger.info(f"Task {task_id} repeats {rule.frequency} every {rule.interval}")
+            return JsonResponse(serialize_recurrence(rule))
+
+        with transaction.atomic():
+            deleted, _ = TaskRecurrence.objects.filter(task=task).delete()
+            task.occurrence_exceptions.all().delete()
+            task.is_recurring = False
+            task.save()
+        logger.info(f"Task {task_id} no longer repeats")
+        return JsonResponse({'deleted': bool(deleted)})
+
+    except Http404:
+        return JsonResponse({'error': 'Not found'}, status=404)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except ValidationError as e:
+        return JsonResponse({'error': '; '.join(e.messages)}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error updating recurrence of task {task_id}: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+# Parts of an occurrence a PUT may change; null restores the template's value
+OCCURRENCE_FIELDS = ('cancelled', 'completed', 'scheduled_date', 'scheduled_start_time', 'scheduled_end_time')
+
+def serialize_occurrence_exception(task_id, original_date, exception):
+    return {
+        'task_id': task_id,
+        'original_date': original_date.isoformat(),
+        'cancelled': exception.cancelled if exception else False,
+        **{
+            name: getattr(exception, name) if exception else None
+            for name in ('completed', 'scheduled_date', 'scheduled_start_time', 'scheduled_end_time')
+        },
+    }
+
+@csrf_exempt
+@require_http_methods(["PUT", "DELETE"])
+def api_task_occurrence(request, task_id, date):
+    """API endpoint for one occurrence of a recurring task, named by its date under the rule
+
+    PUT changes only that occurrence: ``completed``, ``cancelled``, or a new
+    ``scheduled_date`` and times. DELETE restores it to the template. Only
+    occurrences that differ from the template are stored.
+    """
+    try:
+        task = get_object_or_404(Task.objects.select_related('recurrence'), id=task_id, is_recurring=True)
+        original_date = _parse_date_param({'date': date}, 'date')
+        if next(recurrence.occurrence_dates(task.scheduled_date, task.recurrence, original_date, original_date), None) is None:
+            return JsonResponse({'error': f'Task {task_id} does not occur on {original_date}'}, status=404)
+
+        exception = (
+            TaskOccurrenceException.objects.filter(task=task, original_date=original_date).first()
+            or TaskOccurrenceException(task=task, original_date=original_date)
+        )
+        if request.method == 'PUT':
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                raise ValueError('Expected a JSON object')
+            unknown = sorted(set(data) - set(OCCURRENCE_FIELDS))
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            for name in OCCURRENCE_FIELDS:
+                if name in data:
+                    setattr(exception, name, data[name])
+            exception.cancelled = bool(exception.cancelled)
+            exception.full_clean(exclude=['task'], validate_unique=False)
+            if exception.scheduled_date == original_date:
+                exception.scheduled_date = None
+
+        unchanged = request.method == 'DELETE' or (
+            not exception.cancelled
+            and all(getattr(exception, name) is None for name in OCCURRENCE_FIELDS[1:])
+        )
+        with transaction.atomic():
+            if unchanged:
+                if exception.pk:
+                    exception.delete()
+                exception = None
+            else:
+                exception.save()
+            # A template write moves list ETags and cached calendar events along
+            task.save()
+
+        logger.info(f"Updated occurrence {original_date} of task {task_id}")
+        return JsonResponse(serialize_occurrence_exception(task_id, original_date, exception))
+
+    except Http404:
+        return JsonResponse({'error': 'Recurring task not found'}, status=404)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except ValidationError as e:
+        return JsonResponse({'error': '; '.join(e.messages)}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error updating occurrence of task {task_id}: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+def serialize_comment(comment):
+    """Comment data; reads ``comment.user``, so select_related('user') when listing"""
+    return {
+        'id': comment.id,
+        'task_id': comment.task_id,
+        'comment': comment.comment,
+        'user': {'id': comment.user.id, 'username': comment.user.username} if comment.user else None,
+        'created_at': comment.created_at.isoformat(),
+    }
+
+def encode_comment_cursor(comment_data):
+    """Opaque cursor pointing just after a serialized comment, newest first"""
+    return _encode_cursor_values([comment_data['created_at'], comment_data['id']])
+
+def decode_comment_cursor(cursor):
+    try:
+        created_at, comment_id = _decode_cursor_values(cursor)
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError
+        return created_at, int(comment_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def comment_page(task_id, params):
+    """(comments, next cursor) for one page of a task's comments, newest first, in one query"""
+    limit = min(_parse_positive_int(params.get('limit'), DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+    comments = TaskComment.objects.filter(task_id=task_id).select_related('user').order_by('-created_at', '-id')
+    if params.get('cursor'):
+        created_at, comment_id = decode_comment_cursor(params['cursor'])
+        comments = comments.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=comment_id))
+    comments = list(comments[:limit + 1])
+    data = [serialize_comment(comment) for comment in comments[:limit]]
+    return data, encode_comment_cursor(data[-1]) if len(comments) > limit else None
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def api_task_comments(request, task_id):
+    """API endpoint for a task's comments, newest first in pages of ``limit`` after ``cursor``"""
+    try:
+        if not Task.objects.filter(id=task_id).exists():
+            raise Http404
+
+        if request.method == 'GET':
+            data, next_cursor = comment_page(task_id, request.GET)
+            logger.info(f"Retrieved {len(data)} comments on task {task_id}")
+            return JsonResponse({'comments': data, 'next_cursor': next_cursor})
+
+        data = json.loads(request.body)
+        if not isinstance(data, dict) or not isinstance(data.get('comment'), str) or not data['comment'].strip():
+            raise ValueError('Comment is required')
+        if request.user.is_authenticated:
+            user = request.user
+        else:
+            user, _ = User.objects.get_or_create(username='demo_user', defaults={'email': 'demo@example.com'})
+        comment = TaskComment.objects.create(task_id=task_id, user=user, comment=data['comment'].strip())
+        logger.info(f"Comment {comment.id} added to task {task_id}")
+        return JsonResponse(serialize_comment(comment), status=201)
+
+    except Http404:
+        return JsonResponse({'error': 'Task not found'}, status=404)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error handling comments of task {task_id}: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+MAX_BATCH_SIZE = 5000
+
+# Columns written by bulk_update for batch updates
+BATCH_UPDATE_FIELDS = [
+    'title', 'description', 'completed', 'scheduled_date', 'importance', 'project',
+    'has_specific_time', 'scheduled_start_time', 'scheduled_end_time',
+    'duration_hours', 'duration_minutes', 'priority_rank', 'updated_at',
+]
+
+# Validated by the API itself rather than per row against the database
+BATCH_CLEAN_EXCLUDE = ['user', 'team', 'category', 'project']
+
+def _validate_batch(operations, user):
+    """Validate every operation; returns (results, creates, updates, delete_ids, new_projects)
+
+    ``results`` has one entry per operation, with an ``error`` key on failures.
+    Validation writes nothing: ``new_projects`` holds (task, slug) pairs for
+    built-in projects to create when the batch is applied.
+    """
+    results = []
+    creates, updates, delete_ids, new_projects = [], [], [], []
+
+    target_ids = [op.get('id') for op in operations if isinstance(op, dict) and op.get('op') in ('update', 'delete')]
+    existing = Task.objects.in_bulk([task_id for task_id in target_ids if isinstance(task_id, int)])
+    seen_ids = set()
+
+    for index, op in enumerate(operations):
+        result = {'index': index}
+        results.append(result)
+        try:
+            if not isinstance(op, dict) or op.get('op') not in BATCH_OPERATIONS:
+                raise ValueError(f"Operation must be one of {', '.join(BATCH_OPERATIONS)}")
+            result['op'] = op['op']
+            data = op.get('data', {})
+            if not isinstance(data, dict):
+                raise ValueError('data must be an object')
+
+            if op['op'] == 'create':
+                if not str(data.get('title', '')).strip():
+                    raise ValueError('Title is required')
+                task = Task(user=user)
+                apply_task_changes(task, data, create_projects=False)
+                task.full_clean(exclude=BATCH_CLEAN_EXCLUDE, validate_unique=False)
+                creates.append((result, task))
+                if data.get('project') and task.project_id is None:
+                    new_projects.append((task, data['project']))
+                continue
+
+            task_id = op.get('id')
+            if task_id not in existing:
+                raise ValueError(f'Task {task_id} not found')
+            if task_id in seen_ids:
+                raise ValueError(f'Task {task_id} appears in more than one operation')
+            seen_ids.add(task_id)
+            result['id'] = task_id
+
+            if op['op'] == 'update':
+                task = existing[task_id]
+                previous_key = TaskStatCounter.key_for(task)
+                apply_task_changes(task, data, create_projects=False)
+                task.full_clean(exclude=BATCH_CLEAN_EXCLUDE, validate_unique=False)
+                updates.append((result, task, previous_key))
+                if data.get('project') and task.project_id is None:
+                    new_projects.append((task, data['project']))
+            else:
+                delete_ids.append(task_id)
+
+        except ValidationError as e:
+            result['error'] = '; '.join(e.messages)
+        except (ValueError, TypeError, AttributeError) as e:
+            result['error'] = str(e)
+
+    return results, creates, updates, delete_ids, new_projects
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_task_batch(request):
+    """API endpoint applying many create/update/delete operations at once
+
+    All operations are validated first; if any fails nothing is written and
+    the per-item errors are returned with status 400.
+    """
+    try:
+        payload = json.loads(request.body)
+        operations = payload.get('operations') if isinstance(payload, dict) else payload
+        if not isinstance(operations, list):
+            return JsonResponse({'error': 'Expected a list of operations'}, status=400)
+        if len(operations) > MAX_BATCH_SIZE:
+            return JsonResponse({'error': f'At most {MAX_BATCH_SIZE} operations per batch'}, status=400)
+
+        user, created = User.objects.get_or_create(
+            username='demo_user',
+            defaults={'email': 'demo@example.com'}
+        )
+
+        results, creates, updates, delete_ids, new_projects = _validate_batch(operations, user)
+        if any('error' in result for result in results):
+            return JsonResponse({'results': results}, status=400)
+
+        with transaction.atomic():
+            for task, slug in new_projects:
+                task.project_id = project_cache.resolve(slug, task.user_id)
+            if creates:
+                Task.objects.bulk_create([task for _, task in creates], batch_size=500)
+            if updates:
+                now = timezone.now()
+                for _, task, _ in updates:
+                    task.updated_at = now
+                Task.objects.bulk_update([task for _, task, _ in updates], BATCH_UPDATE_FIELDS, batch_size=500)
+            record_bulk_changes(
+                [(None, TaskStatCounter.key_for(task)) for _, task in creates]
+                + [(previous_key, TaskStatCounter.key_for(task)) for _, task, previous_key in updates]
+            )
+            # bulk_update skips the post_save receiver that moves a counted rule's end with its template
+            for _, task, previous_key in updates:
+                if task.is_recurring and task.scheduled_date != previous_key[DATE_INDEX]:
+                    update_counted_rule_end(task)
+            if delete_ids:
+                # Goes through the collector so comments cascade and delete signals fire
+                Task.objects.filter(id__in=delete_ids).delete()
+
+        # bulk_create/bulk_update send no signals, so publish their changes here
+        for result, task in creates:
+            result.update({'id': task.id, 'status': 'created', 'task': serialize_task(task)})
+            change_feed.publish_on_commit('created', task, result['task'])
+        for result, task, _ in updates:
+            result.update({'status': 'updated', 'task': serialize_task(task)})
+            change_feed.publish_on_commit('updated', task, result['task'])
+        for result in results:
+            result.setdefault('status', 'deleted')
+
+        logger.info(f"Batch applied: {len(creates)} created, {len(updates)} updated, {len(delete_ids)} deleted")
+        return JsonResponse({'results': results})
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        logger.error(f"Error applying task batch: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_task_export(request):
+    """API endpoint streaming tasks as NDJSON or CSV
+
+    Takes the task list filters plus ``user`` and ``team``. Rows are read through a
+    cursor and encoded one at a time, so any number of tasks exports in constant memory.
+    """
+    try:
+        format = request.GET.get('format', 'ndjson')
+        if format not in transfer.FORMATS:
+            return JsonResponse({'error': f"format must be one of {', '.join(transfer.FORMATS)}"}, status=400)
+
+        tasks = filter_tasks(Task.objects.all(), request.GET, timezone.now())
+        if request.GET.get('user'):
+            tasks = tasks.filter(user_id=_parse_positive_int(request.GET['user'], None))
+        if request.GET.get('team'):
+            tasks = tasks.filter(team_id=_parse_positive_int(request.GET['team'], None))
+
+        # Under ASGI a plain iterator would be read to the end before sending
+        if isinstance(request, ASGIRequest):
+            lines = transfer.aexport_lines(tasks, format)
+        else:
+            lines = transfer.export_lines(tasks, format)
+        response = StreamingHttpResponse(lines, content_type=f'{transfer.FORMATS[format]}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="tasks.{format}"'
+        logger.info(f"Exporting tasks as {format}")
+        return response
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error exporting tasks: {str(e)}")
+        return JsonResponse({'error': 'Failed to export tasks'}, status=500)
+
+def _import_source(request):
+    """(lines, format) of an import: a multipart ``file`` field or the raw body"""
+    if request.content_type == 'multipart/form-data':
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValueError('Expected a file field')
+        lines, name, content_type = upload, upload.name or '', upload.content_type or ''
+    else:
+        # Iterating the request reads the body line by line
+        lines, name, content_type = request, '', request.content_type or ''
+
+    format = request.GET.get('format')
+    if not format:
+        format = 'csv' if name.lower().endswith('.csv') or content_type == 'text/csv' else 'ndjson'
+    if format not in transfer.FORMATS:
+        raise ValueError(f"format must be one of {', '.join(transfer.FORMATS)}")
+    return lines, format
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_task_import(request):
+    """API endpoint importing NDJSON or CSV tasks for ``user`` (and ``team``) in batches
+
+    Valid lines are inserted in ``batch_size`` transactions and invalid ones reported
+    by line number. The response's ``offset`` is the last line handled; passing it
+    back as ``offset`` resumes an import that stopped part way.
+    """
+    try:
+        user = _request_user(request)
+        team = get_object_or_404(Team, id=_parse_positive_int(request.GET['team'], None)) if request.GET.get('team') else None
+        batch_size = min(_parse_positive_int(request.GET.get('batch_size'), transfer.IMPORT_BATCH_SIZE), MAX_BATCH_SIZE)
+        offset = request.GET.get('offset') or '0'
+        if not offset.isdigit():
+            raise ValueError(f'offset must be a line number, got {offset!r}')
+        offset = int(offset)
+        lines, format = _import_source(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    importer = transfer.TaskImporter(user, team, batch_size)
+    try:
+        importer.run(transfer.parse_records(lines, format, offset), offset)
+    except ValueError as e:
+        return JsonResponse({'error': str(e), **importer.summary()}, status=400)
+    except Exception as e:
+        logger.error(f"Error importing tasks after line {importer.offset}: {str(e)}")
+        return JsonResponse({'error': str(e), **importer.summary()}, status=500)
+
+    logger.info(f"Imported {importer.created} tasks for user {user.id}, {importer.error_count} lines rejected")
+    return JsonResponse(importer.summary())
+
+def calendar_version(request, user_id=None, team_id=None):
+    """(name, task count, latest change) for a calendar feed from one query, or None if its owner does not exist
+
+    Deletions leave tombstones, so they move the latest change forward as well.
+    Kept on the request, which needs it for the ETag, Last-Modified and the body.
+    """
+    if not hasattr(request, 'calendar_version'):
+        if team_id is not None:
+            owners, name, scope = Team.objects.filter(id=team_id), 'name', 'team'
+        else:
+            owners, name, scope = User.objects.filter(id=user_id), 'username', 'user'
+        latest_delete = (
+            TaskTombstone.objects.filter(**{scope: OuterRef('pk')}).order_by('-deleted_at').values('deleted_at')[:1]
+        )
+        version = owners.annotate(
+            task_total=Count('tasks'),
+            latest_update=Max('tasks__updated_at'),
+            latest_delete=Subquery(latest_delete),
+        ).values_list(name, 'task_total', 'latest_update', 'latest_delete').first()
+        if version is not None:
+            owner_name, total, latest_update, latest_delete = version
+            changes = [value for value in (latest_update, latest_delete) if value is not None]
+            version = (owner_name, total, max(changes) if changes else None)
+        request.calendar_version = version
+    return request.calendar_version
+
+def calendar_etag(request, **scope):
+    """Strong ETag for a calendar feed; any write, move or delete changes the count or latest change"""
+    version = calendar_version(request, **scope)
+    if version is None:
+        return None
+    return _version_etag(sorted(scope.items()), *version)
+
+def calendar_last_modified(request, **scope):
+    version = calendar_version(request, **scope)
+    return version[2] if version is not None else None
+
+def calendar_response(request, tasks, filename, **scope):
+    version = calendar_version(request, **scope)
+    if version is None:
+        raise Http404
+    with timed('serialize'):
+        body = ical.render_calendar(version[0], tasks)
+    response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    # Revalidate on every poll; an unchanged feed answers 304 from the ETag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@condition(etag_func=calendar_etag, last_modified_func=calendar_last_modified)
+def api_user_calendar(request, user_id):
+    """iCalendar feed of a user's scheduled tasks
+
+    Only a task moved to another user leaves Last-Modified as it was; clients that
+    send If-None-Match still see the change.
+    """
+    try:
+        logger.info(f"Rendering calendar feed for user {user_id}")
+        return calendar_response(request, Task.objects.filter(user_id=user_id), f'user-{user_id}.ics', user_id=user_id)
+
+    except Http404:
+        return JsonResponse({'error': 'User not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Error rendering calendar for user {user_id}: {str(e)}")
+        return JsonResponse({'error': 'Failed to render calendar'}, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@condition(etag_func=calendar_etag, last_modified_func=calendar_last_modified)
+def api_team_calendar(request, team_id):
+    """iCalendar feed of a team's scheduled tasks"""
+    try:
+        logger.info(f"Rendering calendar feed for team {team_id}")
+        return calendar_response(request, Task.objects.filter(team_id=team_id), f'team-{team_id}.ics', team_id=team_id)
+
+    except Http404:
+        return JsonResponse({'error': 'Team not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Error rendering calendar for team {team_id}: {str(e)}")
+        return JsonResponse({'error': 'Failed to render calendar'}, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_task_cache_stats(request):
+    """API endpoint for task list cache hit/miss counters"""
+    return JsonResponse({'cache': list_cache.stats()})
+
+def _counted(condition=None):
+    """Sum of TaskStatCounter.count over rows matching ``condition``"""
+    return Coalesce(Sum('count', filter=condition), 0)
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_task_stats(request):
     """API endpoint for task statistics"""
     try:
-        tasks = Task.objects.all()
-        
-        # Basic stats
-        total_tasks = tasks.count()
-        completed_tasks = tasks.filter(completed=True).count()
-        pending_tasks = tasks.filter(completed=False).count()
-        
-        # Overdue tasks (need to evaluate each task)
-        overdue_tasks = sum(1 for task in tasks.filter(completed=False) if task.is_overdue)
-        
-        # Today's tasks
-        from django.utils import timezone
-        today = timezone.now().date()
-        today_tasks = tasks.filter(scheduled_date=today).count()
-        
-        # Priority breakdown (pending only)
-        pending_by_priority = {}
-        for choice in Task.IMPORTANCE_CHOICES:
-            priority = choice[0]
-            count = tasks.filter(importance=priority, completed=False).count()
-            pending_by_priority[priority] = count
-        
-        # Project breakdown
-        project_stats = {}
-        for task in tasks:
-            project = task.project or 'unassigned'
-            if project not in project_stats:
-                project_stats[project] = {
-                    'total': 0,
-                    'completed': 0,
-                    'pending': 0,
-                    'project_info': task.project_info if task.project else None
-                }
-            
-            project_stats[project]['total'] += 1
-            if task.completed:
-                project_stats[project]['completed'] += 1
-            else:
-                project_stats[project]['pending'] += 1
-        
-        stats = {
-            'total': total_tasks,
-            'completed': completed_tasks,
-            'pending': pending_tasks,
-            'overdue': overdue_tasks,
-            'today': today_tasks,
-            'by_priority': pending_by_priority,
-            'by_project': project_stats,
-            'completion_rate': round((completed_tasks / total_tasks * 100), 1) if total_tasks > 0 else 0,
-        }
-        
-        return JsonResponse({'stats': stats})
-        
+        totals, overdue_today, project_rows = (query() for query in task_stats_queries(timezone.now()))
+        with timed('serialize'):
+            return JsonResponse({'stats': build_task_stats(totals, overdue_today, project_rows)})
+
     except Exception as e:
         logger.error(f"Error calculating stats: {str(e)}")
         return JsonResponse({'error': 'Failed to calculate statistics'}, status=500)
 
+def task_stats_queries(now):
+    """The independent queries behind the stats endpoint, as zero-argument callables"""
+    today = now.date()
+    # Recurring templates are not tasks of their own, as in the list's ``overdue`` filter
+    counters = TaskStatCounter.objects.filter(is_recurring=False).order_by()
+
+    # Totals and priority breakdown (pending only) in one aggregate over the counters
+    priority_counts = {
+        f'priority_{priority}': _counted(Q(importance=priority, completed=False))
+        for priority, _ in Task.IMPORTANCE_CHOICES
+    }
+    totals = lambda: counters.aggregate(
+        total_count=_counted(),
+        completed_count=_counted(Q(completed=True)),
+        past_pending_count=_counted(Q(completed=False, scheduled_date__lt=today)),
+        today_count=_counted(Q(scheduled_date=today)),
+        **priority_counts
+    )
+    # Counters know about past dates; only today's timed tasks depend on the clock
+    overdue_today = lambda: Task.objects.filter(scheduled_date=today).overdue(now).count()
+    # Project breakdown with a single GROUP BY project
+    project_rows = lambda: list(counters.values('project').annotate(
+        total_count=_counted(),
+        completed_count=_counted(Q(completed=True)),
+    ))
+    return totals, overdue_today, project_rows
+
+def build_task_stats(totals, overdue_today, project_rows):
+    """Stats payload from the results of ``task_stats_queries``"""
+    total_tasks = totals['total_count']
+    completed_tasks = totals['completed_count']
+    pending_tasks = total_tasks - completed_tasks
+    today_tasks = totals['today_count']
+    pending_by_priority = {
+        priority: totals[f'priority_{priority}']
+        for priority, _ in Task.IMPORTANCE_CHOICES
+    }
+    overdue_tasks = totals['past_pending_count'] + overdue_today
+
+    project_stats = {}
+    for row in project_rows:
+        if not row['total_count']:
+            continue
+        project = project_cache.slug(row['project']) or 'unassigned'
+        if project not in project_stats:
+            project_stats[project] = {
+                'total': 0,
+                'completed': 0,
+                'pending': 0,
+                'project_info': project_cache.info(row['project'])
+            }
+
+        project_stats[project]['total'] += row['total_count']
+        project_stats[project]['completed'] += row['completed_count']
+        project_stats[project]['pending'] += row['total_count'] - row['completed_count']
+
+    return {
+        'total': total_tasks,
+        'completed': completed_tasks,
+        'pending': pending_tasks,
+        'overdue': overdue_tasks,
+        'today': today_tasks,
+        'by_priority': pending_by_priority,
+        'by_project': project_stats,
+        'completion_rate': round((completed_tasks / total_tasks * 100), 1) if total_tasks > 0 else 0,
+    }
+
+MAX_AGENDA_DAYS = 92
+
+def _parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        raise ValueError(f'{name} is required (YYYY-MM-DD)')
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f'Invalid {name} date: {value}')
+    return parsed
+
+def _agenda_order(data):
+    return (data['scheduled_start_time'] or '', data['scheduled_end_time'] or '', data['id'])
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_agenda(request):
+    """API endpoint for tasks between two dates, grouped per day"""
+    try:
+        start = _parse_date_param(request.GET, 'start')
+        end = _parse_date_param(request.GET, 'end')
+        if end < start:
+            return JsonResponse({'error': 'end must not be before start'}, status=400)
+        day_count = (end - start).days + 1
+        if day_count > MAX_AGENDA_DAYS:
+            return JsonResponse({'error': f'At most {MAX_AGENDA_DAYS} days per request'}, status=400)
+
+        now = timezone.now()
+        # One range scan in (scheduled_date, scheduled_start_time, scheduled_end_time) index order
+        tasks = (
+            filter_tasks(Task.objects.filter(scheduled_date__range=(start, end), is_recurring=False), request.GET, now)
+            .with_overdue(now)
+            .order_by('scheduled_date', 'scheduled_start_time', 'scheduled_end_time', 'id')
+        )
+        occurrences = window_occurrence_rows(request.GET, start, end, now)
+
+        days = {}
+        for offset in range(day_count):
+            day = (start + datetime.timedelta(days=offset)).isoformat()
+            days[day] = {'date': day, 'timed': [], 'duration': []}
+
+        task_count = 0
+        with timed('serialize'):
+            for data in serialize_task_rows(tasks.values_list(*TASK_ROW_FIELDS)):
+                bucket = 'timed' if data['has_specific_time'] else 'duration'
+                days[data['scheduled_date']][bucket].append(data)
+                task_count += 1
+
+            if occurrences:
+                for data in serialize_task_rows(occurrences):
+                    bucket = 'timed' if data['has_specific_time'] else 'duration'
+                    days[data['scheduled_date']][bucket].append(data)
+                    task_count += 1
+                # Same order as the query: empty times first, then by time and id
+                for day in days.values():
+                    for bucket in ('timed', 'duration'):
+                        day[bucket].sort(key=_agenda_order)
+
+            logger.info(f"Retrieved agenda of {task_count} tasks over {day_count} days")
+            return JsonResponse({
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'days': list(days.values()),
+            })
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error retrieving agenda: {str(e)}")
+        return JsonResponse({'error': 'Failed to retrieve agenda'}, status=500)
+
+def _request_user(request):
+    """User named by the ``user`` query parameter, else the authenticated user"""
+    if request.GET.get('user'):
+        return get_object_or_404(User, id=_parse_positive_int(request.GET['user'], None))
+    if request.user.is_authenticated:
+        return request.user
+    raise ValueError('user is required')
+
+def _schedule_request(request):
+    """(schedule, day_start, day_end) for the user and range named by the query string"""
+    params = request.GET
+    start = _parse_date_param(params, 'start')
+    end = _parse_date_param(params, 'end')
+    if end < start:
+        raise ValueError('end must not be before start')
+    if (end - start).days + 1 > MAX_AGENDA_DAYS:
+        raise ValueError(f'At most {MAX_AGENDA_DAYS} days per request')
+
+    user = _request_user(request)
+
+    day_start, day_end = scheduling.default_working_hours()
+    if params.get('day_start'):
+        day_start = scheduling.parse_clock(params['day_start'])
+    if params.get('day_end'):
+        day_end = scheduling.parse_clock(params['day_end'])
+    if day_end <= day_start:
+        raise ValueError('day_end must be after day_start')
+
+    include_undated = params.get('include_undated', 'true').lower() in ['true', '1', 'yes']
+    schedule = scheduling.Schedule.load(user, start, end, include_undated=include_undated)
+    return schedule, day_start, day_end
+
+def _slot_json(start, end):
+    return {
+        'start': scheduling.format_minutes(start),
+        'end': scheduling.format_minutes(end),
+        'minutes': end - start,
+    }
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_schedule_conflicts(request):
+    """API endpoint for overlapping timed tasks of one user, per day"""
+    try:
+        schedule, _, _ = _schedule_request(request)
+        days = []
+        total = 0
+        for day, conflicts in schedule.conflicts().items():
+            if not conflicts:
+                continue
+            total += len(conflicts)
+            days.append({
+                'date': day.isoformat(),
+                'conflicts': [
+                    {'task_ids': [conflict.first_id, conflict.second_id], **_slot_json(conflict.start, conflict.end)}
+                    for conflict in conflicts
+                ],
+            })
+        logger.info(f"Found {total} schedule conflicts")
+        return JsonResponse({'days': days, 'total': total})
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Http404:
+        raise
+    except Exception as e:
+        logger.error(f"Error finding schedule conflicts: {str(e)}")
+        return JsonResponse({'error': 'Failed to find schedule conflicts'}, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_schedule_free_slots(request):
+    """API endpoint for free time within working hours, per day"""
+    try:
+        schedule, day_start, day_end = _schedule_request(request)
+        min_minutes = _parse_positive_int(request.GET.get('min_minutes'), 1)
+        days = [
+            {'date': day.isoformat(), 'slots': [_slot_json(start, end) for start, end in slots]}
+            for day, slots in schedule.free_slots(day_start, day_end, min_minutes).items()
+        ]
+        return JsonResponse({
+            'working_hours': _slot_json(day_start, day_end),
+            'days': days,
+        })
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Http404:
+        raise
+    except Exception as e:
+        logger.error(f"Error finding free slots: {str(e)}")
+        return JsonResponse({'error': 'Failed to find free slots'}, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_schedule_proposals(request):
+    """API endpoint proposing times for duration-only tasks, most important first"""
+    try:
+        schedule, day_start, day_end = _schedule_request(request)
+        placements, unplaced = schedule.proposals(day_start, day_end)
+        logger.info(f"Proposed {len(placements)} placements, {len(unplaced)} tasks did not fit")
+        return JsonResponse({
+            'working_hours': _slot_json(day_start, day_end),
+            'placements': [
+                {'task_id': task_id, 'date': day.isoformat(), **_slot_json(start, end)}
+                for task_id, day, start, end in placements
+            ],
+            'unplaced': unplaced,
+        })
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Http404:
+        raise
+    except Exception as e:
+        logger.error(f"Error proposing placements: {str(e)}")
+        return JsonResponse({'error': 'Failed to propose placements'}, status=500)
+
+# Re-read this much before the watermark, so writes timestamped before a sync but
+# committed after it still reach the client; clients apply changes idempotently
+SYNC_OVERLAP = datetime.timedelta(seconds=5)
+# Tombstones older than this are pruned; older watermarks get a full reset
+TOMBSTONE_RETENTION = datetime.timedelta(days=30)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_task_sync(request):
+    """API endpoint for a user's tasks changed or deleted since a watermark
+
+    Without ``since`` (or with one older than the tombstone retention) every
+    task is returned with ``reset: true``. Pending tasks dated within the window
+    are included as well, since their ``is_overdue`` may have flipped without a write.
+    """
+    try:
+        user = _request_user(request)
+        now = timezone.now()
+        since = None
+        if request.GET.get('since'):
+            try:
+                since = parse_datetime(request.GET['since'])
+            except ValueError:
+                since = None
+            if since is None or timezone.is_naive(since):
+                raise ValueError('since must be a watermark returned by this endpoint')
+
+        reset = since is None or since < now - TOMBSTONE_RETENTION
+        if reset:
+            tasks = Task.objects.filter(user=user)
+            deleted = []
+        else:
+            window = since - SYNC_OVERLAP
+            # ``user`` inside each branch lets SQLite answer the OR from the
+            # (user, updated_at) and (user, scheduled_date) indexes
+            tasks = Task.objects.filter(
+                Q(user=user, updated_at__gt=window)
+                | Q(user=user, completed=False, scheduled_date__range=(window.date(), now.date()))
+            )
+            deleted = list(
+                TaskTombstone.objects.filter(user=user, deleted_at__gt=window)
+                .order_by('deleted_at')
+                .values_list('task_id', flat=True)
+            )
+
+        rows = tasks.with_overdue(now).order_by('updated_at', 'id').values_list(*TASK_ROW_FIELDS)
+        with timed('serialize'):
+            data = list(serialize_task_rows(rows))
+            logger.info(f"Sync for user {user.id}: {len(data)} changed, {len(deleted)} deleted, reset={reset}")
+            return JsonResponse({
+                'tasks': data,
+                'deleted': deleted,
+                'watermark': now.isoformat(),
+                'reset': reset,
+            })
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Http404:
+        raise
+    except Exception as e:
+        logger.error(f"Error syncing tasks: {str(e)}")
+        return JsonResponse({'error': 'Failed to sync tasks'}, status=500)
+
+def team_queryset():
+    """Teams with counts annotated and active memberships prefetched"""
+    memberships = TeamMembership.objects.filter(is_active=True).select_related('user').order_by('joined_at')
+    return (
+        Team.objects.with_counts()
+        .select_related('created_by')
+        .prefetch_related(Prefetch('teammembership_set', queryset=memberships, to_attr='active_memberships'))
+    )
+
+def serialize_team(team):
+    """Helper function to serialize team data consistently"""
+    return {
+        'id': team.id,
+        'name': team.name,
+        'description': team.description,
+        'color': team.color,
+        'is_active': team.is_active,
+        'created_by': team.created_by.username,
+        'member_count': team.member_count,
+        'task_count': team.task_count,
+        'members': [
+            {
+                'id': membership.user.id,
+                'username': membership.user.username,
+                'role': membership.role,
+                'joined_at': membership.joined_at.isoformat(),
+            }
+            for membership in team.active_memberships
+        ],
+        'created_at': team.created_at.isoformat(),
+        'updated_at': team.updated_at.isoformat(),
+    }
+
+def serialize_project(project):
+    """Helper function to serialize project data consistently"""
+    return {
+        'id': project.id,
+        'name': project.name,
+        'slug': project.slug,
+        'description': project.description,
+        'color': project.color,
+        'is_active': project.is_active,
+        'team_id': project.team_id,
+        'task_count': project.task_count,
+        'completed_task_count': project.completed_task_count,
+        'pending_task_count': project.pending_task_count,
+        'created_at': project.created_at.isoformat(),
+        'updated_at': project.updated_at.isoformat(),
+    }
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_team_list(request):
+    """API endpoint for teams"""
+    try:
+        teams = team_queryset()
+        if request.GET.get('active', '').lower() in TRUTHY_VALUES:
+            teams = teams.filter(is_active=True)
+        data = [serialize_team(team) for team in teams]
+        logger.info(f"Retrieved {len(data)} teams")
+        return JsonResponse({'teams': data})
+
+    except Exception as e:
+        logger.error(f"Error retrieving teams: {str(e)}")
+        return JsonResponse({'error': 'Failed to retrieve teams'}, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_team_detail(request, team_id):
+    """API endpoint for a specific team"""
+    team = get_object_or_404(team_queryset(), id=team_id)
+    return JsonResponse(serialize_team(team))
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_project_list(request):
+    """API endpoint for projects with their task counts"""
+    try:
+        projects = Project.objects.with_counts()
+        if request.GET.get('active', '').lower() in TRUTHY_VALUES:
+            projects = projects.filter(is_active=True)
+        team_filter = _parse_positive_int(request.GET.get('team'), None)
+        if team_filter:
+            projects = projects.filter(team_id=team_filter)
+        data = [serialize_project(project) for project in projects]
+        logger.info(f"Retrieved {len(data)} projects")
+        return JsonResponse({'projects': data})
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error retrieving projects: {str(e)}")
+        return JsonResponse({'error': 'Failed to retrieve projects'}, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_project_detail(request, project_id):
+    """API endpoint for a specific project"""
+    project = get_object_or_404(Project.objects.with_counts(), id=project_id)
+    return JsonResponse(serialize_project(project))
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_projects(request):
     """API endpoint for available projects"""
     try:
-        # Mock data for now - in full implementation this would query Project model
-        projects = [
-            {'id': '', 'name': 'No Project', 'color': '#6b7280'},
-            {'id': 'work', 'name': 'Work Tasks', 'color': '#3b82f6'},
-            {'id': 'personal', 'name': 'Personal', 'color': '#10b981'},
-            {'id': 'learning', 'name': 'Learning & Development', 'color': '#f59e0b'},
-            {'id': 'health', 'name': 'Health & Fitness', 'color': '#ef4444'},
-            {'id': 'finance', 'name': 'Finance & Planning', 'color': '#8b5cf6'},
-            {'id': 'home', 'name': 'Home & Family', 'color': '#06b6d4'}
+        # Choices for the task form, keyed by the slug tasks are filed under
+        projects = [{'id': '', 'name': 'No Project', 'color': DEFAULT_COLOR}]
+        projects += [
+            {'id': meta.slug, 'name': meta.name, 'color': meta.color}
+            for meta in project_cache.all_projects() if meta.is_active
         ]
-        
+
         return JsonResponse({'projects': projects})
         
     except Exception as e:
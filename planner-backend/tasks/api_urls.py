@@ -1,7 +1,32 @@
+from django.conf import settings
 from django.urls import path
-from . import api
+from . import api, async_api
+
+# Under ASGI the busiest endpoints run natively async instead of in the thread pool
+task_views = async_api if settings.ASYNC_API_VIEWS else api
 
 urlpatterns = [
-    path('tasks/', api.api_task_list, name='api-task-list'),
-    path('tasks/<int:task_id>/', api.api_task_detail, name='api-task-detail'),
+    path('tasks/', task_views.api_task_list, name='api-task-list'),
+    path('tasks/stats/', task_views.api_task_stats, name='api-task-stats'),
+    path('tasks/events/', async_api.api_task_events, name='api-task-events'),
+    path('tasks/sync/', api.api_task_sync, name='api-task-sync'),
+    path('tasks/export/', api.api_task_export, name='api-task-export'),
+    path('tasks/import/', api.api_task_import, name='api-task-import'),
+    path('tasks/batch/', api.api_task_batch, name='api-task-batch'),
+    path('tasks/cache-stats/', api.api_task_cache_stats, name='api-task-cache-stats'),
+    path('tasks/<int:task_id>/', task_views.api_task_detail, name='api-task-detail'),
+    path('tasks/<int:task_id>/recurrence/', api.api_task_recurrence, name='api-task-recurrence'),
+    path('tasks/<int:task_id>/occurrences/<str:date>/', api.api_task_occurrence, name='api-task-occurrence'),
+    path('tasks/<int:task_id>/comments/', api.api_task_comments, name='api-task-comments'),
+    path('agenda/', api.api_agenda, name='api-agenda'),
+    path('schedule/conflicts/', api.api_schedule_conflicts, name='api-schedule-conflicts'),
+    path('schedule/free-slots/', api.api_schedule_free_slots, name='api-schedule-free-slots'),
+    path('schedule/proposals/', api.api_schedule_proposals, name='api-schedule-proposals'),
+    path('teams/', api.api_team_list, name='api-team-list'),
+    path('teams/<int:team_id>/', api.api_team_detail, name='api-team-detail'),
+    path('projects/', api.api_project_list, name='api-project-list'),
+    path('projects/choices/', api.api_projects, name='api-project-choices'),
+    path('projects/<int:project_id>/', api.api_project_detail, name='api-project-detail'),
+    path('calendar/users/<int:user_id>.ics', api.api_user_calendar, name='api-user-calendar'),
+    path('calendar/teams/<int:team_id>.ics', api.api_team_calendar, name='api-team-calendar'),
 ]
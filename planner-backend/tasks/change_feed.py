@@ -0,0 +1,133 @@
+"""In-process fan-out of task changes to server-sent event subscribers
+
+Task writes publish an event once their transaction commits. Subscribers are
+scoped to a user or a team and receive events through an asyncio queue on their
+own event loop; a bounded replay buffer lets a reconnecting client resume from
+its ``Last-Event-ID``. Event ids embed this process's start time, so ids from
+another process (or before a restart) lead to a ``reset`` event, after which the
+client resynchronises through the delta sync endpoint.
+
+Only clients connected to the publishing process see its events: serve the feed
+from a single ASGI worker.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+REPLAY_SIZE = 1000
+QUEUE_SIZE = 500
+
+RESET_MESSAGE = 'event: reset\ndata: {}\n\n'
+
+Event = namedtuple('Event', 'id sequence type scopes message')
+
+# Put on a subscriber queue that overflowed; the stream sends a reset and closes
+OVERFLOW = object()
+
+
+class Subscriber:
+    def __init__(self, scope, loop):
+        self.scope = scope
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Queue ``event``; runs on the subscriber's event loop"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+
+class ChangeFeed:
+    def __init__(self, replay_size=REPLAY_SIZE):
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self._sequence = itertools.count(1)
+        self._replay = deque(maxlen=replay_size)
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, change, user_id, team_id, payload):
+        """Record an event and hand it to every subscriber of its user or team"""
+        scopes = (('user', user_id), ('team', team_id)) if team_id else (('user', user_id),)
+        data = json.dumps({'type': change, 'task': payload}, cls=DjangoJSONEncoder)
+        with self._lock:
+            sequence = next(self._sequence)
+            event_id = f'{self.epoch}-{sequence}'
+            # Encoded once here rather than once per subscriber
+            event = Event(event_id, sequence, change, scopes, f'id: {event_id}\nevent: {change}\ndata: {data}\n\n')
+            self._replay.append(event)
+            targets = [subscriber for scope in scopes for subscriber in self._subscribers.get(scope, ())]
+        for subscriber in targets:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # The subscriber's event loop is gone
+                self.unsubscribe(subscriber)
+        return event
+
+    def subscribe(self, scope, last_event_id=None):
+        """Register a subscriber on the running loop; returns (subscriber, backlog, reset)
+
+        ``backlog`` holds the buffered events after ``last_event_id``; ``reset`` is
+        True when events the client missed are no longer buffered.
+        """
+        subscriber = Subscriber(scope, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[scope].add(subscriber)
+            backlog, reset = self._events_after(scope, last_event_id)
+        return subscriber, backlog, reset
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.scope)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.scope]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _events_after(self, scope, last_event_id):
+        if not last_event_id:
+            return [], False
+        epoch, _, sequence = last_event_id.partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return [], True
+        sequence = int(sequence)
+        if not self._replay or sequence < self._replay[0].sequence - 1:
+            return [], True
+        return [event for event in self._replay if event.sequence > sequence and scope in event.scopes], False
+
+
+feed = ChangeFeed()
+
+
+def publish_on_commit(change, task, payload=None):
+    """Publish a task change once the surrounding transaction commits
+
+    The payload is built now: after a delete the instance loses its primary key
+    before outer transactions commit.
+    """
+    if payload is None:
+        if change == 'deleted':
+            payload = {'id': task.pk}
+        else:
+            from .api import serialize_task
+            payload = serialize_task(task)
+    user_id, team_id = task.user_id, task.team_id
+    transaction.on_commit(lambda: feed.publish(change, user_id, team_id, payload))
@@ -0,0 +1,256 @@
+"""iCalendar (.ics) feeds of a user's or a team's scheduled tasks
+
+Each task's VEVENT is rendered from its row alone, so the text is cached in the
+Django cache alias ``settings.ICAL_CACHE_ALIAS`` under the task's id and
+``updated_at``. A write bumps ``updated_at`` and so renders a new entry; the stale
+one ages out. A feed reads its rows in chunks, fetches each chunk's cached events
+with one ``get_many`` and renders only the misses.
+
+Tasks with a time become events at that wall-clock time in floating time (no
+time zone), as they are planned. Dated tasks without a time become all-day
+events. Undated tasks are left out.
+
+A recurring task is one event with an RRULE, so clients expand it themselves.
+Cancelled occurrences become EXDATEs and changed ones extra VEVENTs with a
+RECURRENCE-ID. Writing an occurrence saves its template, so the cached text
+follows the template's ``updated_at`` like any other task's.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import project_cache
+from .models import TaskOccurrenceException
+from .recurrence import RULE_FIELDS, Rule, occurrence_dates, weekday_codes
+
+FEED_FIELDS = (
+    'id', 'title', 'description', 'scheduled_date', 'has_specific_time', 'scheduled_start_time',
+    'scheduled_end_time', 'completed', 'importance', 'project', 'is_recurring', *RULE_FIELDS,
+    'created_at', 'updated_at',
+)
+FEED_CHUNK_SIZE = 500
+RECURRING_INDEX = FEED_FIELDS.index('is_recurring')
+
+# RFC 5545 PRIORITY: 1 is highest, 9 lowest
+PRIORITIES = {'critical': 1, 'high': 3, 'medium': 5, 'low': 9}
+
+# Timed tasks without an end time are shown as this long
+DEFAULT_EVENT_LENGTH = datetime.timedelta(hours=1)
+
+# How often calendar clients that honour it should poll
+REFRESH_INTERVAL = 'PT15M'
+
+MAX_LINE_OCTETS = 75
+
+
+def get_cache():
+    return caches[getattr(settings, 'ICAL_CACHE_ALIAS', 'default')]
+
+
+def escape_text(value):
+    """TEXT value escaping (RFC 5545 3.3.11)"""
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold(line):
+    """``line`` split into CRLF-terminated lines of at most 75 octets, without splitting characters"""
+    encoded = line.encode()
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + '\r\n'
+    parts = []
+    start = 0
+    limit = MAX_LINE_OCTETS
+    while len(encoded) - start > limit:
+        end = start + limit
+        # Back up to the first byte of a UTF-8 sequence
+        while encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+        # Continuation lines start with a space, which counts towards the limit
+        limit = MAX_LINE_OCTETS - 1
+    parts.append(encoded[start:].decode())
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _floating(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def event_key(task_id, updated_at):
+    return f'ical:event:{task_id}:{updated_at.timestamp():.6f}'
+
+
+def _timing(day, start_time, end_time):
+    """DTSTART, DTEND and TRANSP lines; an all-day event when ``start_time`` is None"""
+    if start_time is not None:
+        start = datetime.datetime.combine(day, start_time)
+        end = datetime.datetime.combine(day, end_time) if end_time and end_time > start_time else start + DEFAULT_EVENT_LENGTH
+        return [f'DTSTART:{_floating(start)}', f'DTEND:{_floating(end)}', 'TRANSP:OPAQUE']
+    return [
+        f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{(day + datetime.timedelta(days=1)).strftime('%Y%m%d')}",
+        'TRANSP:TRANSPARENT',
+    ]
+
+
+def _occurrence_id(day, start_time):
+    """Value (with its parameter) naming an occurrence in RECURRENCE-ID and EXDATE"""
+    if start_time is None:
+        return f";VALUE=DATE:{day.strftime('%Y%m%d')}"
+    return f':{_floating(datetime.datetime.combine(day, start_time))}'
+
+
+def _details(task, completed):
+    lines = [f"SUMMARY:{'✓ ' if completed else ''}{escape_text(task['title'])}"]
+    if task['description']:
+        lines.append(f"DESCRIPTION:{escape_text(task['description'])}")
+    project = project_cache.get(task['project'])
+    if project is not None:
+        lines.append(f"CATEGORIES:{escape_text(project.name)}")
+    lines.append(f"PRIORITY:{PRIORITIES.get(task['importance'], PRIORITIES['medium'])}")
+    return lines
+
+
+def _rrule(rule, start_time):
+    parts = [f'FREQ={rule.frequency.upper()}']
+    if rule.interval > 1:
+        parts.append(f'INTERVAL={rule.interval}')
+    if rule.weekdays:
+        parts.append(f"BYDAY={','.join(weekday_codes(rule.weekdays))}")
+    if rule.ends_on is not None:
+        # UNTIL takes the same value type as DTSTART
+        until = rule.ends_on.strftime('%Y%m%d')
+        parts.append(f'UNTIL={until}' if start_time is None else f'UNTIL={until}T235959')
+    return f"RRULE:{';'.join(parts)}"
+
+
+def render_event(row, exceptions=()):
+    """VEVENT text for a row in ``FEED_FIELDS`` order, and ``exceptions`` to its rule if it recurs"""
+    task = dict(zip(FEED_FIELDS, row))
+    uid = f"UID:task-{task['id']}@dayplanner"
+    stamp = f"DTSTAMP:{_utc(task['updated_at'])}"
+    day = task['scheduled_date']
+    start_time = task['scheduled_start_time'] if task['has_specific_time'] else None
+    lines = [
+        'BEGIN:VEVENT',
+        uid,
+        stamp,
+        f"CREATED:{_utc(task['created_at'])}",
+        f"LAST-MODIFIED:{_utc(task['updated_at'])}",
+        *_timing(day, start_time, task['scheduled_end_time']),
+        *_details(task, task['completed']),
+    ]
+    if not task['is_recurring']:
+        lines.append('END:VEVENT')
+        return ''.join(fold(line) for line in lines)
+
+    rule = Rule(*(task[name] for name in RULE_FIELDS))
+    lines.append(_rrule(rule, start_time))
+    # Exceptions for dates the rule no longer gives are ignored, as in the API
+    exceptions = [
+        exception for exception in exceptions
+        if next(occurrence_dates(day, rule, exception.original_date, exception.original_date), None)
+    ]
+    lines += [
+        f'EXDATE{_occurrence_id(exception.original_date, start_time)}'
+        for exception in exceptions if exception.cancelled
+    ]
+    lines.append('END:VEVENT')
+
+    for exception in exceptions:
+        if exception.cancelled:
+            continue
+        moved_start = start_time
+        end_time = task['scheduled_end_time']
+        if start_time is not None:
+            moved_start = exception.scheduled_start_time or start_time
+            end_time = exception.scheduled_end_time or end_time
+        completed = task['completed'] if exception.completed is None else exception.completed
+        lines += [
+            'BEGIN:VEVENT',
+            uid,
+            stamp,
+            f'RECURRENCE-ID{_occurrence_id(exception.original_date, start_time)}',
+            *_timing(exception.scheduled_date or exception.original_date, moved_start, end_time),
+            *_details(task, completed),
+            'END:VEVENT',
+        ]
+    return ''.join(fold(line) for line in lines)
+
+
+def occurrence_exceptions(task_ids):
+    """Exception rows of the recurring tasks ``task_ids``, grouped by task id"""
+    grouped = defaultdict(list)
+    if task_ids:
+        for exception in TaskOccurrenceException.objects.filter(task__in=task_ids).order_by('original_date'):
+            grouped[exception.task_id].append(exception)
+    return grouped
+
+
+def feed_rows(tasks):
+    return (
+        tasks.filter(scheduled_date__isnull=False)
+        .order_by('scheduled_date', 'id')
+        .values_list(*FEED_FIELDS)
+        .iterator(chunk_size=FEED_CHUNK_SIZE)
+    )
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_events(rows):
+    """VEVENT texts for ``rows``, from the cache where the task is unchanged"""
+    cache = get_cache()
+    for chunk in _chunks(rows, FEED_CHUNK_SIZE):
+        keys = [event_key(row[0], row[-1]) for row in chunk]
+        cached = cache.get_many(keys)
+        # One query for the exceptions of the chunk's uncached recurring tasks
+        exceptions = occurrence_exceptions([
+            row[0] for key, row in zip(keys, chunk) if key not in cached and row[RECURRING_INDEX]
+        ])
+        rendered = {}
+        for key, row in zip(keys, chunk):
+            event = cached.get(key)
+            if event is None:
+                event = rendered[key] = render_event(row, exceptions.get(row[0], ()))
+            yield event
+        if rendered:
+            cache.set_many(rendered)
+
+
+def render_calendar(name, tasks):
+    """Whole VCALENDAR text for the scheduled tasks in ``tasks``"""
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Day Planner//Tasks//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+        f'REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}',
+        f'X-PUBLISHED-TTL:{REFRESH_INTERVAL}',
+    ]
+    return ''.join([
+        *(fold(line) for line in header),
+        *render_events(feed_rows(tasks)),
+        'END:VCALENDAR\r\n',
+    ])
@@ -0,0 +1,145 @@
+"""Opt-in per-request SQL and timing instrumentation
+
+With ``settings.REQUEST_INSTRUMENTATION`` on, ``RequestInstrumentationMiddleware``
+counts and times every query a request runs on its thread's connection. It also
+times the ``timed()`` blocks the views wrap around serialization, minus any queries
+run inside them. Each response gets a ``Server-Timing`` header (shown in the
+browser's network panel) and one structured log line on ``tasks.instrumentation``.
+Queries slower than ``SLOW_QUERY_THRESHOLD_MS`` are logged with their SQL. SQL
+shapes repeated ``N_PLUS_ONE_THRESHOLD`` times or more within one request are
+flagged as a likely N+1.
+
+``db`` time covers executing each statement. SQLite produces most rows while they
+are fetched, so reading a large result inside a ``timed()`` block counts towards
+that span. Queries run on other threads (``async_api.run_concurrently``) are not
+counted. When the setting is off the middleware removes itself and ``timed()`` only reads a
+context variable.
+"""
+import contextvars
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+sql_logger = logging.getLogger(f'{__name__}.sql')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+# Literals and placeholder lists that vary between otherwise identical queries
+_SHAPE_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\?(?:\s*,\s*\?)+'), '?, ...'),
+]
+
+
+def sql_shape(sql):
+    """``sql`` with literals and parameter lists collapsed, for spotting repeated queries"""
+    for pattern, replacement in _SHAPE_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return ' '.join(sql.split())
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.spans = Counter()
+        self.shapes = Counter()
+        self.slow_queries = []
+
+    def record_query(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            self.shapes[sql_shape(sql)] += 1
+            if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self.slow_queries.append((elapsed, sql))
+
+    def repeated_shapes(self):
+        """(shape, count) for SQL shapes run often enough to look like an N+1"""
+        return [(shape, count) for shape, count in self.shapes.most_common()
+                if count >= settings.N_PLUS_ONE_THRESHOLD]
+
+
+@contextmanager
+def timed(name):
+    """Add the Python time spent in the block (queries excluded) to span ``name`` of the current request"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started, db_before = time.perf_counter(), metrics.db_time
+    try:
+        yield
+    finally:
+        metrics.spans[name] += time.perf_counter() - started - (metrics.db_time - db_before)
+
+
+def server_timing(metrics, total):
+    entries = [f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"']
+    entries += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in metrics.spans.items()]
+    entries.append(f'view;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class RequestInstrumentationMiddleware:
+    """Server-Timing header, structured timing logs, slow-query log and N+1 warnings per request
+
+    Listed last in ``MIDDLEWARE`` so ``view`` time covers the view alone.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics.record_query):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = server_timing(metrics, total)
+        self.log(request, response, metrics, total)
+        return response
+
+    def log(self, request, response, metrics, total):
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in metrics.spans.items()},
+            'view_ms': round(total * 1000, 2),
+        }
+        logger.info(' '.join(f'{key}={value}' for key, value in fields.items()), extra={'request_metrics': fields})
+
+        for elapsed, sql in metrics.slow_queries:
+            sql_logger.warning(
+                f"Slow query ({elapsed * 1000:.1f}ms) in {request.method} {request.path}: {sql}",
+                extra={'duration_ms': round(elapsed * 1000, 2), 'path': request.path},
+            )
+        for shape, count in metrics.repeated_shapes():
+            sql_logger.warning(
+                f"Possible N+1 in {request.method} {request.path}: {count} queries shaped like {shape}",
+                extra={'count': count, 'path': request.path},
+            )
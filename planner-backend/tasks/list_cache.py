@@ -0,0 +1,158 @@
+"""Response cache for ``api_task_list`` keyed by the normalized filter set
+
+Entries live in the Django cache alias ``settings.TASK_LIST_CACHE_ALIAS``, whose
+``TIMEOUT`` and ``MAX_ENTRIES`` bound their age and number. Lists filtered by
+project and/or date embed that project's/date's generation number in their key,
+other lists embed a global one; Task writes bump the generations they touch.
+Project generations are kept per project id, which the ``project`` slug filter
+is resolved to.
+
+Freshness comes from the list ETag version that every key also embeds (see
+``api.task_list_etag``): a write to a listed row changes its row count or latest
+``updated_at``, and time passing changes its overdue count. The generations
+close the one gap that leaves. A body rendered after a concurrent write is
+stored under the version read before that write, and a later write can bring
+the rows back to that version, e.g. by deleting the row just created. Each
+write bumps the generations after it commits, so such entries are never read.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.dateparse import parse_date
+
+from . import project_cache
+
+# Query parameters that change the list payload
+CACHED_PARAMS = (
+    'project', 'importance', 'completed', 'date', 'overdue', 'q', 'limit', 'cursor', 'comment_count',
+)
+BOOLEAN_PARAMS = ('completed', 'overdue', 'comment_count')
+
+GLOBAL_SCOPE = 'all'
+
+_counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_counters_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'TASK_LIST_CACHE_ALIAS', 'default')]
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _generation_key(scope):
+    return f'tasks:list:gen:{scope}'
+
+
+def _scopes(filters):
+    scopes = []
+    if filters.get('project'):
+        # Unknown slugs list nothing; their scope is never bumped, and the ETag in the key covers them
+        scopes.append(f"project:{project_cache.id_for_slug(filters['project']) or filters['project']}")
+    if filters.get('date'):
+        scopes.append(f"date:{filters['date']}")
+    return scopes or [GLOBAL_SCOPE]
+
+
+def normalize_filters(params):
+    """Canonical filter dict for ``params``, or None if the request is not cacheable"""
+    # Imported here as api imports this module
+    from .api import TRUTHY_VALUES
+
+    if params.get('stream'):
+        return None
+
+    filters = {}
+    for name in CACHED_PARAMS:
+        values = params.getlist(name)
+        if len(values) > 1:
+            return None
+        if not values:
+            continue
+        value = values[0].strip()
+        if name in BOOLEAN_PARAMS:
+            value = 'true' if value.lower() in TRUTHY_VALUES else 'false'
+        elif name == 'date' and value:
+            try:
+                parsed = parse_date(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                return None
+            value = parsed.isoformat()
+        filters[name] = value
+    return filters
+
+
+def cache_key(params, version):
+    """Cache key for a list request including current generations, or None
+
+    ``version`` is the list ETag; it changes as rows turn overdue, which no
+    write (and so no generation bump) announces.
+    """
+    filters = normalize_filters(params)
+    if filters is None or version is None:
+        return None
+
+    cache = get_cache()
+    generation_keys = [_generation_key(scope) for scope in _scopes(filters)]
+    generations = cache.get_many(generation_keys)
+    for key in generation_keys:
+        if key not in generations:
+            # Start from a fresh value so entries of an evicted generation can never match
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+            if generations[key] is None:
+                return None
+
+    payload = [sorted(filters.items()), [generations[key] for key in generation_keys], version]
+    digest = hashlib.sha1(json.dumps(payload).encode()).hexdigest()
+    return f'tasks:list:{digest}'
+
+
+def get(key):
+    content = get_cache().get(key)
+    _count('hits' if content is not None else 'misses')
+    return content
+
+
+def store(key, content):
+    get_cache().set(key, content)
+
+
+def invalidate(projects=(), dates=()):
+    """Bump the generations of the given projects and dates and the global one"""
+    scopes = {GLOBAL_SCOPE}
+    scopes.update(f'project:{project}' for project in projects if project)
+    scopes.update(f'date:{date.isoformat() if hasattr(date, "isoformat") else date}' for date in dates if date)
+
+    cache = get_cache()
+    now = time.time_ns()
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, now, timeout=None)
+    _count('invalidations')
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    lookups = counters['hits'] + counters['misses']
+    counters['hit_rate'] = round(counters['hits'] / lookups, 3) if lookups else 0
+    return counters
+
+
+def reset_stats():
+    with _counters_lock:
+        for name in _counters:
+            _counters[name] = 0
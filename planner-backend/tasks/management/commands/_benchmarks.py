@@ -0,0 +1,95 @@
+"""Helpers shared by the bench_* management commands"""
+import datetime
+import io
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from tasks.models import PROJECT_INFO, Project, Task
+
+WORDS = (
+    'plan review write call email design deploy fix test refactor meeting report budget invoice '
+    'groceries laundry workout run yoga read course lecture notes garden repair doctor dentist '
+    'taxes savings rent sprint release backlog roadmap demo client vendor contract draft outline'
+).split()
+
+
+def create_bench_tasks(size, seed=0, username='bench_user'):
+    """bulk_create ``size`` varied tasks; callers roll back to leave the database untouched"""
+    user, _ = User.objects.get_or_create(username=username)
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    projects = []
+    for slug in [*PROJECT_INFO, 'misc']:
+        defaults = {**PROJECT_INFO.get(slug, {'name': 'Misc'}), 'user': user}
+        projects.append(Project.objects.get_or_create(slug=slug, defaults=defaults)[0].id)
+    projects.append(None)
+    importances = [choice for choice, _ in Task.IMPORTANCE_CHOICES]
+
+    tasks = []
+    for index in range(size):
+        timed = rng.random() < 0.7
+        start = datetime.time(rng.randrange(8, 18), rng.choice([0, 15, 30, 45]))
+        importance = rng.choice(importances)
+        tasks.append(Task(
+            title=' '.join(rng.choice(WORDS) for _ in range(rng.randrange(2, 5))).capitalize(),
+            # The trailing reference number gives every row a rare token to search for
+            description=' '.join(
+                [rng.choice(WORDS) for _ in range(rng.randrange(5, 20))] + [f'ref{index}']
+            ) if index % 3 else None,
+            scheduled_date=today + datetime.timedelta(days=rng.randrange(-30, 30)),
+            has_specific_time=timed,
+            scheduled_start_time=start if timed else None,
+            scheduled_end_time=start.replace(hour=start.hour + 1) if timed else None,
+            duration_hours=None if timed else rng.randrange(0, 3),
+            duration_minutes=None if timed else rng.choice([15, 30, 45]),
+            completed=rng.random() < 0.3,
+            importance=importance,
+            priority_rank=Task.IMPORTANCE_RANKS[importance],
+            project_id=rng.choice(projects),
+            user=user,
+        ))
+    return Task.objects.bulk_create(tasks, batch_size=2000)
+
+
+def best_time(run, repeat):
+    """Fastest wall-clock time of ``repeat`` calls to ``run``"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def wsgi_environ(path, method='GET', body=b''):
+    """Minimal WSGI environ for an in-process request to ``path``"""
+    url = urlsplit(path)
+    environ = {
+        'REQUEST_METHOD': method, 'SCRIPT_NAME': '', 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    if body:
+        environ.update({'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body))})
+    return environ
+
+
+def asgi_scope(path):
+    """Minimal ASGI HTTP scope for an in-process GET of ``path``"""
+    url = urlsplit(path)
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': url.path, 'raw_path': url.path.encode(), 'query_string': url.query.encode(),
+        'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
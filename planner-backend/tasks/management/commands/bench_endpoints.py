@@ -0,0 +1,227 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from tasks import list_cache
+from tasks.models import Task, TaskComment, TeamMembership
+
+from ._benchmarks import percentile, wsgi_environ
+
+# Requests per endpoint traced for peak memory; tracing slows them, so they are not timed
+MEMORY_SAMPLES = 5
+
+
+def endpoint_requests(user, team_id, task_id, watermark, today):
+    """(name, method, path, body) for every benchmarked endpoint, writes last so reads see the dataset as generated
+
+    The delta sync resumes from ``watermark``, the newest change a client already has.
+    """
+    start, end = today - datetime.timedelta(days=3), today + datetime.timedelta(days=3)
+    week = f'start={start}&end={end}'
+    since = urlencode({'since': watermark.isoformat()})
+    return [
+        ('task list', 'GET', '/api/tasks/?limit=50', None),
+        ('task list filtered', 'GET', '/api/tasks/?importance=high&completed=false&limit=50', None),
+        ('task list overdue', 'GET', '/api/tasks/?overdue=true&limit=50', None),
+        ('task list project', 'GET', '/api/tasks/?project=work&limit=50', None),
+        ('task search', 'GET', '/api/tasks/?q=review+budget&limit=50', None),
+        ('task detail', 'GET', f'/api/tasks/{task_id}/', None),
+        ('task stats', 'GET', '/api/tasks/stats/', None),
+        ('task sync full', 'GET', f'/api/tasks/sync/?user={user.id}', None),
+        ('task sync delta', 'GET', f'/api/tasks/sync/?user={user.id}&{since}', None),
+        ('agenda week', 'GET', f'/api/agenda/?{week}', None),
+        ('schedule conflicts', 'GET', f'/api/schedule/conflicts/?user={user.id}&{week}', None),
+        ('schedule free slots', 'GET', f'/api/schedule/free-slots/?user={user.id}&{week}', None),
+        ('schedule proposals', 'GET', f'/api/schedule/proposals/?user={user.id}&{week}', None),
+        ('team list', 'GET', '/api/teams/', None),
+        ('team detail', 'GET', f'/api/teams/{team_id}/', None),
+        ('project list', 'GET', '/api/projects/', None),
+        ('user calendar', 'GET', f'/api/calendar/users/{user.id}.ics', None),
+        ('team calendar', 'GET', f'/api/calendar/teams/{team_id}.ics', None),
+        ('task create', 'POST', '/api/tasks/', {
+            'title': 'Benchmark task', 'has_specific_time': False, 'duration_minutes': 30, 'importance': 'high',
+        }),
+        ('task update', 'PUT', '/api/tasks/{created_id}/', {'completed': True}),
+        ('task delete', 'DELETE', '/api/tasks/{created_id}/', None),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run every API endpoint against a dataset from generate_dataset and report latency percentiles, "
+        "queries per request and peak Python memory; --output saves the results as JSON for comparing runs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='dataset', help="Prefix the dataset was generated with")
+        parser.add_argument('--requests', type=int, default=50, help="Timed requests per endpoint")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per endpoint first")
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help="Only run this endpoint, repeatable")
+        parser.add_argument('--warm-cache', action='store_true',
+                            help="Keep the task list cache between requests instead of clearing it")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--compare', help="JSON file of an earlier run to compare against")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(username__startswith=f"{options['prefix']}_")
+        if not users.exists():
+            raise CommandError(f"No '{options['prefix']}' dataset; run generate_dataset first")
+        # The busiest user in a team, so per-user and per-team endpoints have data
+        user = (
+            users.filter(teams__isnull=False).annotate(task_total=Count('tasks', distinct=True))
+            .order_by('-task_total', 'id').first()
+        )
+        task = Task.objects.filter(user=user).order_by('id').first() if user else None
+        if task is None:
+            raise CommandError("No dataset user has both a team and tasks; generate a larger dataset")
+        membership = TeamMembership.objects.filter(user=user).first()
+
+        watermark = Task.objects.filter(user=user).aggregate(latest=Max('updated_at'))['latest']
+        requests = endpoint_requests(user, membership.team_id, task.id, watermark, timezone.now().date())
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - {name for name, *_ in requests}
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            requests = [request for request in requests if request[0] in options['endpoints']]
+
+        # Queries are counted through the debug cursor; request_started resets the log per request
+        connection.force_debug_cursor = True
+        self.handler = WSGIHandler()
+        self.created_ids = []
+        try:
+            results = [self.measure(*request, options) for request in requests]
+        finally:
+            connection.force_debug_cursor = False
+            Task.objects.filter(id__in=self.created_ids).delete()
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': {'vendor': connection.vendor, 'profile': os.environ.get('DAYPLANNER_DB_PROFILE', 'development')},
+            'dataset': {
+                'prefix': options['prefix'],
+                'users': users.count(),
+                'tasks': Task.objects.filter(user__in=users).count(),
+                'comments': TaskComment.objects.filter(task__user__in=users).count(),
+            },
+            'options': {key: options[key] for key in ('requests', 'warmup', 'warm_cache')},
+            'endpoints': results,
+        }
+        previous = self.load_previous(options['compare'])
+        self.print_report(report, previous)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Saved results to {options['output']}")
+
+    def call(self, method, path, body):
+        statuses = []
+        content = json.dumps(body).encode() if body is not None else b''
+        response = self.handler(wsgi_environ(path, method, content), lambda status, headers: statuses.append(status))
+        payload = b''.join(response)
+        response.close()
+        return int(statuses[0].split()[0]), payload
+
+    def request(self, method, path, body, warm_cache):
+        """One request; returns (status, seconds, queries)"""
+        if '{created_id}' in path:
+            if not self.created_ids:
+                raise CommandError("Update and delete benchmarks need 'task create' to run first")
+            created_id = self.created_ids.pop() if method == 'DELETE' else self.created_ids[-1]
+            path = path.format(created_id=created_id)
+        if not warm_cache:
+            list_cache.get_cache().clear()
+        started = time.perf_counter()
+        status, payload = self.call(method, path, body)
+        elapsed = time.perf_counter() - started
+        if method == 'POST' and status == 201:
+            self.created_ids.append(json.loads(payload)['id'])
+        return status, elapsed, len(connection.queries)
+
+    def measure(self, name, method, path, body, options):
+        total = options['warmup'] + options['requests']
+        if method == 'DELETE':
+            # Every delete needs a created task left over from the create benchmark
+            total = min(total, len(self.created_ids) - MEMORY_SAMPLES)
+        samples = [self.request(method, path, body, options['warm_cache']) for _ in range(total)]
+        samples = samples[options['warmup']:]
+
+        tracemalloc.start()
+        peaks = []
+        for _ in range(MEMORY_SAMPLES):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            self.request(method, path, body, options['warm_cache'])
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+
+        latencies = sorted(elapsed for _, elapsed, _ in samples)
+        queries = sorted(count for _, _, count in samples)
+        return {
+            'name': name,
+            'method': method,
+            'path': path,
+            'requests': len(samples),
+            'errors': sum(1 for status, _, _ in samples if status >= 400),
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p90_ms': percentile(latencies, 0.90) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'queries': percentile(queries, 0.50),
+            'max_queries': queries[-1],
+            'peak_kib': max(peaks) / 1024,
+        }
+
+    def load_previous(self, path):
+        if not path:
+            return {}
+        with open(path) as previous:
+            return {result['name']: result for result in json.load(previous)['endpoints']}
+
+    def print_report(self, report, previous):
+        dataset = report['dataset']
+        self.stdout.write(
+            f"{dataset['users']} users, {dataset['tasks']} tasks, {dataset['comments']} comments; "
+            f"{report['options']['requests']} requests per endpoint"
+        )
+        header = f"{'endpoint':<20} {'p50':>8} {'p90':>8} {'p99':>8} {'queries':>7} {'peak KiB':>9} {'errors':>6}"
+        if previous:
+            header += f" {'p50 vs prev':>12} {'queries vs prev':>16}"
+        self.stdout.write(header)
+        for result in report['endpoints']:
+            line = (
+                f"{result['name']:<20} {result['p50_ms']:>6.2f}ms {result['p90_ms']:>6.2f}ms {result['p99_ms']:>6.2f}ms "
+                f"{result['queries']:>7} {result['peak_kib']:>9.0f} {result['errors']:>6}"
+            )
+            before = previous.get(result['name'])
+            if before:
+                change = (result['p50_ms'] / before['p50_ms'] - 1) * 100 if before['p50_ms'] else 0
+                line += f" {change:>+11.0f}% {result['queries'] - before['queries']:>+16}"
+            self.stdout.write(line)
+
+
+def git_commit():
+    """Short hash of the checked out commit, if this is a git checkout"""
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
@@ -0,0 +1,94 @@
+import datetime
+import itertools
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from tasks import scheduling
+from tasks.models import Task
+
+from ._benchmarks import best_time
+
+
+def create_planned_month(user, start, days, per_day, overlap, seed=0):
+    """Back-to-back timed tasks with a share of double bookings, plus some duration tasks"""
+    rng = random.Random(seed)
+    # Average task length that fits ``per_day`` tasks between 06:00 and midnight
+    span = max(2, 18 * 60 // per_day)
+    tasks = []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        minute = 6 * 60
+        for index in range(per_day):
+            length = rng.randrange(1, 2 * span)
+            begin = minute - rng.randrange(1, span + 1) if rng.random() < overlap else minute
+            if begin + length >= scheduling.MINUTES_PER_DAY:
+                break
+            minute = begin + length
+            timed = index % 5 != 0
+            tasks.append(Task(
+                title=f'Task {offset}-{index}',
+                scheduled_date=day,
+                has_specific_time=timed,
+                scheduled_start_time=datetime.time(begin // 60, begin % 60) if timed else None,
+                scheduled_end_time=datetime.time(minute // 60, minute % 60) if timed else None,
+                duration_minutes=None if timed else length,
+                priority_rank=rng.randrange(1, 5),
+                user=user,
+            ))
+    Task.objects.bulk_create(tasks, batch_size=2000)
+    return len(tasks)
+
+
+def pairwise_conflicts(intervals):
+    """The quadratic check the sweep replaces, for comparison"""
+    return [
+        (a.task_id, b.task_id)
+        for a, b in itertools.combinations(intervals, 2)
+        if a.start < b.end and b.start < a.end
+    ]
+
+
+class Command(BaseCommand):
+    help = "Time conflict detection, free slots and placement proposals for one busy user"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-day', type=int, default=100, help="Tasks generated per day")
+        parser.add_argument('--days', type=int, default=31, help="Length of the scheduled range")
+        parser.add_argument('--overlap', type=float, default=0.05, help="Share of tasks starting before the previous one ends")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per step; the best is reported")
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        with transaction.atomic():
+            user, _ = User.objects.get_or_create(username='bench_user')
+            start = timezone.now().date()
+            end = start + datetime.timedelta(days=options['days'] - 1)
+            created = create_planned_month(user, start, options['days'], options['per_day'], options['overlap'])
+            day_start, day_end = scheduling.default_working_hours()
+
+            schedule = scheduling.Schedule.load(user, start, end)
+            intervals = sum(len(day) for day in schedule.intervals_by_day.values())
+            conflicts = sum(len(day) for day in schedule.conflicts().values())
+            self.stdout.write(
+                f"{options['days']} days, {created} tasks: {intervals} timed tasks, {conflicts} conflicting pairs, "
+                f"{len(schedule.pending)} pending duration tasks"
+            )
+
+            self.report('load (SQL)', best_time(lambda: scheduling.Schedule.load(user, start, end), repeat))
+            sweep = best_time(schedule.conflicts, repeat)
+            pairwise = best_time(
+                lambda: [pairwise_conflicts(day) for day in schedule.intervals_by_day.values()], repeat
+            )
+            self.report('conflicts: sweep', sweep)
+            self.report('conflicts: pairwise', pairwise, f"({pairwise / sweep:.1f}x slower)")
+            self.report('free slots', best_time(lambda: schedule.free_slots(day_start, day_end), repeat))
+            self.report('proposals', best_time(lambda: schedule.proposals(day_start, day_end), repeat))
+
+            transaction.set_rollback(True)
+
+    def report(self, label, seconds, note=''):
+        self.stdout.write(f"{label:<22} {seconds * 1000:8.2f}ms {note}".rstrip())
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from tasks import search
+from tasks.api import TASK_LIST_ORDERING
+from tasks.models import Task
+
+from ._benchmarks import best_time, create_bench_tasks
+
+
+class Command(BaseCommand):
+    help = "Compare FTS5 search with icontains filtering on a generated task table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100_000, help="Number of tasks to generate")
+        parser.add_argument('--limit', type=int, default=50, help="Results fetched per query")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per query; the best is reported")
+        parser.add_argument('terms', nargs='*', default=['plan', 'budget review', 'dent', 'roadmap demo client', 'ref4242'])
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            raise CommandError("FTS5 search needs SQLite")
+
+        limit = options['limit']
+        with transaction.atomic():
+            create_bench_tasks(options['tasks'], seed=1)
+            self.stdout.write(f"{options['tasks']} tasks")
+            self.stdout.write(
+                f"{'query':<22} {'matches':>8}   {'first page: icontains / fts5':>30}   {'count: icontains / fts5':>26}"
+            )
+
+            for term in options['terms']:
+                condition = Q()
+                for word in term.split():
+                    condition &= Q(title__icontains=word) | Q(description__icontains=word)
+                like = Task.objects.filter(condition).order_by(*TASK_LIST_ORDERING)
+                fts = search.order_by_relevance(search.filter_matching(Task.objects.all(), term), *TASK_LIST_ORDERING)
+
+                matches = fts.count()
+                page = [
+                    best_time(lambda: list(queryset.values_list('id', flat=True)[:limit]), options['repeat'])
+                    for queryset in (like, fts)
+                ]
+                count = [best_time(queryset.count, options['repeat']) for queryset in (like, fts)]
+                self.stdout.write(
+                    f"{term:<22} {matches:>8}   {self.format_pair(page):>30}   {self.format_pair(count):>26}"
+                )
+
+            transaction.set_rollback(True)
+
+    def format_pair(self, timings):
+        like_time, fts_time = timings
+        return f"{like_time * 1000:.1f}ms / {fts_time * 1000:.1f}ms ({like_time / fts_time:.1f}x)"
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from tasks.api import TASK_ROW_FIELDS, serialize_task, serialize_task_rows
+from tasks.models import Task
+
+from ._benchmarks import best_time, create_bench_tasks
+
+
+class Command(BaseCommand):
+    help = "Compare rows/sec of serialize_task against the values_list fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sizes', nargs='*', type=int, default=[10_000, 100_000],
+            help="Numbers of tasks to benchmark (default: 10000 100000)",
+        )
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per serializer; the best is reported")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>8}  {'serialize_task':>16}  {'fast path':>16}  {'speedup':>8}")
+        for size in options['sizes']:
+            # Work on throwaway rows: everything is rolled back afterwards
+            with transaction.atomic():
+                create_bench_tasks(size, seed=size)
+                now = timezone.now()
+                tasks = Task.objects.with_overdue(now).order_by('id')
+
+                model_rate = size / best_time(
+                    lambda: [serialize_task(task) for task in tasks.iterator(chunk_size=2000)],
+                    options['repeat'],
+                )
+                fast_rate = size / best_time(
+                    lambda: list(serialize_task_rows(tasks.values_list(*TASK_ROW_FIELDS).iterator(chunk_size=2000))),
+                    options['repeat'],
+                )
+                transaction.set_rollback(True)
+
+            self.stdout.write(
+                f"{size:>8}  {model_rate:>12,.0f} r/s  {fast_rate:>12,.0f} r/s  {fast_rate / model_rate:>7.1f}x"
+            )
@@ -0,0 +1,132 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from tasks.models import TaskStatCounter
+
+from ._benchmarks import create_bench_tasks, wsgi_environ
+
+PROFILES = ('development', 'production')
+
+
+class Command(BaseCommand):
+    help = (
+        "Run reader and writer threads against the task API on a scratch SQLite file, "
+        "once per database profile, and compare throughput and lock errors"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help="Threads issuing GET requests")
+        parser.add_argument('--writers', type=int, default=4, help="Threads issuing POST/PUT/DELETE requests")
+        parser.add_argument('--seconds', type=float, default=10.0, help="Duration of each run")
+        parser.add_argument('--tasks', type=int, default=2000, help="Tasks in the scratch database")
+        parser.add_argument('--profile', choices=PROFILES, help="Run one profile in this process")
+        parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+
+    def handle(self, *args, **options):
+        if options['profile']:
+            result = self.run_profile(options)
+            self.stdout.write(json.dumps(result) if options['json'] else str(result))
+            return
+
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, {options['seconds']:.0f}s per profile"
+        )
+        self.stdout.write(
+            f"{'profile':<12} {'journal':>8} {'reads/s':>8} {'writes/s':>9} {'locked':>7} {'other errors':>13} {'counters':>9}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in PROFILES:
+                # The profile is read at settings import, so each one runs in its own process
+                env = dict(
+                    os.environ,
+                    DAYPLANNER_DB_PATH=os.path.join(directory, f'{profile}.sqlite3'),
+                    DAYPLANNER_DB_PROFILE=profile,
+                )
+                manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+                subprocess.run(manage + ['migrate', '-v', '0'], env=env, check=True)
+                command = manage + [
+                    'bench_sqlite_concurrency', '--json', '--profile', profile,
+                    '--readers', str(options['readers']), '--writers', str(options['writers']),
+                    '--seconds', str(options['seconds']), '--tasks', str(options['tasks']),
+                ]
+                completed = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                self.stdout.write(
+                    f"{profile:<12} {result['journal_mode']:>8} {result['reads'] / result['seconds']:>8.0f} "
+                    f"{result['writes'] / result['seconds']:>9.0f} {result['locked']:>7} {result['errors']:>13} "
+                    f"{'ok' if result['consistent'] else 'MISMATCH':>9}"
+                )
+
+    def run_profile(self, options):
+        tasks = create_bench_tasks(options['tasks'], seed=4)
+        TaskStatCounter.rebuild()
+        read_ids = [task.id for task in tasks[:100]]
+        connection.close()
+
+        handler = WSGIHandler()
+        counts = {'reads': 0, 'writes': 0, 'locked': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+
+        def request(method, path, payload=None):
+            statuses = []
+            body = json.dumps(payload).encode() if payload is not None else b''
+            response = handler(wsgi_environ(path, method, body), lambda status, headers: statuses.append(status))
+            content = b''.join(response)
+            response.close()
+            return int(statuses[0].split()[0]), content
+
+        def record(kind, status, content):
+            with lock:
+                if status < 400:
+                    counts[kind] += 1
+                elif b'locked' in content:
+                    counts['locked'] += 1
+                else:
+                    counts['errors'] += 1
+
+        def reader(index):
+            paths = ['/api/tasks/?limit=50', '/api/tasks/stats/', '/api/tasks/?importance=high&limit=50']
+            step = 0
+            while time.perf_counter() < deadline:
+                path = paths[step % len(paths)] if step % 4 else f'/api/tasks/{read_ids[step % len(read_ids)]}/'
+                record('reads', *request('GET', path))
+                step += 1
+
+        def writer(index):
+            step = 0
+            while time.perf_counter() < deadline:
+                status, content = request('POST', '/api/tasks/', {
+                    'title': f'Writer {index} task {step}', 'has_specific_time': False,
+                    'duration_minutes': 30, 'importance': 'high',
+                })
+                record('writes', status, content)
+                if status == 201:
+                    task_id = json.loads(content)['id']
+                    record('writes', *request('PUT', f'/api/tasks/{task_id}/', {'completed': True}))
+                    if step % 2:
+                        record('writes', *request('DELETE', f'/api/tasks/{task_id}/'))
+                step += 1
+
+        threads = [threading.Thread(target=reader, args=(index,)) for index in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(index,)) for index in range(options['writers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counts['seconds'] = time.perf_counter() - started
+
+        counts['journal_mode'] = connection.cursor().execute('PRAGMA journal_mode').fetchone()[0]
+        counts['consistent'] = TaskStatCounter.stored_counts() == TaskStatCounter.live_counts()
+        return counts
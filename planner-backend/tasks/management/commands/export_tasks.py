@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from tasks import transfer
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = "Stream tasks as NDJSON or CSV to a file or stdout, in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(transfer.FORMATS), default='ndjson')
+        parser.add_argument('--user', type=int, help="Only tasks of this user id")
+        parser.add_argument('--team', type=int, help="Only tasks of this team id")
+        parser.add_argument('--output', help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.all()
+        if options['user']:
+            tasks = tasks.filter(user_id=options['user'])
+        if options['team']:
+            tasks = tasks.filter(team_id=options['team'])
+
+        lines = transfer.export_lines(tasks, options['format'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                count = sum(output.write(line) > 0 for line in lines)
+        else:
+            count = 0
+            for line in lines:
+                self.stdout.write(line, ending='')
+                count += 1
+
+        if options['format'] == 'csv':
+            count -= 1
+        self.stderr.write(f"Exported {count} tasks")
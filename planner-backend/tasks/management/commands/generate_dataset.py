@@ -0,0 +1,214 @@
+import datetime
+import math
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from tasks import list_cache
+from tasks.models import (
+    PROJECT_INFO, Category, Project, Task, TaskComment, TaskStatCounter, Team, TeamMembership,
+)
+
+from ._benchmarks import WORDS
+
+BATCH_SIZE = 2000
+
+# Weighted like a real backlog: most work is medium, little is critical
+IMPORTANCE_WEIGHTS = {'low': 3, 'medium': 5, 'high': 2, 'critical': 1}
+
+COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#06b6d4', '#ec4899', '#84cc16']
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible dataset of users, teams, memberships, projects, categories, "
+        "timed and duration-only tasks and comments, for benchmarking at realistic scale"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--teams', type=int, default=10)
+        parser.add_argument('--tasks-per-user', type=int, default=200)
+        parser.add_argument('--comments-per-task', type=float, default=0.5, help="Average comments per task")
+        parser.add_argument('--days', type=int, default=60, help="Tasks are scheduled up to this many days either side of today")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='dataset', help="Username prefix marking the generated rows")
+        parser.add_argument('--replace', action='store_true', help="Delete an existing dataset with this prefix first")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=f'{prefix}_')
+        if existing.exists():
+            if not options['replace']:
+                raise CommandError(f"A '{prefix}' dataset already exists; use --replace or another --prefix")
+            deleted, _ = existing.delete()
+            self.stdout.write(f"Deleted {deleted} rows of the previous '{prefix}' dataset")
+
+        with transaction.atomic():
+            counts = self.generate(random.Random(options['seed']), options)
+            TaskStatCounter.rebuild()
+        # bulk_create sends no signals, so drop every cached task list by hand
+        list_cache.invalidate()
+        self.stdout.write(', '.join(f"{total} {name}" for name, total in counts.items()))
+
+    def generate(self, rng, options):
+        prefix = options['prefix']
+        users = User.objects.bulk_create(
+            User(username=f'{prefix}_{index}', email=f'{prefix}_{index}@example.com', password='!')
+            for index in range(options['users'])
+        )
+
+        teams = Team.objects.bulk_create(
+            Team(name=f'{prefix.title()} team {index}', color=rng.choice(COLORS), created_by=rng.choice(users))
+            for index in range(min(options['teams'], len(users)))
+        )
+        memberships = []
+        team_members = {team.id: {team.created_by_id} for team in teams}
+        for team in teams:
+            memberships.append(TeamMembership(user_id=team.created_by_id, team=team, role='owner'))
+        for user in users:
+            for team in rng.sample(teams, min(len(teams), rng.randrange(0, 4))):
+                if user.id not in team_members[team.id]:
+                    team_members[team.id].add(user.id)
+                    memberships.append(TeamMembership(user=user, team=team, role=rng.choice(['admin', 'member', 'member'])))
+        TeamMembership.objects.bulk_create(memberships, batch_size=BATCH_SIZE)
+
+        projects = []
+        for team in teams:
+            for index in range(rng.randrange(2, 5)):
+                projects.append(Project(
+                    name=f'{_phrase(rng, 2)} {index}', slug=f'{prefix}-t{team.id}-{index}',
+                    color=rng.choice(COLORS), user_id=team.created_by_id, team=team,
+                ))
+        for user in users:
+            for index in range(rng.randrange(0, 3)):
+                projects.append(Project(
+                    name=f'{_phrase(rng, 2)} {index}', slug=f'{prefix}-u{user.id}-{index}',
+                    color=rng.choice(COLORS), user=user,
+                ))
+        Project.objects.bulk_create(projects, batch_size=BATCH_SIZE)
+
+        categories = Category.objects.bulk_create(
+            (Category(name=f'{prefix} {user.id}.{index} {rng.choice(WORDS)}', user=user)
+             for user in users for index in range(rng.randrange(0, 4))),
+            batch_size=BATCH_SIZE,
+        )
+
+        # The web client's built-in projects are shared, so reuse any that exist
+        builtin_projects = [
+            Project.objects.get_or_create(slug=slug, defaults={**info, 'user': users[0]})[0].id
+            for slug, info in PROJECT_INFO.items()
+        ] + [None]
+        team_projects = {team.id: [p.id for p in projects if p.team_id == team.id] for team in teams}
+        personal_projects = {user.id: [p.id for p in projects if p.user_id == user.id and not p.team_id] for user in users}
+        user_teams = {user.id: [team_id for team_id, members in team_members.items() if user.id in members] for user in users}
+        user_categories = {user.id: [c.id for c in categories if c.user_id == user.id] for user in users}
+
+        tasks = Task.objects.bulk_create(
+            (self.make_task(rng, user, user_teams, team_projects, personal_projects, builtin_projects, user_categories, options)
+             for user in users for _ in range(options['tasks_per_user'])),
+            batch_size=BATCH_SIZE,
+        )
+        self.spread_timestamps(rng, tasks)
+
+        comments = self.make_comments(rng, tasks, team_members, options['comments_per_task'])
+
+        return {
+            'users': len(users), 'teams': len(teams), 'memberships': len(memberships), 'projects': len(projects),
+            'categories': len(categories), 'tasks': len(tasks), 'comments': comments,
+        }
+
+    def make_task(self, rng, user, user_teams, team_projects, personal_projects, builtin_projects, user_categories, options):
+        today = timezone.now().date()
+        offset = rng.randint(-options['days'], options['days'])
+        scheduled_date = today + datetime.timedelta(days=offset) if rng.random() < 0.9 else None
+
+        team_id = rng.choice(user_teams[user.id]) if user_teams[user.id] and rng.random() < 0.4 else None
+        if team_id and team_projects[team_id]:
+            project = rng.choice(team_projects[team_id])
+        elif personal_projects[user.id] and rng.random() < 0.5:
+            project = rng.choice(personal_projects[user.id])
+        else:
+            project = rng.choice(builtin_projects)
+
+        importance = rng.choices(list(IMPORTANCE_WEIGHTS), weights=IMPORTANCE_WEIGHTS.values())[0]
+        timed = scheduled_date is not None and rng.random() < 0.6
+        if timed:
+            start_minutes = rng.randrange(7 * 60, 19 * 60, 15)
+            end_minutes = min(start_minutes + rng.choice([15, 30, 45, 60, 90, 120]), 23 * 60 + 45)
+            start, end = _clock(start_minutes), _clock(end_minutes)
+            hours = minutes = None
+        else:
+            start = end = None
+            total = rng.choice([15, 30, 45, 60, 90, 120, 180, 240])
+            hours, minutes = divmod(total, 60)
+
+        return Task(
+            title=_phrase(rng, rng.randrange(2, 6)).capitalize(),
+            description=_phrase(rng, rng.randrange(5, 30)) if rng.random() < 0.6 else None,
+            scheduled_date=scheduled_date,
+            has_specific_time=timed,
+            scheduled_start_time=start,
+            scheduled_end_time=end,
+            duration_hours=hours,
+            duration_minutes=minutes,
+            # Past work is mostly done, future work mostly not
+            completed=rng.random() < (0.8 if offset < 0 else 0.1),
+            importance=importance,
+            priority_rank=Task.IMPORTANCE_RANKS[importance],
+            category_id=rng.choice(user_categories[user.id]) if user_categories[user.id] and rng.random() < 0.5 else None,
+            project_id=project,
+            user=user,
+            team_id=team_id,
+        )
+
+    def spread_timestamps(self, rng, tasks):
+        """Give tasks varied created_at/updated_at, which bulk_create sets to now"""
+        now = timezone.now()
+        for task in tasks:
+            task.created_at = now - datetime.timedelta(seconds=rng.randrange(90 * 24 * 3600))
+            task.updated_at = task.created_at + (now - task.created_at) * rng.random() ** 3
+        # bulk_update writes the values as given, without auto_now
+        Task.objects.bulk_update(tasks, ['created_at', 'updated_at'], batch_size=500)
+
+    def make_comments(self, rng, tasks, team_members, per_task):
+        """Comments by the task owner or a teammate, spread over the last weeks"""
+        now = timezone.now()
+        created = 0
+        batch = []
+        for task in tasks:
+            authors = sorted(team_members[task.team_id]) if task.team_id else [task.user_id]
+            for _ in range(_poisson(rng, per_task)):
+                batch.append(TaskComment(task_id=task.id, user_id=rng.choice(authors), comment=_phrase(rng, rng.randrange(3, 25))))
+            if len(batch) >= BATCH_SIZE:
+                created += self.save_comments(rng, batch, now)
+                batch = []
+        return created + self.save_comments(rng, batch, now)
+
+    def save_comments(self, rng, comments, now):
+        comments = TaskComment.objects.bulk_create(comments)
+        # created_at is auto_now_add, which bulk_create always sets to now
+        for comment in comments:
+            comment.created_at = now - datetime.timedelta(seconds=rng.randrange(30 * 24 * 3600))
+        TaskComment.objects.bulk_update(comments, ['created_at'])
+        return len(comments)
+
+
+def _phrase(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+
+def _clock(minutes):
+    return datetime.time(*divmod(minutes, 60))
+
+
+def _poisson(rng, mean):
+    """Knuth's method; fine for the small means used here"""
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
@@ -0,0 +1,69 @@
+import os
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import transfer
+from tasks.models import Team
+
+# Errors listed in the command output; the rest are only counted
+SHOWN_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Import tasks from an NDJSON or CSV file in bulk_create batches. Invalid lines are "
+        "reported and skipped; --offset resumes an import that stopped part way"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin")
+        parser.add_argument('--user', required=True, help="Owner of the imported tasks (id or username)")
+        parser.add_argument('--team', type=int, help="Team id for the imported tasks")
+        parser.add_argument('--format', choices=list(transfer.FORMATS),
+                            help="Defaults to csv for .csv files and ndjson otherwise")
+        parser.add_argument('--batch-size', type=int, default=transfer.IMPORT_BATCH_SIZE)
+        parser.add_argument('--offset', type=int, default=0, help="Skip lines up to and including this one")
+
+    def handle(self, *args, **options):
+        lookup = {'id': options['user']} if options['user'].isdigit() else {'username': options['user']}
+        user = User.objects.filter(**lookup).first()
+        if user is None:
+            raise CommandError(f"No user {options['user']}")
+        team = None
+        if options['team']:
+            team = Team.objects.filter(id=options['team']).first()
+            if team is None:
+                raise CommandError(f"No team {options['team']}")
+        if options['batch_size'] <= 0 or options['offset'] < 0:
+            raise CommandError("--batch-size must be positive and --offset not negative")
+
+        path = options['path']
+        format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+
+        def progress(importer):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{importer.created} created through line {importer.offset}")
+
+        importer = transfer.TaskImporter(user, team, options['batch_size'], on_batch=progress)
+        source = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            importer.run(transfer.parse_records(source, format, options['offset']), options['offset'])
+        except Exception as e:
+            raise CommandError(
+                f"Import stopped: {e}. {importer.created} tasks created; "
+                f"resume with --offset {importer.offset}"
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        for error in importer.errors[:SHOWN_ERRORS]:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if importer.error_count > SHOWN_ERRORS:
+            self.stderr.write(f"... and {importer.error_count - SHOWN_ERRORS} more")
+        self.stdout.write(
+            f"Imported {importer.created} tasks from {os.path.basename(path) if path != '-' else 'stdin'}, "
+            f"{importer.error_count} lines rejected, last line {importer.offset}"
+        )
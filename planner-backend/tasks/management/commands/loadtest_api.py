@@ -0,0 +1,148 @@
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.models import Task, TaskStatCounter
+
+from ._benchmarks import asgi_scope, create_bench_tasks, percentile, wsgi_environ
+
+DEFAULT_PATHS = ['/api/tasks/?limit=50', '/api/tasks/?importance=high&limit=50', '/api/tasks/stats/', '/api/tasks/{task_id}/']
+
+
+def run_wsgi(paths, clients, total):
+    """``clients`` threads calling the WSGI handler back to back, like a threaded server"""
+    handler = WSGIHandler()
+
+    def call(path):
+        statuses = []
+        started = time.perf_counter()
+        body = handler(wsgi_environ(path), lambda status, headers: statuses.append(status))
+        b''.join(body)
+        body.close()
+        return time.perf_counter() - started, statuses[0].startswith('200')
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return list(pool.map(call, itertools.islice(itertools.cycle(paths), total)))
+
+
+async def run_asgi(paths, clients, total):
+    """``clients`` coroutines calling the ASGI handler back to back on one event loop"""
+    handler = ASGIHandler()
+    pending = itertools.islice(itertools.cycle(paths), total)
+    results = []
+
+    async def call(path):
+        request_sent = False
+        status = None
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client never disconnects; the handler cancels this wait when done
+            await asyncio.Future()
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        started = time.perf_counter()
+        await handler(asgi_scope(path), receive, send)
+        return time.perf_counter() - started, status == 200
+
+    async def client():
+        for path in pending:
+            results.append(await call(path))
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return results
+
+
+class Command(BaseCommand):
+    help = "Compare throughput and latency of the task API under the WSGI and ASGI handlers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=['wsgi', 'asgi', 'both'], default='both')
+        parser.add_argument('--clients', type=int, default=32, help="Concurrent clients")
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per server")
+        parser.add_argument('--tasks', type=int, default=5000,
+                            help="Tasks created for the run and deleted afterwards (0 uses the data as is)")
+        parser.add_argument('--path', action='append', dest='paths',
+                            help="Path to request, repeatable; {task_id} is filled in")
+        parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        if options['server'] != 'both':
+            result = self.measure(options['server'], paths, options['clients'], options['requests'])
+            if options['json']:
+                self.stdout.write(json.dumps(result))
+            else:
+                self.report([result])
+            return
+
+        # Each server runs in its own process so api_urls picks the matching views
+        user = None
+        if options['tasks']:
+            create_bench_tasks(options['tasks'], seed=3, username='loadtest_user')
+            TaskStatCounter.rebuild()
+            user = User.objects.get(username='loadtest_user')
+        try:
+            task = Task.objects.order_by('id').first()
+            if task is None:
+                raise CommandError("No tasks to request; use --tasks")
+            paths = [path.format(task_id=task.id) for path in paths]
+            self.report([self.measure_in_subprocess(server, paths, options) for server in ('wsgi', 'asgi')])
+        finally:
+            if user is not None:
+                Task.objects.filter(user=user).delete()
+                user.delete()
+
+    def measure(self, server, paths, clients, total):
+        started = time.perf_counter()
+        if server == 'wsgi':
+            results = run_wsgi(paths, clients, total)
+        else:
+            results = asyncio.run(run_asgi(paths, clients, total))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for latency, _ in results)
+        return {
+            'server': server,
+            'requests': len(results),
+            'errors': sum(1 for _, ok in results if not ok),
+            'throughput': len(results) / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+        }
+
+    def measure_in_subprocess(self, server, paths, options):
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'loadtest_api', '--json',
+            '--server', server, '--clients', str(options['clients']), '--requests', str(options['requests']),
+        ]
+        for path in paths:
+            command += ['--path', path]
+        env = dict(os.environ, DAYPLANNER_ASYNC_VIEWS='1' if server == 'asgi' else '0')
+        completed = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def report(self, results):
+        self.stdout.write(f"{'server':<6} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50':>9} {'p99':>9}")
+        for result in results:
+            self.stdout.write(
+                f"{result['server']:<6} {result['requests']:>8} {result['errors']:>6} {result['throughput']:>8.0f} "
+                f"{result['p50_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms"
+            )
@@ -0,0 +1,146 @@
+import asyncio
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.change_feed import feed
+from tasks.models import Task
+
+from ._benchmarks import asgi_scope, percentile
+
+
+class Connection:
+    """One in-process SSE client: counts the change events it receives and when"""
+
+    def __init__(self, handler, path, on_event):
+        self.handler = handler
+        self.path = path
+        self.on_event = on_event
+        self.arrivals = []
+        self.status = None
+        self.disconnected = asyncio.get_running_loop().create_future()
+        self.request_sent = False
+
+    async def receive(self):
+        if not self.request_sent:
+            self.request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif b'\nevent: ' in message.get('body', b''):
+            self.arrivals.append(time.perf_counter())
+            self.on_event()
+
+    async def run(self):
+        await self.handler(asgi_scope(self.path), self.receive, self.send)
+
+    def close(self):
+        if not self.disconnected.done():
+            self.disconnected.set_result(None)
+
+
+async def wait_for(predicate, timeout):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise CommandError("Timed out waiting for the change feed")
+        await asyncio.sleep(0.01)
+
+
+class Command(BaseCommand):
+    help = (
+        "Open hundreds of idle server-sent event connections to the change feed in process, "
+        "then measure memory per connection and the fan-out latency of task writes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=500, help="Idle SSE connections")
+        parser.add_argument('--events', type=int, default=50, help="Task writes to fan out")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Seconds to wait for each step")
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username='loadtest_events_user')
+        try:
+            result = asyncio.run(self.run(user, options))
+        finally:
+            Task.objects.filter(user=user).delete()
+            user.delete()
+
+        self.stdout.write(
+            f"{options['subscribers']} subscribers: {result['bytes_per_connection'] / 1024:.1f} KiB "
+            f"of Python heap per idle connection"
+        )
+        self.stdout.write(
+            f"{options['events']} events, {result['deliveries']} deliveries: write p50 {result['write_p50_ms']:.2f}ms; "
+            f"from write start to delivery p50 {result['p50_ms']:.2f}ms, p99 {result['p99_ms']:.2f}ms, "
+            f"last subscriber p50 {result['last_p50_ms']:.2f}ms, max {result['max_ms']:.2f}ms"
+        )
+
+    async def run(self, user, options):
+        handler = ASGIHandler()
+        path = f'/api/tasks/events/?user={user.id}'
+        subscribers = options['subscribers']
+        delivered = 0
+
+        def on_event():
+            nonlocal delivered
+            delivered += 1
+
+        baseline = feed.subscriber_count()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        connections = [Connection(handler, path, on_event) for _ in range(subscribers)]
+        runs = [asyncio.create_task(connection.run()) for connection in connections]
+        await wait_for(lambda: feed.subscriber_count() - baseline >= subscribers, options['timeout'])
+        # Let every stream flush its retry line and settle into waiting on its queue
+        await asyncio.sleep(0.5)
+        bytes_per_connection = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+        tracemalloc.stop()
+
+        failed = [connection.status for connection in connections if connection.status != 200]
+        if failed:
+            raise CommandError(f"{len(failed)} connections failed: {failed[:5]}")
+
+        create = sync_to_async(Task.objects.create)
+        published, write_times = [], []
+        for index in range(options['events']):
+            started = time.perf_counter()
+            # Published on commit, which is immediate in autocommit mode
+            await create(title=f'Change feed probe {index}', user=user, has_specific_time=False,
+                         duration_minutes=30)
+            write_times.append(time.perf_counter() - started)
+            published.append(started)
+            expected = subscribers * (index + 1)
+            await wait_for(lambda: delivered >= expected, options['timeout'])
+
+        for connection in connections:
+            connection.close()
+        await asyncio.wait_for(asyncio.gather(*runs), options['timeout'])
+        if feed.subscriber_count() != baseline:
+            raise CommandError("Subscribers were not released after disconnecting")
+
+        latencies = sorted(
+            arrival - published[index] for connection in connections for index, arrival in enumerate(connection.arrivals)
+        )
+        last_arrivals = sorted(
+            max(connection.arrivals[index] for connection in connections) - started
+            for index, started in enumerate(published)
+        )
+        write_times.sort()
+        return {
+            'bytes_per_connection': bytes_per_connection,
+            'deliveries': len(latencies),
+            'write_p50_ms': percentile(write_times, 0.50) * 1000,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'last_p50_ms': percentile(last_arrivals, 0.50) * 1000,
+        }
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.models import TaskStatCounter
+
+
+class Command(BaseCommand):
+    help = "Rebuild TaskStatCounter rows from the Task table and check them for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only compare stored counters with live aggregates; do not rebuild",
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = self.find_drift()
+            if drift:
+                for key, stored, live in drift:
+                    self.stdout.write(f"{key}: stored={stored} live={live}")
+                raise CommandError(f"{len(drift)} counter key(s) drifted from the Task table")
+            self.stdout.write(self.style.SUCCESS("Task counters match live aggregates"))
+            return
+
+        TaskStatCounter.rebuild()
+        drift = self.find_drift()
+        if drift:
+            raise CommandError(f"{len(drift)} counter key(s) still drift after rebuild")
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {TaskStatCounter.objects.count()} task counter rows"
+        ))
+
+    def find_drift(self):
+        """List of (key, stored, live) for every key whose counts disagree"""
+        stored = TaskStatCounter.stored_counts()
+        live = TaskStatCounter.live_counts()
+        return [
+            (key, stored.get(key, 0), live.get(key, 0))
+            for key in sorted(set(stored) | set(live), key=repr)
+            if stored.get(key, 0) != live.get(key, 0)
+        ]
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tasks import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for tasks from the task and comment tables"
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write("Full-text index is SQLite-only; nothing to rebuild")
+            return
+        with transaction.atomic():
+            indexed = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} tasks"))
@@ -0,0 +1,189 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='categories', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Category',
+                'verbose_name_plural': 'Categories',
+                'db_table': 'day_planner_categories',
+            },
+        ),
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(help_text='What needs to be done?', max_length=200)),
+                ('description', models.TextField(blank=True, help_text='Detailed description of the task', null=True)),
+                ('scheduled_date', models.DateField(blank=True, help_text='What date is this task for? (Optional)', null=True)),
+                ('has_specific_time', models.BooleanField(default=True, help_text='Does this task have a specific time?')),
+                ('scheduled_start_time', models.TimeField(blank=True, help_text='Specific start time for the task (only used if has_specific_time=True)', null=True)),
+                ('scheduled_end_time', models.TimeField(blank=True, help_text='Specific end time for the task (only used if has_specific_time=True)', null=True)),
+                ('duration_hours', models.IntegerField(blank=True, help_text='Duration in hours (for tasks without specific time)', null=True)),
+                ('duration_minutes', models.IntegerField(blank=True, help_text='Duration in minutes (for tasks without specific time)', null=True)),
+                ('completed', models.BooleanField(default=False, help_text='Is this task done?')),
+                ('importance', models.CharField(choices=[('low', 'Low - Nice to have'), ('medium', 'Medium - Should do'), ('high', 'High - Must do'), ('critical', 'Critical - Urgent & Important')], default='medium', help_text='How important is this task?', max_length=10)),
+                ('project', models.CharField(blank=True, help_text='Project/category identifier (work, personal, etc.)', max_length=50, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tasks.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Task',
+                'verbose_name_plural': 'Tasks',
+                'db_table': 'day_planner_tasks',
+                'ordering': ['-importance', '-scheduled_date', '-scheduled_start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='tasks.task')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_comments', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Task Comment',
+                'verbose_name_plural': 'Task Comments',
+                'db_table': 'day_planner_task_comments',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Team',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Team name', max_length=100)),
+                ('description', models.TextField(blank=True, help_text='Team description', null=True)),
+                ('color', models.CharField(default='#3b82f6', help_text='Team color (hex)', max_length=7)),
+                ('is_active', models.BooleanField(default=True, help_text='Is this team active?')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_teams', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Team',
+                'verbose_name_plural': 'Teams',
+                'db_table': 'day_planner_teams',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='team',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='tasks.team'),
+        ),
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Project name', max_length=100)),
+                ('slug', models.SlugField(help_text='URL-friendly project identifier', max_length=100, unique=True)),
+                ('description', models.TextField(blank=True, help_text='Project description', null=True)),
+                ('color', models.CharField(default='#3b82f6', help_text='Hex color code for project', max_length=7)),
+                ('is_active', models.BooleanField(default=True, help_text='Is this project active?')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='projects', to=settings.AUTH_USER_MODEL)),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='projects', to='tasks.team')),
+            ],
+            options={
+                'verbose_name': 'Project',
+                'verbose_name_plural': 'Projects',
+                'db_table': 'day_planner_projects',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Owner'), ('admin', 'Administrator'), ('member', 'Member')], default='member', max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tasks.team')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'day_planner_team_memberships',
+            },
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='members',
+            field=models.ManyToManyField(related_name='teams', through='tasks.TeamMembership', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='TaskStatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project', models.CharField(blank=True, max_length=50, null=True)),
+                ('importance', models.CharField(choices=[('low', 'Low - Nice to have'), ('medium', 'Medium - Should do'), ('high', 'High - Must do'), ('critical', 'Critical - Urgent & Important')], max_length=10)),
+                ('completed', models.BooleanField()),
+                ('scheduled_date', models.DateField(blank=True, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_stat_counters', to=settings.AUTH_USER_MODEL)),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_stat_counters', to='tasks.team')),
+            ],
+            options={
+                'verbose_name': 'Task Stat Counter',
+                'verbose_name_plural': 'Task Stat Counters',
+                'db_table': 'day_planner_task_stat_counters',
+                'unique_together': {('user', 'team', 'project', 'importance', 'completed', 'scheduled_date')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['scheduled_date', 'scheduled_start_time', 'scheduled_end_time'], name='day_planner_schedul_0c546c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'completed'], name='day_planner_user_id_a4b657_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['importance', 'completed'], name='day_planner_importa_a32627_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'completed'], name='day_planner_project_e3fec6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['has_specific_time'], name='day_planner_has_spe_dec24a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team'], name='day_planner_team_id_24985d_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='project',
+            unique_together={('user', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='teammembership',
+            unique_together={('user', 'team')},
+        ),
+    ]
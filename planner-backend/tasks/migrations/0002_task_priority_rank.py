@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+IMPORTANCE_RANKS = {
+    'low': 1,
+    'medium': 2,
+    'high': 3,
+    'critical': 4,
+}
+
+
+def populate_priority_rank(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    for importance, rank in IMPORTANCE_RANKS.items():
+        Task.objects.filter(importance=importance).update(priority_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['-priority_rank', '-scheduled_date', '-scheduled_start_time'], 'verbose_name': 'Task', 'verbose_name_plural': 'Tasks'},
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=2, editable=False, help_text='Numeric urgency derived from importance'),
+        ),
+        migrations.RunPython(populate_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['priority_rank', 'created_at'], name='day_planner_priorit_631604_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'priority_rank', 'created_at'], name='day_planner_user_id_baad04_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['scheduled_date', 'priority_rank', 'created_at'], name='day_planner_schedul_bcdd86_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'priority_rank', 'created_at'], name='day_planner_project_4380a5_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'day_planner_task_search'
+
+COMMENTS_FOR = """coalesce((SELECT group_concat(comment, ' ')
+                          FROM day_planner_task_comments WHERE task_id = {task_id}), '')"""
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        title, description, comments, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_task_insert AFTER INSERT ON day_planner_tasks BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, description, comments)
+        VALUES (new.id, new.title, coalesce(new.description, ''), '');
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_task_update AFTER UPDATE OF title, description ON day_planner_tasks BEGIN
+        UPDATE {SEARCH_TABLE} SET title = new.title, description = coalesce(new.description, '')
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_task_delete AFTER DELETE ON day_planner_tasks BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_comment_insert AFTER INSERT ON day_planner_task_comments BEGIN
+        UPDATE {SEARCH_TABLE} SET comments = {COMMENTS_FOR.format(task_id='new.task_id')}
+        WHERE rowid = new.task_id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_comment_update AFTER UPDATE ON day_planner_task_comments BEGIN
+        UPDATE {SEARCH_TABLE} SET comments = {COMMENTS_FOR.format(task_id='old.task_id')}
+        WHERE rowid = old.task_id;
+        UPDATE {SEARCH_TABLE} SET comments = {COMMENTS_FOR.format(task_id='new.task_id')}
+        WHERE rowid = new.task_id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_comment_delete AFTER DELETE ON day_planner_task_comments BEGIN
+        UPDATE {SEARCH_TABLE} SET comments = {COMMENTS_FOR.format(task_id='old.task_id')}
+        WHERE rowid = old.task_id;
+    END""",
+    f"""INSERT INTO {SEARCH_TABLE} (rowid, title, description, comments)
+        SELECT t.id, t.title, coalesce(t.description, ''), {COMMENTS_FOR.format(task_id='t.id')}
+        FROM day_planner_tasks t""",
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{name}'
+    for name in ('task_insert', 'task_update', 'task_delete', 'comment_insert', 'comment_update', 'comment_delete')
+] + [f'DROP TABLE IF EXISTS {SEARCH_TABLE}']
+
+
+def create_search_table(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases use the icontains fallback in tasks/search.py
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_priority_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_task_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'scheduled_date'], name='day_planner_user_id_05533c_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_user_scheduled_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Task Tombstone',
+                'verbose_name_plural': 'Task Tombstones',
+                'db_table': 'day_planner_task_tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'updated_at'], name='day_planner_user_id_532b40_idx'),
+        ),
+        migrations.AddField(
+            model_name='tasktombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='day_planner_user_id_00014a_idx'),
+        ),
+    ]
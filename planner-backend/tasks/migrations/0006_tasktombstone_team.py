@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_sync_tombstones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasktombstone',
+            name='team',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_tombstones', to='tasks.team'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['team', 'deleted_at'], name='day_planner_team_id_dbcc5e_idx'),
+        ),
+    ]
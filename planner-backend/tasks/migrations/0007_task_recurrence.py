@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:32
+
+import importlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+search_migration = importlib.import_module('tasks.migrations.0003_task_search')
+
+
+def create_task_search_triggers(apps, schema_editor):
+    # SQLite may add or drop the column by rebuilding day_planner_tasks, which drops its triggers
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in search_migration.CREATE_SQL:
+        if 'TRIGGER' in statement and 'ON day_planner_tasks' in statement:
+            schema_editor.execute(statement.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS', 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_tasktombstone_team'),
+    ]
+
+    operations = [
+        # Reversing the AddField rebuilds the table again
+        migrations.RunPython(migrations.RunPython.noop, create_task_search_triggers),
+        migrations.AddField(
+            model_name='task',
+            name='is_recurring',
+            field=models.BooleanField(default=False, editable=False, help_text='Is this the template of a recurring task?'),
+        ),
+        migrations.RunPython(create_task_search_triggers, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='TaskRecurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Repeat every this many days/weeks/months')),
+                ('weekdays', models.PositiveSmallIntegerField(default=0, help_text="Weekly rules: bit 0 is Monday to bit 6 Sunday; 0 repeats on the first date's weekday")),
+                ('until', models.DateField(blank=True, help_text='Last possible occurrence date', null=True)),
+                ('count', models.PositiveIntegerField(blank=True, help_text='Number of occurrences', null=True)),
+                ('ends_on', models.DateField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recurrence', to='tasks.task')),
+            ],
+            options={
+                'verbose_name': 'Task Recurrence',
+                'verbose_name_plural': 'Task Recurrences',
+                'db_table': 'day_planner_task_recurrences',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskOccurrenceException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_date', models.DateField(help_text='Date of the occurrence according to the rule')),
+                ('cancelled', models.BooleanField(default=False, help_text='Is this occurrence skipped?')),
+                ('completed', models.BooleanField(blank=True, null=True)),
+                ('scheduled_date', models.DateField(blank=True, help_text='Date the occurrence was moved to', null=True)),
+                ('scheduled_start_time', models.TimeField(blank=True, null=True)),
+                ('scheduled_end_time', models.TimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrence_exceptions', to='tasks.task')),
+            ],
+            options={
+                'verbose_name': 'Task Occurrence Exception',
+                'verbose_name_plural': 'Task Occurrence Exceptions',
+                'db_table': 'day_planner_task_occurrence_exceptions',
+                'indexes': [models.Index(fields=['scheduled_date'], name='day_planner_schedul_e21c14_idx')],
+                'unique_together': {('task', 'original_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_task_recurrence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['task', '-created_at', '-id'], name='day_planner_task_id_67f8b6_idx'),
+        ),
+    ]
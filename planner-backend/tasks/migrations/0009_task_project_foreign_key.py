@@ -0,0 +1,130 @@
+import importlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+recurrence_migration = importlib.import_module('tasks.migrations.0007_task_recurrence')
+
+# PROJECT_INFO and DEFAULT_COLOR as of this migration
+BUILTIN_PROJECTS = {
+    'work': {'name': 'Work Tasks', 'color': '#3b82f6'},
+    'personal': {'name': 'Personal', 'color': '#10b981'},
+    'learning': {'name': 'Learning & Development', 'color': '#f59e0b'},
+    'health': {'name': 'Health & Fitness', 'color': '#ef4444'},
+    'finance': {'name': 'Finance & Planning', 'color': '#8b5cf6'},
+    'home': {'name': 'Home & Family', 'color': '#06b6d4'},
+}
+DEFAULT_COLOR = '#6b7280'
+
+COUNTER_KEY_FIELDS = ('user', 'team', 'project', 'importance', 'completed', 'scheduled_date')
+
+
+def link_projects(apps, schema_editor):
+    """Point each task at the Project with its slug, creating missing ones for the slug's first user"""
+    Project = apps.get_model('tasks', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    slugs = Task.objects.exclude(project__isnull=True).exclude(project='').order_by().values_list('project', flat=True)
+    for slug in sorted(set(slugs)):
+        tasks = Task.objects.filter(project=slug)
+        project = Project.objects.filter(slug=slug).first()
+        if project is None:
+            user_id = tasks.order_by('id').values_list('user_id', flat=True).first()
+            info = BUILTIN_PROJECTS.get(slug, {'name': slug.title(), 'color': DEFAULT_COLOR})
+            name = info['name']
+            if Project.objects.filter(user_id=user_id, name=name).exists():
+                name = f'{name} ({slug})'
+            project = Project.objects.create(slug=slug, name=name, color=info['color'], user_id=user_id)
+        tasks.update(project_ref=project.id)
+
+
+def unlink_projects(apps, schema_editor):
+    """Copy each task's project slug back; projects created on the way forward are kept"""
+    Project = apps.get_model('tasks', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    for project_id, slug in Project.objects.filter(id__in=Task.objects.values('project_ref')).values_list('id', 'slug'):
+        Task.objects.filter(project_ref=project_id).update(project=slug)
+
+
+def clear_counters(apps, schema_editor):
+    apps.get_model('tasks', 'TaskStatCounter').objects.all().delete()
+
+
+def rebuild_counters(apps, schema_editor):
+    """TaskStatCounter.rebuild for whichever project column the counters have at this point"""
+    Task = apps.get_model('tasks', 'Task')
+    TaskStatCounter = apps.get_model('tasks', 'TaskStatCounter')
+    attnames = [TaskStatCounter._meta.get_field(name).attname for name in COUNTER_KEY_FIELDS]
+    rows = Task.objects.order_by().values_list(*attnames).annotate(total=models.Count('id'))
+    TaskStatCounter.objects.all().delete()
+    TaskStatCounter.objects.bulk_create(
+        TaskStatCounter(count=row[-1], **dict(zip(attnames, row[:-1]))) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_taskcomment_task_created_index'),
+    ]
+
+    operations = [
+        # Dropping or restoring the project column rebuilds day_planner_tasks on SQLite, dropping its triggers
+        migrations.RunPython(migrations.RunPython.noop, recurrence_migration.create_task_search_triggers),
+        # Counters are derived data: drop them, swap their column and count again at the end
+        migrations.RunPython(clear_counters, rebuild_counters),
+        migrations.AlterUniqueTogether(
+            name='taskstatcounter',
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name='taskstatcounter',
+            name='project',
+        ),
+        migrations.AddField(
+            model_name='taskstatcounter',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_stat_counters', to='tasks.project'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='taskstatcounter',
+            unique_together={('user', 'team', 'project', 'importance', 'completed', 'scheduled_date')},
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='project_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tasks.project'),
+        ),
+        migrations.RunPython(link_projects, unlink_projects),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='day_planner_project_e3fec6_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='day_planner_project_4380a5_idx',
+        ),
+        migrations.RemoveField(
+            model_name='task',
+            name='project',
+        ),
+        migrations.RenameField(
+            model_name='task',
+            old_name='project_ref',
+            new_name='project',
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='project',
+            field=models.ForeignKey(blank=True, help_text='Project the task is filed under', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='tasks.project'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'completed'], name='day_planner_project_b9a88a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'priority_rank', 'created_at'], name='day_planner_project_3ad510_idx'),
+        ),
+        migrations.RunPython(rebuild_counters, clear_counters),
+        migrations.RunPython(recurrence_migration.create_task_search_triggers, migrations.RunPython.noop),
+    ]
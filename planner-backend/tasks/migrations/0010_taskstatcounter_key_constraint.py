@@ -0,0 +1,29 @@
+import datetime
+import importlib
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+project_migration = importlib.import_module('tasks.migrations.0009_task_project_foreign_key')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_task_project_foreign_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Merge any duplicate rows the old constraint let through before enforcing the key
+        migrations.RunPython(project_migration.rebuild_counters, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='taskstatcounter',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='taskstatcounter',
+            constraint=models.UniqueConstraint(models.F('user'), django.db.models.functions.comparison.Coalesce('team', models.Value(0), output_field=models.IntegerField()), django.db.models.functions.comparison.Coalesce('project', models.Value(0), output_field=models.IntegerField()), models.F('importance'), models.F('completed'), django.db.models.functions.comparison.Coalesce('scheduled_date', models.Value(datetime.date(1, 1, 1)), output_field=models.DateField()), name='day_planner_task_stat_counter_key'),
+        ),
+    ]
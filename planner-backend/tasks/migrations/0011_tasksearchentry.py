@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_taskstatcounter_key_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSearchEntry',
+            fields=[
+                ('task', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='tasks.task')),
+                ('document', models.TextField(db_column='day_planner_task_search', editable=False)),
+            ],
+            options={
+                'db_table': 'day_planner_task_search',
+                'managed': False,
+            },
+        ),
+    ]
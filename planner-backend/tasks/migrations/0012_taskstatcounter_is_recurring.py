@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:24
+
+import datetime
+import importlib
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+project_migration = importlib.import_module('tasks.migrations.0009_task_project_foreign_key')
+
+COUNTER_KEY_FIELDS = project_migration.COUNTER_KEY_FIELDS + ('is_recurring',)
+
+
+def rebuild_counters(apps, schema_editor):
+    """TaskStatCounter.rebuild with recurring templates under their own keys"""
+    Task = apps.get_model('tasks', 'Task')
+    TaskStatCounter = apps.get_model('tasks', 'TaskStatCounter')
+    attnames = [TaskStatCounter._meta.get_field(name).attname for name in COUNTER_KEY_FIELDS]
+    rows = Task.objects.order_by().values_list(*attnames).annotate(total=models.Count('id'))
+    TaskStatCounter.objects.all().delete()
+    TaskStatCounter.objects.bulk_create(
+        TaskStatCounter(count=row[-1], **dict(zip(attnames, row[:-1]))) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_tasksearchentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Counters are derived data: drop them, widen their key and count again at the end
+        migrations.RunPython(project_migration.clear_counters, project_migration.rebuild_counters),
+        migrations.RemoveConstraint(
+            model_name='taskstatcounter',
+            name='day_planner_task_stat_counter_key',
+        ),
+        migrations.AddField(
+            model_name='taskstatcounter',
+            name='is_recurring',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='taskstatcounter',
+            constraint=models.UniqueConstraint(models.F('user'), django.db.models.functions.comparison.Coalesce('team', models.Value(0), output_field=models.IntegerField()), django.db.models.functions.comparison.Coalesce('project', models.Value(0), output_field=models.IntegerField()), models.F('importance'), models.F('completed'), django.db.models.functions.comparison.Coalesce('scheduled_date', models.Value(datetime.date(1, 1, 1)), output_field=models.DateField()), models.F('is_recurring'), name='day_planner_task_stat_counter_key'),
+        ),
+        migrations.RunPython(rebuild_counters, project_migration.clear_counters),
+    ]
@@ -1,7 +1,29 @@
-from django.db import models
+import datetime
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+class SubqueryCount(Subquery):
+    """Row count of a correlated subquery, usable in annotate()"""
+    template = "(SELECT COUNT(*) FROM (%(subquery)s) _count)"
+    output_field = IntegerField()
+
+class TeamQuerySet(models.QuerySet):
+
+    def with_counts(self):
+        """Annotate the values behind member_count and task_count"""
+        return self.annotate(
+            num_members=SubqueryCount(
+                TeamMembership.objects.filter(team=OuterRef('pk'), is_active=True).values('pk')
+            ),
+            num_tasks=SubqueryCount(
+                Task.objects.filter(user__teammembership__team=OuterRef('pk')).values('pk')
+            ),
+        )
+
 class Team(models.Model):
     """Team model for organizing users"""
     name = models.CharField(max_length=100, help_text="Team name")
@@ -14,6 +36,8 @@ class Team(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TeamQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
         db_table = 'day_planner_teams'
@@ -25,10 +49,15 @@ class Team(models.Model):
 
     @property
     def member_count(self):
+        # Set by TeamQuerySet.with_counts()
+        if 'num_members' in self.__dict__:
+            return self.num_members
         return self.teammembership_set.filter(is_active=True).count()
 
     @property
     def task_count(self):
+        if 'num_tasks' in self.__dict__:
+            return self.num_tasks
         return Task.objects.filter(user__in=self.members.all()).count()
 
 class TeamMembership(models.Model):
@@ -52,6 +81,16 @@ class TeamMembership(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.team.name} ({self.role})"
 
+class ProjectQuerySet(models.QuerySet):
+
+    def with_counts(self):
+        """Annotate the values behind the task count properties"""
+        project_tasks = Task.objects.filter(project=OuterRef('pk'))
+        return self.annotate(
+            num_tasks=SubqueryCount(project_tasks.values('pk')),
+            num_completed_tasks=SubqueryCount(project_tasks.filter(completed=True).values('pk')),
+        )
+
 class Project(models.Model):
     """Project model for task categorization"""
     name = models.CharField(max_length=100, help_text="Project name")
@@ -65,6 +104,8 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProjectQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
         db_table = 'day_planner_projects'
@@ -77,14 +118,21 @@ class Project(models.Model):
 
     @property
     def task_count(self):
+        # Set by ProjectQuerySet.with_counts()
+        if 'num_tasks' in self.__dict__:
+            return self.num_tasks
         return self.tasks.count()
 
     @property
     def completed_task_count(self):
+        if 'num_completed_tasks' in self.__dict__:
+            return self.num_completed_tasks
         return self.tasks.filter(completed=True).count()
 
     @property
     def pending_task_count(self):
+        if 'num_tasks' in self.__dict__ and 'num_completed_tasks' in self.__dict__:
+            return self.num_tasks - self.num_completed_tasks
         return self.tasks.filter(completed=False).count()
 
 class Category(models.Model):
@@ -100,6 +148,89 @@ class Category(models.Model):
     def __str__(self):
         return self.name
     
+DEFAULT_COLOR = '#6b7280'
+
+IMPORTANCE_COLORS = {
+    'low': '#10b981',      # green
+    'medium': '#f59e0b',   # yellow/amber
+    'high': '#f97316',     # orange
+    'critical': '#ef4444', # red
+}
+
+# Built-in projects the web client offers, created on first use (see project_cache.resolve)
+PROJECT_INFO = {
+    'work': {'name': 'Work Tasks', 'color': '#3b82f6'},
+    'personal': {'name': 'Personal', 'color': '#10b981'},
+    'learning': {'name': 'Learning & Development', 'color': '#f59e0b'},
+    'health': {'name': 'Health & Fitness', 'color': '#ef4444'},
+    'finance': {'name': 'Finance & Planning', 'color': '#8b5cf6'},
+    'home': {'name': 'Home & Family', 'color': '#06b6d4'},
+}
+
+def format_duration(hours, minutes):
+    """Human readable duration, e.g. '1 hour 30 min'"""
+    hours = hours or 0
+    minutes = minutes or 0
+
+    if hours == 0 and minutes == 0:
+        return "Duration not specified"
+
+    parts = []
+    if hours > 0:
+        part = f"{hours} hour" if hours == 1 else f"{hours} hours"
+        parts.append(part)
+    if minutes > 0:
+        part = f"{minutes} min" if minutes < 60 else f"{minutes} minutes"
+        parts.append(part)
+
+    return " ".join(parts)
+
+class TaskQuerySet(models.QuerySet):
+    """Queryset helpers that push per-task property logic into SQL"""
+
+    @staticmethod
+    def overdue_condition(now=None):
+        """SQL equivalent of ``Task.is_overdue`` evaluated at ``now``"""
+        now = now or timezone.now()
+        today = now.date()
+        # A recurring template is never overdue itself; its occurrences are checked as they are expanded
+        return Q(completed=False, scheduled_date__isnull=False, is_recurring=False) & (
+            Q(scheduled_date__lt=today)
+            | Q(
+                scheduled_date=today,
+                has_specific_time=True,
+                scheduled_end_time__isnull=False,
+                scheduled_end_time__lt=now.time(),
+            )
+        )
+
+    def overdue(self, now=None):
+        return self.filter(self.overdue_condition(now))
+
+    def recurring_between(self, start, end):
+        """Recurring templates that may have an occurrence between ``start`` and ``end``
+
+        Rules that end before the window are left out unless an exception moves one
+        of their occurrences into it.
+        """
+        moved_in = TaskOccurrenceException.objects.filter(scheduled_date__range=(start, end)).values('task_id')
+        return self.filter(is_recurring=True).filter(
+            Q(scheduled_date__lte=end) & (Q(recurrence__ends_on__isnull=True) | Q(recurrence__ends_on__gte=start))
+            | Q(id__in=moved_in)
+        )
+
+    def with_overdue(self, now=None):
+        """Annotate ``overdue_flag`` so ``is_overdue`` needs no clock reads per row"""
+        return self.annotate(
+            overdue_flag=ExpressionWrapper(self.overdue_condition(now), output_field=models.BooleanField())
+        )
+
+    def with_comment_count(self):
+        """Annotate ``comment_count`` with one correlated subquery instead of a count per task"""
+        return self.annotate(
+            comment_count=SubqueryCount(TaskComment.objects.filter(task=OuterRef('pk')).values('pk'))
+        )
+
 class Task(models.Model):
     title = models.CharField(max_length=200, help_text="What needs to be done?")
     description = models.TextField(
@@ -164,6 +295,20 @@ class Task(models.Model):
         help_text="How important is this task?"
     )
 
+    # Higher is more urgent; sorts and indexes properly, unlike the importance string
+    IMPORTANCE_RANKS = {
+        'low': 1,
+        'medium': 2,
+        'high': 3,
+        'critical': 4,
+    }
+
+    priority_rank = models.PositiveSmallIntegerField(
+        default=2,
+        editable=False,
+        help_text="Numeric urgency derived from importance"
+    )
+
     category = models.ForeignKey(
         Category, 
         on_delete=models.SET_NULL,
@@ -171,21 +316,33 @@ class Task(models.Model):
         blank=True
     )
 
-    project = models.CharField(
-        max_length=50,
-        blank=True,
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.SET_NULL,
         null=True,
-        help_text="Project/category identifier (work, personal, etc.)"
+        blank=True,
+        related_name='tasks',
+        help_text="Project the task is filed under"
     )
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks')
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='tasks', null=True, blank=True)
 
+    # Template of a recurring task: its TaskRecurrence rule is expanded on read and
+    # scheduled_date is the first occurrence (see tasks/recurrence.py)
+    is_recurring = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text="Is this the template of a recurring task?"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-importance', '-scheduled_date', '-scheduled_start_time']
+        ordering = ['-priority_rank', '-scheduled_date', '-scheduled_start_time']
         db_table = 'day_planner_tasks'
         verbose_name = 'Task'
         verbose_name_plural = 'Tasks'
@@ -197,6 +354,17 @@ class Task(models.Model):
             models.Index(fields=['project', 'completed']),
             models.Index(fields=['has_specific_time']),
             models.Index(fields=['team']),
+            # Serve the list ordering (-priority_rank, -created_at, -id) straight from an index.
+            # ``completed`` is left out: Django renders completed=False as NOT completed,
+            # which SQLite cannot use as an index equality, and it would break the id tiebreak.
+            models.Index(fields=['priority_rank', 'created_at']),
+            models.Index(fields=['user', 'priority_rank', 'created_at']),
+            models.Index(fields=['scheduled_date', 'priority_rank', 'created_at']),
+            models.Index(fields=['project', 'priority_rank', 'created_at']),
+            # One user's date range, read by the scheduling engine
+            models.Index(fields=['user', 'scheduled_date']),
+            # Rows changed since a sync watermark
+            models.Index(fields=['user', 'updated_at']),
         ]
 
     def __str__(self):
@@ -206,7 +374,11 @@ class Task(models.Model):
     @property
     def is_overdue(self):
         """Check if task is overdue"""
-        if self.completed or not self.scheduled_date:
+        # Rows loaded through TaskQuerySet.with_overdue() carry the answer already
+        if 'overdue_flag' in self.__dict__:
+            return bool(self.overdue_flag)
+
+        if self.completed or not self.scheduled_date or self.is_recurring:
             return False
             
         today = timezone.now().date()
@@ -240,54 +412,20 @@ class Task(models.Model):
     def formatted_duration(self):
         """Get formatted duration string for duration-based tasks"""
         if not self.has_specific_time:
-            hours = self.duration_hours or 0
-            minutes = self.duration_minutes or 0
-            
-            if hours == 0 and minutes == 0:
-                return "Duration not specified"
-            
-            parts = []
-            if hours > 0:
-                part = f"{hours} hour" if hours == 1 else f"{hours} hours"
-                parts.append(part)
-            if minutes > 0:
-                part = f"{minutes} min" if minutes < 60 else f"{minutes} minutes"
-                parts.append(part)
-            
-            return " ".join(parts)
+            return format_duration(self.duration_hours, self.duration_minutes)
         return None
     
     @property
     def importance_color(self):
         """Get color for importance level"""
-        colors = {
-            'low': '#10b981',      # green
-            'medium': '#f59e0b',   # yellow/amber
-            'high': '#f97316',     # orange
-            'critical': '#ef4444', # red
-        }
-        return colors.get(self.importance, '#6b7280')
+        return IMPORTANCE_COLORS.get(self.importance, DEFAULT_COLOR)
     
     @property
     def project_info(self):
-        """Get project information - returns dict with name, color, icon"""
-        if not self.project:
-            return None
-            
-        projects = {
-            'work': {'name': 'Work Tasks', 'color': '#3b82f6'},
-            'personal': {'name': 'Personal', 'color': '#10b981'},
-            'learning': {'name': 'Learning & Development', 'color': '#f59e0b'},
-            'health': {'name': 'Health & Fitness', 'color': '#ef4444'},
-            'finance': {'name': 'Finance & Planning', 'color': '#8b5cf6'},
-            'home': {'name': 'Home & Family', 'color': '#06b6d4'},
-        }
-        
-        return projects.get(self.project, {
-            'name': self.project.title(),
-            'color': '#6b7280',
-            'icon': '📁'
-        })
+        """Get project information - returns dict with name and color"""
+        from . import project_cache
+
+        return project_cache.info(self.project_id)
     
     def mark_as_completed(self):
         self.completed = True
@@ -306,7 +444,13 @@ class Task(models.Model):
     def clean(self):
         """Model validation"""
         from django.core.exceptions import ValidationError
+
+        # Keep the sortable rank in step with importance (bulk writes run clean() too)
+        self.priority_rank = self.IMPORTANCE_RANKS.get(self.importance, self.IMPORTANCE_RANKS['medium'])
         
+        if self.is_recurring and not self.scheduled_date:
+            raise ValidationError("Recurring tasks need a scheduled date")
+
         # Validate time/duration logic
         if self.has_specific_time:
             # Clear duration fields if using specific time
@@ -321,10 +465,20 @@ class Task(models.Model):
             if total_minutes <= 0:
                 raise ValidationError("Duration must be greater than 0 minutes")
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stats key as loaded so saves can move counters without a lookup
+        if not instance.get_deferred_fields().intersection(TaskStatCounter.KEY_ATTNAMES):
+            instance._loaded_stat_key = TaskStatCounter.key_for(instance)
+        return instance
+
     def save(self, *args, **kwargs):
         """Override save to run validation"""
         self.full_clean()
-        super().save(*args, **kwargs)
+        # Keep TaskStatCounter changes in the same transaction as the row itself
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 class TaskComment(models.Model):
@@ -346,4 +500,249 @@ class TaskComment(models.Model):
         db_table = 'day_planner_task_comments'
         verbose_name = 'Task Comment'
         verbose_name_plural = 'Task Comments'
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # A task's comments newest first, for keyset pages on (created_at, id)
+            models.Index(fields=['task', '-created_at', '-id']),
+        ]
+
+
+class TaskRecurrence(models.Model):
+    """Repeat rule of a recurring task's template; occurrences are never stored"""
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
+
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, related_name='recurrence')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1, help_text="Repeat every this many days/weeks/months")
+    weekdays = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Weekly rules: bit 0 is Monday to bit 6 Sunday; 0 repeats on the first date's weekday"
+    )
+    until = models.DateField(blank=True, null=True, help_text="Last possible occurrence date")
+    count = models.PositiveIntegerField(blank=True, null=True, help_text="Number of occurrences")
+    # Date of the last occurrence from until or count, so window queries can skip finished rules
+    ends_on = models.DateField(blank=True, null=True, editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'day_planner_task_recurrences'
+        verbose_name = 'Task Recurrence'
+        verbose_name_plural = 'Task Recurrences'
+
+    def __str__(self):
+        return f"{self.get_frequency_display()} every {self.interval} for task {self.task_id}"
+
+
+class TaskOccurrenceException(models.Model):
+    """Change to one occurrence of a recurring task, keyed by the date the rule gives it
+
+    Only occurrences that differ from the template have a row. Empty fields keep
+    the template's value.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='occurrence_exceptions')
+    original_date = models.DateField(help_text="Date of the occurrence according to the rule")
+    cancelled = models.BooleanField(default=False, help_text="Is this occurrence skipped?")
+    completed = models.BooleanField(blank=True, null=True)
+    scheduled_date = models.DateField(blank=True, null=True, help_text="Date the occurrence was moved to")
+    scheduled_start_time = models.TimeField(blank=True, null=True)
+    scheduled_end_time = models.TimeField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'day_planner_task_occurrence_exceptions'
+        verbose_name = 'Task Occurrence Exception'
+        verbose_name_plural = 'Task Occurrence Exceptions'
+        unique_together = ['task', 'original_date']
+        indexes = [
+            # Occurrences moved into a window
+            models.Index(fields=['scheduled_date']),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} on {self.original_date}"
+
+
+class TaskSearchEntry(models.Model):
+    """A task's row in the SQLite FTS5 index, which migration 0003 creates and triggers maintain
+
+    Read-only and unmanaged; it exists so querysets can join the index (see search.py).
+    """
+    task = models.OneToOneField(
+        Task, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', db_constraint=False,
+        related_name='search_entry',
+    )
+    # FTS5's hidden column named after the table: the left side of MATCH and bm25()'s first argument
+    document = models.TextField(db_column='day_planner_task_search', editable=False)
+
+    class Meta:
+        managed = False
+        db_table = 'day_planner_task_search'
+
+
+class TaskTombstone(models.Model):
+    """Id of a deleted task, kept so delta sync can tell clients to drop it"""
+    task_id = models.BigIntegerField()
+    # No FK constraint: tombstones written while a user's tasks cascade must outlive the user row
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_tombstones', db_constraint=False)
+    team = models.ForeignKey(
+        Team, on_delete=models.CASCADE, related_name='task_tombstones', db_constraint=False, null=True, blank=True,
+    )
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'day_planner_task_tombstones'
+        verbose_name = 'Task Tombstone'
+        verbose_name_plural = 'Task Tombstones'
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+            models.Index(fields=['team', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} deleted at {self.deleted_at}"
+
+
+class TaskStatCounter(models.Model):
+    """Number of tasks per stats key, maintained on every Task write
+
+    Recurring templates are counted under their own keys so stats can leave them out.
+    """
+    KEY_ATTNAMES = ('user_id', 'team_id', 'project_id', 'importance', 'completed', 'scheduled_date', 'is_recurring')
+    # Distinct keys from which apply_deltas reads and writes counters in bulk
+    BULK_DELTA_THRESHOLD = 50
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_stat_counters')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='task_stat_counters', null=True, blank=True)
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name='task_stat_counters', null=True, blank=True
+    )
+    importance = models.CharField(max_length=10, choices=Task.IMPORTANCE_CHOICES)
+    completed = models.BooleanField()
+    scheduled_date = models.DateField(blank=True, null=True)
+    is_recurring = models.BooleanField(default=False)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'day_planner_task_stat_counters'
+        verbose_name = 'Task Stat Counter'
+        verbose_name_plural = 'Task Stat Counters'
+        constraints = [
+            # One row per key. The nullable columns are coalesced because NULLs never
+            # compare equal in a plain unique constraint (nulls_distinct=False is not
+            # available on SQLite).
+            models.UniqueConstraint(
+                'user',
+                Coalesce('team', Value(0), output_field=IntegerField()),
+                Coalesce('project', Value(0), output_field=IntegerField()),
+                'importance',
+                'completed',
+                Coalesce('scheduled_date', Value(datetime.date.min), output_field=models.DateField()),
+                'is_recurring',
+                name='day_planner_task_stat_counter_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.importance}/{self.project_id or 'unassigned'} ({self.scheduled_date}): {self.count}"
+
+    @classmethod
+    def key_for(cls, task):
+        """Counter key of a task as a tuple in ``KEY_ATTNAMES`` order"""
+        return tuple(getattr(task, attname) for attname in cls.KEY_ATTNAMES)
+
+    @classmethod
+    def apply_delta(cls, key, delta):
+        """Add ``delta`` to the counter for ``key``, creating it when needed"""
+        lookup = dict(zip(cls.KEY_ATTNAMES, key))
+        updated = cls.objects.filter(**lookup).update(count=F('count') + delta)
+        # Nothing to decrement if the row is already gone (e.g. cascading user delete)
+        if updated or delta <= 0:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # Another writer created the row between the UPDATE and the INSERT
+            cls.objects.filter(**lookup).update(count=F('count') + delta)
+
+    @classmethod
+    def apply_deltas(cls, changes):
+        """Apply many (old_key, new_key) moves with one write per distinct key"""
+        deltas = {}
+        for old_key, new_key in changes:
+            if old_key == new_key:
+                continue
+            if old_key is not None:
+                deltas[old_key] = deltas.get(old_key, 0) - 1
+            if new_key is not None:
+                deltas[new_key] = deltas.get(new_key, 0) + 1
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if len(deltas) >= cls.BULK_DELTA_THRESHOLD:
+            cls._apply_deltas_in_bulk(deltas)
+            return
+        for key, delta in deltas.items():
+            cls.apply_delta(key, delta)
+
+    @classmethod
+    def _apply_deltas_in_bulk(cls, deltas):
+        """apply_deltas for many keys: one read of the affected users' counters, then bulk writes"""
+        with transaction.atomic():
+            counters = {
+                cls.key_for(counter): counter
+                for counter in cls.objects.select_for_update().filter(user_id__in={key[0] for key in deltas})
+            }
+            changed, created = [], []
+            for key, delta in deltas.items():
+                counter = counters.get(key)
+                if counter is not None:
+                    counter.count += delta
+                    changed.append(counter)
+                elif delta > 0:
+                    created.append(cls(count=delta, **dict(zip(cls.KEY_ATTNAMES, key))))
+            cls.objects.bulk_update(changed, ['count'], batch_size=500)
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(created, batch_size=500)
+            except IntegrityError:
+                # A concurrent writer created some of these keys: add to those one by one
+                for counter in created:
+                    cls.apply_delta(cls.key_for(counter), counter.count)
+
+    @classmethod
+    def move(cls, old_key, new_key):
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            cls.apply_delta(old_key, -1)
+        if new_key is not None:
+            cls.apply_delta(new_key, 1)
+
+    @classmethod
+    def live_counts(cls):
+        """Counts per key computed from the Task table"""
+        rows = Task.objects.order_by().values_list(*cls.KEY_ATTNAMES).annotate(total=models.Count('id'))
+        return {tuple(row[:-1]): row[-1] for row in rows}
+
+    @classmethod
+    def stored_counts(cls):
+        """Non-zero counts per key as currently stored"""
+        rows = cls.objects.exclude(count=0).values_list(*cls.KEY_ATTNAMES, 'count')
+        return {tuple(row[:-1]): row[-1] for row in rows}
+
+    @classmethod
+    def rebuild(cls):
+        """Replace every counter with counts from the Task table"""
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                cls(count=total, **dict(zip(cls.KEY_ATTNAMES, key)))
+                for key, total in cls.live_counts().items()
+            )
@@ -0,0 +1,119 @@
+"""On-demand profiling of single requests by staff users
+
+With ``settings.REQUEST_PROFILING_DIR`` set, a staff user's request carrying an
+``X-Profile`` header or a ``profile`` query parameter runs under a profiler. Any
+other request goes through untouched. Each profiled request writes two files to
+the directory, and the response's ``X-Profile-Id`` header names them:
+
+* ``<id>.prof``: cProfile stats, for ``python -m pstats`` or snakeviz.
+* ``<id>.txt``: the top ``REQUEST_PROFILING_TOP`` functions by cumulative time.
+
+Asking for ``sample`` (``X-Profile: sample``) uses the pyinstrument sampling
+profiler, if it is installed, and writes ``<id>.html`` plus a text summary.
+
+Without the setting the middleware removes itself and costs nothing. Only the
+thread running the view is profiled: async views under ASGI and streamed bodies
+are mostly not covered.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+
+
+def requested_mode(request):
+    """'cprofile', 'sample' or None for a request"""
+    value = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+    if not value or value.lower() in ('0', 'false', 'no'):
+        return None
+    if value.lower() == 'sample' and pyinstrument is not None:
+        return 'sample'
+    return 'cprofile'
+
+
+def profile_id(request):
+    path = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1_000_000:06d}-{request.method.lower()}-{path}"
+
+
+def top_functions(profiler, limit):
+    """pstats text of the ``limit`` functions with the most cumulative time"""
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return output.getvalue()
+
+
+class RequestProfilingMiddleware:
+    """Profile requests from staff users that ask for it; listed after AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = settings.REQUEST_PROFILING_DIR
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not request.user.is_staff:
+            return self.get_response(request)
+        # One profiler at a time: they hook the interpreter globally
+        if not self.lock.acquire(blocking=False):
+            logger.warning(f"Not profiling {request.method} {request.path}: another profile is running")
+            return self.get_response(request)
+        try:
+            return self.profile(request, mode)
+        finally:
+            self.lock.release()
+
+    def profile(self, request, mode):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile_id(request))
+        started = time.perf_counter()
+        if mode == 'sample':
+            response, summary = self.sample(request, base)
+        else:
+            response, summary = self.cprofile(request, base)
+        elapsed = time.perf_counter() - started
+
+        with open(f'{base}.txt', 'w') as output:
+            output.write(f"{request.method} {request.get_full_path()} -> {response.status_code} in {elapsed * 1000:.1f}ms\n\n")
+            output.write(summary)
+        response['X-Profile-Id'] = os.path.basename(base)
+        logger.info(f"Profiled {request.method} {request.path} ({mode}, {elapsed * 1000:.1f}ms) to {base}")
+        return response
+
+    def cprofile(self, request, base):
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+        profiler.dump_stats(f'{base}.prof')
+        return response, top_functions(profiler, settings.REQUEST_PROFILING_TOP)
+
+    def sample(self, request, base):
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        with open(f'{base}.html', 'w') as output:
+            output.write(profiler.output_html())
+        return response, profiler.output_text()
@@ -0,0 +1,126 @@
+"""Process-level cache of project metadata for serializing and filtering tasks
+
+Tasks store only ``project_id``. The API still speaks in project slugs and shows
+each project's name and color, which come from an in-memory map of every
+project. The map is read with one query and replaced whole, so serializing any
+number of tasks needs neither a join nor a per-row lookup.
+
+Saving or deleting a ``Project`` drops the map in this process (see signals.py).
+An id or slug the map does not know reloads it once, so projects created by
+other processes show up straight away; one still unknown after that is
+remembered as a miss until the map is dropped, so requests for unknown projects
+cannot reload the table each time. ``settings.PROJECT_CACHE_TIMEOUT`` bounds how
+long another process keeps serving a renamed, recoloured or deleted project, or
+a miss for a project it has created since.
+Writes resolve slugs against the table (see ``resolve``).
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from .models import PROJECT_INFO, Project
+
+ProjectMeta = namedtuple('ProjectMeta', 'id slug name color is_active')
+META_FIELDS = ('id', 'slug', 'name', 'color', 'is_active')
+
+# (loaded at, metadata by id, id by slug, misses); swapped whole, only misses grows
+_state = None
+BY_ID, BY_SLUG, MISSES = 1, 2, 3
+_load_lock = threading.Lock()
+
+
+def _load():
+    global _state
+    with _load_lock:
+        projects = {row[0]: ProjectMeta(*row) for row in Project.objects.order_by('name').values_list(*META_FIELDS)}
+        _state = (time.monotonic(), projects, {meta.slug: meta.id for meta in projects.values()}, set())
+    return _state
+
+
+def _current():
+    state = _state
+    if state is None or time.monotonic() - state[0] > settings.PROJECT_CACHE_TIMEOUT:
+        state = _load()
+    return state
+
+
+def invalidate():
+    global _state
+    _state = None
+
+
+def _lookup(index, key):
+    """``key`` in the map at ``index``, reloading once for a key not already known to miss"""
+    state = _current()
+    value = state[index].get(key)
+    if value is None and (index, key) not in state[MISSES]:
+        misses = state[MISSES]
+        state = _load()
+        value = state[index].get(key)
+        # Earlier misses carry over: the map is consulted first, so one that now exists is found
+        state[MISSES].update(misses)
+        if value is None:
+            state[MISSES].add((index, key))
+    return value
+
+
+def all_projects():
+    """Metadata of every project, by name"""
+    return list(_current()[BY_ID].values())
+
+
+def get(project_id):
+    """Metadata for a ``Task.project_id``, or None for no project"""
+    if project_id is None:
+        return None
+    return _lookup(BY_ID, project_id)
+
+
+def id_for_slug(slug):
+    """Id of the project with ``slug``, or None if there is none"""
+    return _lookup(BY_SLUG, slug)
+
+
+def slug(project_id):
+    meta = get(project_id)
+    return meta.slug if meta else None
+
+
+def info(project_id):
+    """Display metadata for a ``Task.project_id``: name and color, or None"""
+    meta = get(project_id)
+    return {'name': meta.name, 'color': meta.color} if meta else None
+
+
+def resolve(slug, user_id, create=True):
+    """``Task.project_id`` for a project slug from API input; raises ValueError
+
+    Reads the table rather than the map, so a write never points at a project
+    that was deleted since the map was loaded. The built-in slugs the web client
+    offers become projects of the user ``user_id`` the first time they are used;
+    with ``create=False`` such a slug gives None instead.
+    """
+    if not slug:
+        return None
+    if not isinstance(slug, str):
+        raise ValueError(f'project must be a project slug, got {slug!r}')
+    if slug in PROJECT_INFO:
+        return _get_or_create_builtin(slug, user_id, create)
+    project_id = Project.objects.filter(slug=slug).values_list('id', flat=True).first()
+    if project_id is None:
+        raise ValueError(f'Unknown project: {slug}')
+    return project_id
+
+
+def _get_or_create_builtin(slug, user_id, create):
+    project_id = Project.objects.filter(slug=slug).values_list('id', flat=True).first()
+    if project_id is not None or not create:
+        return project_id
+    info = PROJECT_INFO[slug]
+    name = info['name']
+    # Project names are unique per user; keep the user's own project and suffix ours, as migration 0009 does
+    if Project.objects.filter(user_id=user_id, name=name).exists():
+        name = f'{name} ({slug})'
+    return Project.objects.get_or_create(slug=slug, defaults={**info, 'name': name, 'user_id': user_id})[0].id
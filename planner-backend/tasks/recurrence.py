@@ -0,0 +1,239 @@
+"""Recurring tasks: a rule on a template task, expanded into occurrences on read
+
+A recurring task is stored once, as a template ``Task`` with ``is_recurring`` set
+and a ``TaskRecurrence`` rule; the template's ``scheduled_date`` is the first
+occurrence. Occurrences are not stored. Endpoints that read a date window (the
+agenda, the task list's ``date`` filter, scheduling, calendar feeds) generate the
+occurrences inside it from the rule, jumping straight to the window. Completing,
+moving, retiming or cancelling a single occurrence stores a
+``TaskOccurrenceException`` keyed by the occurrence's date under the rule, so
+storage is O(templates + exceptions) however long a rule runs.
+
+Monthly rules repeat on the first date's day of the month and skip months without
+that day, as RFC 5545 does. Exceptions for dates the rule no longer produces are
+ignored.
+"""
+import calendar
+import datetime
+import itertools
+from collections import namedtuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+from .models import TaskOccurrenceException, TaskRecurrence
+
+WEEKDAY_CODES = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+FREQUENCIES = [value for value, _ in TaskRecurrence.FREQUENCY_CHOICES]
+
+MAX_INTERVAL = 99
+MAX_COUNT = 500
+
+# A rule read alongside its template's row
+Rule = namedtuple('Rule', 'frequency interval weekdays ends_on')
+RULE_FIELDS = ('recurrence__frequency', 'recurrence__interval', 'recurrence__weekdays', 'recurrence__ends_on')
+
+Occurrence = namedtuple('Occurrence', 'task_id original_date date exception')
+
+
+def weekday_mask(codes):
+    """Bitmask for weekday codes such as ``['MO', 'WE']``; raises ValueError"""
+    mask = 0
+    for code in codes:
+        if not isinstance(code, str) or code.upper() not in WEEKDAY_CODES:
+            raise ValueError(f"weekdays must be codes from {', '.join(WEEKDAY_CODES)}, got {code!r}")
+        mask |= 1 << WEEKDAY_CODES.index(code.upper())
+    return mask
+
+
+def weekday_codes(mask):
+    return [code for index, code in enumerate(WEEKDAY_CODES) if mask & (1 << index)]
+
+
+def _whole_number(data, name, default, maximum):
+    value = data.get(name, default)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= maximum:
+        raise ValueError(f'{name} must be a whole number from 1 to {maximum}')
+    return value
+
+
+def rule_fields(data, first):
+    """``TaskRecurrence`` fields for a rule payload whose first occurrence is ``first``; raises ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    frequency = data.get('frequency')
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+    interval = _whole_number(data, 'interval', 1, MAX_INTERVAL) or 1
+
+    weekdays = data.get('weekdays') or []
+    if not isinstance(weekdays, list):
+        raise ValueError('weekdays must be a list')
+    if weekdays and frequency != 'weekly':
+        raise ValueError('weekdays only apply to weekly rules')
+    weekdays = weekday_mask(weekdays)
+
+    until = data.get('until')
+    count = _whole_number(data, 'count', None, MAX_COUNT)
+    if until is not None and count is not None:
+        raise ValueError('Pass at most one of until and count')
+    if until is not None:
+        try:
+            until = parse_date(until) if isinstance(until, str) else None
+        except ValueError:
+            until = None
+        if until is None:
+            raise ValueError(f"Invalid until date: {data['until']!r}")
+    check_first_date(first, weekdays, until)
+
+    return {
+        'frequency': frequency,
+        'interval': interval,
+        'weekdays': weekdays,
+        'until': until,
+        'count': count,
+        'ends_on': last_occurrence(first, frequency, interval, weekdays, until, count),
+    }
+
+
+def check_first_date(first, weekdays, until):
+    """Raise ValueError unless a rule with ``weekdays`` and ``until`` can start on ``first``"""
+    if weekdays and not weekdays & (1 << first.weekday()):
+        raise ValueError('The scheduled date must fall on one of the weekdays')
+    if until is not None and until < first:
+        raise ValueError('until must not be before the scheduled date')
+
+
+def occurrence_dates(first, rule, window_start, window_end):
+    """Dates ``rule`` gives from ``first`` that fall between ``window_start`` and ``window_end``, in order
+
+    Skips every period before the window arithmetically, so the cost depends on
+    the window and not on how long the rule has been running.
+    """
+    last = window_end if rule.ends_on is None else min(window_end, rule.ends_on)
+    start = max(first, window_start)
+    if start > last:
+        return
+
+    if rule.frequency == 'daily':
+        step = datetime.timedelta(days=rule.interval)
+        # Ceiling division: the first period on or after the window
+        day = first + step * -(-(start - first).days // rule.interval)
+        while day <= last:
+            yield day
+            day += step
+
+    elif rule.frequency == 'weekly':
+        weekdays = [index for index in range(7) if rule.weekdays & (1 << index)] or [first.weekday()]
+        week_start = first - datetime.timedelta(days=first.weekday())
+        period = (start - week_start).days // 7 // rule.interval
+        while True:
+            base = week_start + datetime.timedelta(weeks=period * rule.interval)
+            for weekday in weekdays:
+                day = base + datetime.timedelta(days=weekday)
+                if day > last:
+                    return
+                if day >= start:
+                    yield day
+            period += 1
+
+    else:
+        months = (start.year - first.year) * 12 + start.month - first.month
+        period = months // rule.interval
+        while True:
+            month_index = first.month - 1 + period * rule.interval
+            year, month = first.year + month_index // 12, month_index % 12 + 1
+            if datetime.date(year, month, 1) > last:
+                return
+            if first.day <= calendar.monthrange(year, month)[1]:
+                day = datetime.date(year, month, first.day)
+                if start <= day <= last:
+                    yield day
+            period += 1
+
+
+def last_occurrence(first, frequency, interval, weekdays, until=None, count=None):
+    """``ends_on`` for a rule: the date of its last occurrence, or None if it never ends"""
+    if count is not None:
+        open_rule = Rule(frequency, interval, weekdays, None)
+        dates = occurrence_dates(first, open_rule, first, datetime.date.max)
+        return next(itertools.islice(dates, count - 1, None))
+    return until
+
+
+def window_occurrences(templates, exceptions, start, end):
+    """Occurrences of ``templates`` landing between ``start`` and ``end`` once ``exceptions`` apply
+
+    ``templates`` maps template task ids to (first date, rule). ``exceptions`` are
+    their exception rows with an original or a moved date in the window.
+    """
+    overrides = {(exception.task_id, exception.original_date): exception for exception in exceptions}
+    for task_id, (first, rule) in templates.items():
+        for day in occurrence_dates(first, rule, start, end):
+            exception = overrides.pop((task_id, day), None)
+            if exception is None:
+                yield Occurrence(task_id, day, day, None)
+            elif not exception.cancelled:
+                moved_to = exception.scheduled_date or day
+                if start <= moved_to <= end:
+                    yield Occurrence(task_id, day, moved_to, exception)
+
+    # Left over: occurrences from outside the window moved into it
+    for (task_id, original_date), exception in overrides.items():
+        if exception.cancelled or exception.scheduled_date is None or not start <= exception.scheduled_date <= end:
+            continue
+        first, rule = templates[task_id]
+        if next(occurrence_dates(first, rule, original_date, original_date), None) is not None:
+            yield Occurrence(task_id, original_date, exception.scheduled_date, exception)
+
+
+def is_overdue(day, has_specific_time, end_time, completed, now):
+    """``Task.is_overdue`` for one occurrence"""
+    if completed:
+        return False
+    today = now.date()
+    if day < today:
+        return True
+    return day == today and has_specific_time and end_time is not None and end_time < now.time()
+
+
+def occurrence_rows(templates, start, end, fields, now):
+    """Rows in ``fields`` order for each occurrence of the recurring ``templates`` between ``start`` and ``end``
+
+    Each row is its template's with the date, times and completion of the
+    occurrence (and ``overdue_flag`` recomputed), followed by the occurrence's
+    original date. ``fields`` must include ``id`` and ``scheduled_date``. Reads
+    the templates and their exceptions with one query each, on first iteration.
+    """
+    query_fields = [name for name in fields if name != 'overdue_flag']
+    extra_fields = [name for name in ('has_specific_time', 'scheduled_end_time', 'completed') if name not in fields]
+    templates = templates.recurring_between(start, end).order_by()
+
+    bases = {}
+    rules = {}
+    for row in templates.values_list(*query_fields, *extra_fields, *RULE_FIELDS):
+        base = dict(zip(query_fields + extra_fields, row))
+        bases[base['id']] = base
+        rules[base['id']] = (base['scheduled_date'], Rule(*row[-len(RULE_FIELDS):]))
+    if not bases:
+        return
+
+    exceptions = TaskOccurrenceException.objects.filter(task__in=templates.values('id')).filter(
+        Q(original_date__range=(start, end)) | Q(scheduled_date__range=(start, end))
+    )
+    for occurrence in window_occurrences(rules, exceptions, start, end):
+        values = dict(bases[occurrence.task_id], scheduled_date=occurrence.date)
+        exception = occurrence.exception
+        if exception is not None:
+            if exception.completed is not None:
+                values['completed'] = exception.completed
+            if values['has_specific_time'] and exception.scheduled_start_time is not None:
+                values['scheduled_start_time'] = exception.scheduled_start_time
+            if values['has_specific_time'] and exception.scheduled_end_time is not None:
+                values['scheduled_end_time'] = exception.scheduled_end_time
+        values['overdue_flag'] = is_overdue(
+            occurrence.date, values['has_specific_time'], values['scheduled_end_time'], values['completed'], now,
+        )
+        yield (*(values[name] for name in fields), occurrence.original_date)
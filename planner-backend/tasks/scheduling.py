@@ -0,0 +1,178 @@
+"""Conflict detection, free slots and placement proposals for one user's tasks
+
+Times are handled as minutes since midnight; an end time at or before its start
+time is taken to run until midnight. Working hours default to
+``settings.PLANNER_WORKING_HOURS`` and can be overridden per call.
+"""
+import datetime
+import heapq
+import itertools
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+
+from .models import Task
+from .recurrence import occurrence_rows
+
+MINUTES_PER_DAY = 24 * 60
+
+Interval = namedtuple('Interval', 'start end task_id')
+Conflict = namedtuple('Conflict', 'first_id second_id start end')
+PendingTask = namedtuple('PendingTask', 'task_id minutes priority_rank scheduled_date')
+
+SCHEDULE_FIELDS = (
+    'id', 'scheduled_date', 'has_specific_time', 'scheduled_start_time', 'scheduled_end_time',
+    'duration_hours', 'duration_minutes', 'priority_rank', 'completed',
+)
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def format_minutes(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def parse_clock(value):
+    """Minutes since midnight for 'HH:MM'; '24:00' is accepted as the end of the day"""
+    if value == '24:00':
+        return MINUTES_PER_DAY
+    try:
+        parsed = parse_time(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f'Invalid time: {value}')
+    return to_minutes(parsed)
+
+
+def default_working_hours():
+    day_start, day_end = getattr(settings, 'PLANNER_WORKING_HOURS', ('09:00', '17:00'))
+    return parse_clock(day_start), parse_clock(day_end)
+
+
+def find_conflicts(intervals):
+    """Every overlapping pair of intervals, found with a sweep over start times
+
+    Intervals are visited by start time while a heap keeps the ones still running,
+    keyed by end time, so the cost is O(n log n) plus one step per reported pair.
+    Intervals that merely touch do not conflict.
+    """
+    conflicts = []
+    running = []
+    for interval in sorted(intervals):
+        while running and running[0][0] <= interval.start:
+            heapq.heappop(running)
+        for end, task_id in running:
+            conflicts.append(Conflict(task_id, interval.task_id, interval.start, min(end, interval.end)))
+        heapq.heappush(running, (interval.end, interval.task_id))
+    return conflicts
+
+
+def free_slots(intervals, day_start, day_end, min_minutes=1):
+    """Gaps of at least ``min_minutes`` between busy intervals within working hours"""
+    slots = []
+    cursor = day_start
+    for interval in sorted(intervals):
+        if interval.start >= day_end:
+            break
+        if interval.start - cursor >= min_minutes:
+            slots.append((cursor, interval.start))
+        cursor = max(cursor, interval.end)
+    if day_end - cursor >= min_minutes:
+        slots.append((cursor, day_end))
+    return slots
+
+
+def placement_order(pending):
+    """Most important first; longer tasks first within a rank so they still find room"""
+    return sorted(pending, key=lambda task: (-task.priority_rank, -task.minutes, task.task_id))
+
+
+def propose_placements(slots_by_day, pending):
+    """First-fit placement of duration-only tasks into free slots, by importance
+
+    Dated tasks are only placed on their own day; undated ones take the earliest
+    day with room. ``slots_by_day`` maps dates to ``free_slots`` output and is
+    consumed as placements are made. Returns (placements, unplaced task ids).
+    """
+    placements = []
+    unplaced = []
+    days = sorted(slots_by_day)
+    for task in placement_order(pending):
+        candidates = [task.scheduled_date] if task.scheduled_date else days
+        for day in candidates:
+            slots = slots_by_day.get(day, [])
+            index = next((i for i, (start, end) in enumerate(slots) if end - start >= task.minutes), None)
+            if index is None:
+                continue
+            start, end = slots[index]
+            placements.append((task.task_id, day, start, start + task.minutes))
+            if end - start == task.minutes:
+                del slots[index]
+            else:
+                slots[index] = (start + task.minutes, end)
+            break
+        else:
+            unplaced.append(task.task_id)
+    return placements, unplaced
+
+
+class Schedule:
+    """A user's timed intervals and pending duration tasks between two dates"""
+
+    def __init__(self, start, end, intervals_by_day, pending):
+        self.start = start
+        self.end = end
+        self.intervals_by_day = intervals_by_day
+        self.pending = pending
+
+    @classmethod
+    def load(cls, user, start, end, include_undated=True):
+        """Read the range with one query, plus two for recurring tasks and one for undated pending tasks"""
+        intervals_by_day = {
+            start + datetime.timedelta(days=offset): []
+            for offset in range((end - start).days + 1)
+        }
+        pending = []
+        # Intervals are sorted here, so skip the default ordering and its sort step
+        rows = itertools.chain(
+            Task.objects.filter(user=user, scheduled_date__range=(start, end), is_recurring=False)
+            .order_by()
+            .values_list(*SCHEDULE_FIELDS),
+            # Occurrence rows end with their original date
+            (row[:-1] for row in occurrence_rows(Task.objects.filter(user=user), start, end, SCHEDULE_FIELDS, timezone.now())),
+        )
+        for task_id, day, timed, start_time, end_time, hours, minutes, rank, completed in rows:
+            if timed:
+                if start_time is None or end_time is None:
+                    continue
+                begin = to_minutes(start_time)
+                finish = to_minutes(end_time)
+                intervals_by_day[day].append(Interval(begin, finish if finish > begin else MINUTES_PER_DAY, task_id))
+            elif not completed:
+                pending.append(PendingTask(task_id, (hours or 0) * 60 + (minutes or 0), rank, day))
+
+        if include_undated:
+            undated = Task.objects.filter(
+                user=user, scheduled_date__isnull=True, has_specific_time=False, completed=False,
+            ).order_by().values_list('id', 'duration_hours', 'duration_minutes', 'priority_rank')
+            for task_id, hours, minutes, rank in undated:
+                pending.append(PendingTask(task_id, (hours or 0) * 60 + (minutes or 0), rank, None))
+
+        return cls(start, end, intervals_by_day, pending)
+
+    def conflicts(self):
+        return {day: find_conflicts(intervals) for day, intervals in self.intervals_by_day.items()}
+
+    def free_slots(self, day_start, day_end, min_minutes=1):
+        return {
+            day: free_slots(intervals, day_start, day_end, min_minutes)
+            for day, intervals in self.intervals_by_day.items()
+        }
+
+    def proposals(self, day_start, day_end):
+        return propose_placements(self.free_slots(day_start, day_end), self.pending)
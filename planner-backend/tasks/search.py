@@ -0,0 +1,100 @@
+"""Full-text search over task titles, descriptions and comments
+
+On SQLite the ``day_planner_task_search`` FTS5 table (migration 0003) holds one
+row per task, keyed by the task id and kept current by triggers on the task and
+comment tables. Other databases fall back to ``icontains`` lookups.
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Lookup, Q, Value
+
+from .models import TaskSearchEntry
+
+SEARCH_TABLE = 'day_planner_task_search'
+
+# bm25() column weights: title, description, comments
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+POPULATE_SQL = f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, title, description, comments)
+    SELECT t.id, t.title, coalesce(t.description, ''),
+           coalesce((SELECT group_concat(c.comment, ' ')
+                     FROM day_planner_task_comments c WHERE c.task_id = t.id), '')
+    FROM day_planner_tasks t
+"""
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class Match(Lookup):
+    """``document__match``: FTS5 full-text MATCH"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+TaskSearchEntry._meta.get_field('document').register_lookup(Match)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """FTS5 query matching every word of ``text`` as a prefix, or None if it has no words"""
+    tokens = _TOKEN_RE.findall(text or '')
+    if not tokens:
+        return None
+    # Quoting keeps user input from being parsed as FTS5 operators
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def filter_matching(tasks, text):
+    """Restrict a Task queryset to rows matching ``text``"""
+    if not fts_available():
+        return _filter_icontains(tasks, text)
+
+    match_query = build_match_query(text)
+    if match_query is None:
+        return tasks.none()
+    # Joins the index on rowid, so SQLite scans the matches and looks tasks up by id
+    return tasks.filter(search_entry__document__match=match_query)
+
+
+def order_by_relevance(tasks, *tiebreakers):
+    """Order a queryset returned by ``filter_matching`` best match first"""
+    if not fts_available():
+        return tasks.order_by(*tiebreakers)
+
+    rank = Func(
+        F('search_entry__document'), *(Value(weight) for weight in BM25_WEIGHTS),
+        function='bm25', output_field=FloatField(),
+    )
+    return tasks.alias(search_rank=rank).order_by('search_rank', *tiebreakers)
+
+
+def _filter_icontains(tasks, text):
+    condition = Q()
+    for token in _TOKEN_RE.findall(text or ''):
+        condition &= (
+            Q(title__icontains=token)
+            | Q(description__icontains=token)
+            | Q(comments__comment__icontains=token)
+        )
+    return tasks.filter(condition).distinct()
+
+
+def rebuild_index():
+    """Repopulate the FTS table from the task and comment tables"""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(POPULATE_SQL)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,161 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import change_feed, list_cache, project_cache, recurrence
+from .models import Project, Task, TaskRecurrence, TaskStatCounter, TaskTombstone
+
+# Positions of project and scheduled_date in TaskStatCounter.KEY_ATTNAMES
+PROJECT_INDEX = TaskStatCounter.KEY_ATTNAMES.index('project_id')
+DATE_INDEX = TaskStatCounter.KEY_ATTNAMES.index('scheduled_date')
+
+
+@receiver(pre_save, sender=Task)
+def remember_stat_key(sender, instance, raw=False, **kwargs):
+    """Record the counter key the row had before this save"""
+    if raw or instance._state.adding:
+        instance._previous_stat_key = None
+    elif hasattr(instance, '_loaded_stat_key'):
+        instance._previous_stat_key = instance._loaded_stat_key
+    else:
+        row = Task.objects.filter(pk=instance.pk).values_list(*TaskStatCounter.KEY_ATTNAMES).first()
+        instance._previous_stat_key = tuple(row) if row else None
+
+
+@receiver(post_save, sender=Task)
+def update_stat_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_key = getattr(instance, '_previous_stat_key', None)
+    new_key = TaskStatCounter.key_for(instance)
+    TaskStatCounter.move(previous_key, new_key)
+    instance._loaded_stat_key = new_key
+    invalidate_task_lists(previous_key, new_key)
+
+
+@receiver(post_save, sender=Task)
+def update_recurrence_end(sender, instance, created, raw=False, **kwargs):
+    """Keep a counted rule's last date in step with its template's first date"""
+    if raw or created or not instance.is_recurring:
+        return
+    previous_key = getattr(instance, '_previous_stat_key', None)
+    if previous_key is not None and previous_key[DATE_INDEX] == instance.scheduled_date:
+        return
+    update_counted_rule_end(instance)
+
+
+def update_counted_rule_end(task):
+    """Recompute ``ends_on`` of the template's rule if it runs for a count; bulk writes call this by hand"""
+    rule = TaskRecurrence.objects.filter(task=task, count__isnull=False).first()
+    if rule is not None:
+        rule.ends_on = recurrence.last_occurrence(
+            task.scheduled_date, rule.frequency, rule.interval, rule.weekdays, count=rule.count,
+        )
+        rule.save(update_fields=['ends_on'])
+
+
+@receiver(post_delete, sender=Task)
+def decrement_stat_counters(sender, instance, **kwargs):
+    key = getattr(instance, '_loaded_stat_key', None) or TaskStatCounter.key_for(instance)
+    TaskStatCounter.apply_delta(key, -1)
+    invalidate_task_lists(key)
+
+
+@receiver(post_delete, sender=Task)
+def record_tombstone(sender, instance, **kwargs):
+    """Remember the deleted id for delta sync clients and calendar feed versions"""
+    TaskTombstone.objects.create(task_id=instance.pk, user_id=instance.user_id, team_id=instance.team_id)
+
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    change_feed.publish_on_commit('created' if created else 'updated', instance)
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance, **kwargs):
+    change_feed.publish_on_commit('deleted', instance)
+
+
+# Project fields that task payloads show
+PROJECT_DISPLAY_FIELDS = ('slug', 'name', 'color')
+
+
+def invalidate_project_cache():
+    project_cache.invalidate()
+    # Again after commit, in case another thread reloaded the pre-write rows meanwhile
+    transaction.on_commit(project_cache.invalidate)
+
+
+@receiver(pre_save, sender=Project)
+def remember_project_display(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._previous_display = None
+    else:
+        instance._previous_display = Project.objects.filter(pk=instance.pk).values_list(*PROJECT_DISPLAY_FIELDS).first()
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, raw=False, **kwargs):
+    invalidate_project_cache()
+    previous = getattr(instance, '_previous_display', None)
+    if previous is None or previous == tuple(getattr(instance, name) for name in PROJECT_DISPLAY_FIELDS):
+        return
+    # The project's tasks render differently now: move their ETags, cached lists and calendar events along
+    Task.objects.filter(project=instance).update(updated_at=timezone.now())
+    transaction.on_commit(lambda: list_cache.invalidate(projects=[instance.pk]))
+
+
+@receiver(pre_delete, sender=Project)
+def unassign_project_tasks(sender, instance, **kwargs):
+    """Unassign the project's tasks with counters and list versions kept in step
+
+    The SET_NULL cascade would update them without signals or ``updated_at``.
+    """
+    tasks = Task.objects.filter(project=instance)
+    changes = [
+        (key, key[:PROJECT_INDEX] + (None,) + key[PROJECT_INDEX + 1:])
+        for key in tasks.values_list(*TaskStatCounter.KEY_ATTNAMES)
+    ]
+    tasks.update(project=None, updated_at=timezone.now())
+    record_bulk_changes(changes)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    invalidate_project_cache()
+
+
+def invalidate_task_lists(*keys):
+    """Invalidate cached task lists for the projects and dates of the given keys"""
+    keys = [key for key in keys if key is not None]
+    projects = {key[PROJECT_INDEX] for key in keys}
+    dates = {key[DATE_INDEX] for key in keys}
+    # After commit, so a concurrent reader cannot cache pre-write rows under the new generation
+    transaction.on_commit(lambda: list_cache.invalidate(projects, dates))
+
+
+def record_bulk_changes(changes):
+    """Counter and cache bookkeeping for bulk writes, which send no model signals
+
+    ``changes`` holds (old_key, new_key) pairs; None stands for a missing row.
+    """
+    changes = list(changes)
+    TaskStatCounter.apply_deltas(changes)
+    invalidate_task_lists(*(key for pair in changes for key in pair))
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Run ``settings.SQLITE_PRAGMAS`` on each new SQLite connection"""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -1,7 +1,36 @@
-from django.test import TestCase
+from django.db import DatabaseError, IntegrityError, connection, connections, transaction
+from django.db.models import QuerySet
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Task
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.http import Http404, QueryDict
+from django.utils import timezone
+from . import api, async_api, change_feed, ical, instrumentation, list_cache, project_cache, recurrence, scheduling
+from .api import TASK_LIST_ORDERING, TASK_ROW_FIELDS, serialize_task, serialize_task_rows
+from .models import (
+    PROJECT_INFO, Project, Task, TaskComment, TaskOccurrenceException, TaskRecurrence, TaskStatCounter, TaskTombstone,
+    Team, TeamMembership,
+)
+from io import StringIO
+from unittest import mock
+import asyncio
+import csv
 import datetime
+import io
+import json
+import os
+import tempfile
+
+
+def get_project(slug):
+    """The project with ``slug``, created for the first user if needed"""
+    defaults = {**PROJECT_INFO.get(slug, {'name': slug.title()}), 'user': User.objects.order_by('id').first()}
+    return Project.objects.get_or_create(slug=slug, defaults=defaults)[0]
 
 class TaskModelTest(TestCase):
 
@@ -14,8 +43,1466 @@ class TaskModelTest(TestCase):
             title='Test Task',
             description='This is a test task.',
             scheduled_date=datetime.date.today(),
-            scheduled_time=datetime.time(12, 0),
+            scheduled_start_time=datetime.time(12, 0),
+            scheduled_end_time=datetime.time(13, 0),
             user=self.user
         )
         self.assertEqual(task.title, 'Test Task')
         self.assertEqual(task.user.username, 'testuser')
+        self.assertEqual(task.formatted_start_time, '12:00 PM')
+
+
+class TaskListPaginationTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        for index in range(7):
+            Task.objects.create(
+                title=f'Task {index}',
+                importance=['low', 'medium', 'high', 'critical'][index % 4],
+                user=self.user
+            )
+
+    def test_unpaginated_list_is_unchanged(self):
+        """Without limit/cursor the full list is returned."""
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['tasks']), 7)
+        self.assertNotIn('next_cursor', response.json())
+
+    def test_cursor_walks_every_task_once(self):
+        """Following next_cursor returns every task exactly once, in list order."""
+        expected = [task['id'] for task in self.client.get('/api/tasks/').json()['tasks']]
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            payload = self.client.get('/api/tasks/', params).json()
+            self.assertLessEqual(len(payload['tasks']), 3)
+            seen.extend(task['id'] for task in payload['tasks'])
+            cursor = payload['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/tasks/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_matches_list(self):
+        """Streaming mode emits the same JSON document as the plain list."""
+        response = self.client.get('/api/tasks/', {'stream': 'true', 'chunk_size': 2})
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, self.client.get('/api/tasks/').json())
+
+
+class TaskOverdueQuerySetTest(TestCase):
+    """TaskQuerySet.overdue() must agree with the Task.is_overdue property."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.now = timezone.make_aware(datetime.datetime(2025, 3, 10, 14, 30))
+        today = self.now.date()
+        yesterday = today - datetime.timedelta(days=1)
+        tomorrow = today + datetime.timedelta(days=1)
+        cases = [
+            ('yesterday timed', dict(scheduled_date=yesterday, scheduled_start_time=datetime.time(9, 0), scheduled_end_time=datetime.time(23, 59))),
+            ('yesterday duration', dict(scheduled_date=yesterday, has_specific_time=False, duration_minutes=30)),
+            ('today ended before now', dict(scheduled_date=today, scheduled_start_time=datetime.time(13, 0), scheduled_end_time=datetime.time(14, 29, 59))),
+            ('today ends exactly now', dict(scheduled_date=today, scheduled_start_time=datetime.time(13, 0), scheduled_end_time=datetime.time(14, 30))),
+            ('today ends after now', dict(scheduled_date=today, scheduled_start_time=datetime.time(13, 0), scheduled_end_time=datetime.time(14, 31))),
+            ('today no end time', dict(scheduled_date=today)),
+            ('today duration', dict(scheduled_date=today, has_specific_time=False, duration_hours=1)),
+            ('tomorrow', dict(scheduled_date=tomorrow, scheduled_start_time=datetime.time(0, 0), scheduled_end_time=datetime.time(0, 1))),
+            ('no date', dict()),
+            ('completed yesterday', dict(scheduled_date=yesterday, completed=True)),
+        ]
+        for title, fields in cases:
+            Task.objects.create(title=title, user=self.user, **fields)
+
+    def test_queryset_matches_property(self):
+        with mock.patch('tasks.models.timezone.now', return_value=self.now):
+            expected = {task.title for task in Task.objects.all() if task.is_overdue}
+        actual = set(Task.objects.overdue(self.now).values_list('title', flat=True))
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual, {'yesterday timed', 'yesterday duration', 'today ended before now'})
+
+    def test_annotation_feeds_property(self):
+        for task in Task.objects.with_overdue(self.now):
+            with mock.patch('tasks.models.timezone.now', return_value=self.now):
+                self.assertEqual(task.is_overdue, Task.objects.get(pk=task.pk).is_overdue, task.title)
+
+    def test_overdue_list_filter(self):
+        with mock.patch('tasks.api.timezone.now', return_value=self.now):
+            listed = self.client.get('/api/tasks/', {'overdue': 'true'}).json()['tasks']
+        self.assertEqual(len(listed), 3)
+        self.assertTrue(all(task['is_overdue'] for task in listed))
+
+
+class TaskStatsApiTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        today = timezone.now().date()
+        yesterday = today - datetime.timedelta(days=1)
+        Task.objects.create(title='Report', project=get_project('work'), importance='high', scheduled_date=yesterday, user=self.user)
+        Task.objects.create(title='Review', project=get_project('work'), importance='low', completed=True, user=self.user)
+        Task.objects.create(title='Run', project=get_project('health'), importance='critical', scheduled_date=today, user=self.user)
+        Task.objects.create(title='Misc', user=self.user)
+        Task.objects.create(title='Misc 2', user=self.user)
+
+    def test_stats_payload(self):
+        stats = self.client.get('/api/tasks/stats/').json()['stats']
+        self.assertEqual(stats['total'], 5)
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['pending'], 4)
+        self.assertEqual(stats['overdue'], 1)
+        self.assertEqual(stats['today'], 1)
+        self.assertEqual(stats['by_priority'], {'low': 0, 'medium': 2, 'high': 1, 'critical': 1})
+        self.assertEqual(stats['by_project']['work'], {
+            'total': 2, 'completed': 1, 'pending': 1,
+            'project_info': {'name': 'Work Tasks', 'color': '#3b82f6'},
+        })
+        self.assertEqual(stats['by_project']['unassigned']['total'], 2)
+        self.assertIsNone(stats['by_project']['unassigned']['project_info'])
+        self.assertEqual(stats['completion_rate'], 20.0)
+
+    def test_stats_leave_out_recurring_templates(self):
+        template = Task.objects.create(
+            title='Stretch', project=get_project('health'), user=self.user,
+            scheduled_date=timezone.now().date() - datetime.timedelta(days=10),
+        )
+        self.client.put(f'/api/tasks/{template.id}/recurrence/', json.dumps({'frequency': 'daily'}),
+                        content_type='application/json')
+        self.assertEqual(TaskStatCounter.stored_counts(), TaskStatCounter.live_counts())
+
+        stats = self.client.get('/api/tasks/stats/').json()['stats']
+        overdue = self.client.get('/api/tasks/', {'overdue': 'true'}).json()['tasks']
+        self.assertEqual(stats['overdue'], len(overdue))
+        self.assertEqual((stats['total'], stats['pending']), (5, 4))
+        self.assertEqual(stats['by_project']['health']['total'], 1)
+
+    def test_stats_query_count_is_constant(self):
+        with self.assertNumQueries(3):
+            self.client.get('/api/tasks/stats/')
+        for index in range(20):
+            Task.objects.create(title=f'Extra {index}', project=get_project(f'p{index}'), user=self.user)
+        with self.assertNumQueries(3):
+            self.client.get('/api/tasks/stats/')
+
+
+class TaskStatCounterTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.today = timezone.now().date()
+
+    def assertCountersMatchLive(self):
+        self.assertEqual(TaskStatCounter.stored_counts(), TaskStatCounter.live_counts())
+
+    def test_model_writes_keep_counters_in_sync(self):
+        task = Task.objects.create(title='Write', project=get_project('work'), scheduled_date=self.today, user=self.user)
+        Task.objects.create(title='Read', project=get_project('work'), scheduled_date=self.today, user=self.user)
+        self.assertCountersMatchLive()
+
+        task.importance = 'critical'
+        task.save()
+        self.assertCountersMatchLive()
+
+        task.mark_as_completed()
+        self.assertCountersMatchLive()
+        task.mark_as_pending()
+        self.assertCountersMatchLive()
+
+        Task.objects.get(pk=task.pk).delete()
+        self.assertCountersMatchLive()
+        Task.objects.all().delete()
+        self.assertEqual(TaskStatCounter.stored_counts(), {})
+
+    def test_api_writes_keep_counters_in_sync(self):
+        response = self.client.post('/api/tasks/', json.dumps({
+            'title': 'From API', 'project': 'home', 'has_specific_time': False,
+            'duration_hours': 1, 'duration_minutes': 0,
+        }), content_type='application/json')
+        task_id = response.json()['id']
+        self.assertCountersMatchLive()
+
+        self.client.put(f'/api/tasks/{task_id}/', json.dumps({
+            'completed': True, 'project': 'work', 'scheduled_date': str(self.today),
+        }), content_type='application/json')
+        self.assertCountersMatchLive()
+
+        self.client.delete(f'/api/tasks/{task_id}/')
+        self.assertCountersMatchLive()
+        self.assertEqual(TaskStatCounter.stored_counts(), {})
+
+    def test_rebuild_command_repairs_drift(self):
+        Task.objects.create(title='One', project=get_project('work'), user=self.user)
+        Task.objects.create(title='Two', project=get_project('home'), completed=True, user=self.user)
+        TaskStatCounter.objects.update(count=7)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+        call_command('rebuild_task_counters', stdout=StringIO())
+        self.assertCountersMatchLive()
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+    def test_counter_keys_with_nulls_are_unique(self):
+        key = (self.user.id, None, None, 'low', False, None, False)
+        TaskStatCounter.apply_delta(key, 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TaskStatCounter.objects.create(count=1, **dict(zip(TaskStatCounter.KEY_ATTNAMES, key)))
+
+        # Another writer inserts the row after this one's UPDATE matched nothing
+        real_update = QuerySet.update
+        calls = []
+        def racing_update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else real_update(queryset, **kwargs)
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            TaskStatCounter.apply_delta(key, 2)
+        self.assertEqual(TaskStatCounter.objects.get().count, 3)
+
+
+class FastTaskSerializerTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        today = timezone.now().date()
+        Task.objects.create(title='Morning', description='Early', scheduled_date=today,
+                            scheduled_start_time=datetime.time(0, 5), scheduled_end_time=datetime.time(12, 0),
+                            importance='critical', project=get_project('work'), user=self.user)
+        Task.objects.create(title='Evening', scheduled_date=today - datetime.timedelta(days=3),
+                            scheduled_start_time=datetime.time(18, 45, 30), scheduled_end_time=datetime.time(23, 59),
+                            importance='low', project=get_project('side-quest'), user=self.user)
+        Task.objects.create(title='Reading', has_specific_time=False, duration_hours=1, duration_minutes=90,
+                            project=get_project('learning'), completed=True, user=self.user)
+        Task.objects.create(title='Short', has_specific_time=False, duration_minutes=15, user=self.user)
+        Task.objects.create(title='Untimed', description='', user=self.user)
+
+    def test_fast_path_is_byte_identical(self):
+        now = timezone.now()
+        tasks = Task.objects.with_overdue(now).order_by('id')
+        expected = [serialize_task(task) for task in tasks]
+        actual = list(serialize_task_rows(tasks.values_list(*TASK_ROW_FIELDS)))
+        self.assertEqual(json.dumps(actual), json.dumps(expected))
+
+    def test_list_uses_fast_path_output(self):
+        listed = {task['id']: task for task in self.client.get('/api/tasks/').json()['tasks']}
+        for task in Task.objects.all():
+            self.assertEqual(listed[task.id], json.loads(json.dumps(serialize_task(task))))
+
+
+class TaskConditionalGetTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.task = Task.objects.create(title='Plan', project=get_project('work'), user=self.user)
+        Task.objects.create(title='Shop', project=get_project('home'), user=self.user)
+
+    def test_list_not_modified_costs_one_query(self):
+        response = self.client.get('/api/tasks/', {'project': 'work'})
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/', {'project': 'work'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_list_etag_depends_on_filters_and_writes(self):
+        work_etag = self.client.get('/api/tasks/', {'project': 'work'})['ETag']
+        home_etag = self.client.get('/api/tasks/', {'project': 'home'})['ETag']
+        self.assertNotEqual(work_etag, home_etag)
+
+        self.task.title = 'Plan sprint'
+        self.task.save()
+        response = self.client.get('/api/tasks/', {'project': 'work'}, HTTP_IF_NONE_MATCH=work_etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.task.delete()
+        response = self.client.get('/api/tasks/', {'project': 'work'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_not_modified(self):
+        url = f'/api/tasks/{self.task.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.put(url, json.dumps({'completed': True}), content_type='application/json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TaskListCacheTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.task = Task.objects.create(title='Plan', project=get_project('work'), user=self.user)
+        Task.objects.create(title='Shop', project=get_project('home'), user=self.user)
+        list_cache.get_cache().clear()
+        list_cache.reset_stats()
+
+    def test_repeated_query_is_served_from_cache(self):
+        first = self.client.get('/api/tasks/', {'project': 'work'})
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/tasks/', {'project': 'work'})
+        self.assertEqual(second.content, first.content)
+
+        stats = self.client.get('/api/tasks/cache-stats/').json()['cache']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_equivalent_filters_share_an_entry(self):
+        self.client.get('/api/tasks/', {'completed': 'yes', 'project': 'work'})
+        self.client.get('/api/tasks/', {'project': 'work', 'completed': 'TRUE'})
+        self.assertEqual(list_cache.stats()['hits'], 1)
+
+    def test_writes_bump_only_affected_generations(self):
+        work = QueryDict('project=work')
+        home = QueryDict('project=home')
+        keys = (list_cache.cache_key(work, 'v'), list_cache.cache_key(home, 'v'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/api/tasks/{self.task.id}/', json.dumps({'title': 'Plan more'}),
+                            content_type='application/json')
+
+        self.assertNotEqual(list_cache.cache_key(work, 'v'), keys[0])
+        self.assertEqual(list_cache.cache_key(home, 'v'), keys[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/api/tasks/{self.task.id}/', json.dumps({'project': 'home'}),
+                            content_type='application/json')
+        self.assertNotEqual(list_cache.cache_key(home, 'v'), keys[1])
+
+    def test_streaming_is_not_cached(self):
+        self.assertIsNone(list_cache.cache_key(QueryDict('stream=true'), 'v'))
+
+
+class TaskBatchApiTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.keep = Task.objects.create(title='Keep', project=get_project('work'), user=self.user)
+        self.drop = Task.objects.create(title='Drop', project=get_project('work'), user=self.user)
+
+    def post_batch(self, operations):
+        return self.client.post('/api/tasks/batch/', json.dumps({'operations': operations}),
+                                content_type='application/json')
+
+    def test_mixed_batch(self):
+        response = self.post_batch([
+            {'op': 'create', 'data': {'title': 'Timed', 'scheduled_date': '2025-05-01',
+                                      'scheduled_start_time': '09:00', 'scheduled_end_time': '10:00'}},
+            {'op': 'create', 'data': {'title': 'Duration', 'has_specific_time': False,
+                                      'duration_hours': 1, 'duration_minutes': 15, 'project': 'home'}},
+            {'op': 'update', 'id': self.keep.id, 'data': {'completed': True, 'importance': 'high'}},
+            {'op': 'delete', 'id': self.drop.id},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'created', 'updated', 'deleted'])
+        self.assertEqual(results[0]['task']['scheduled_start_time'], '09:00')
+        self.assertEqual(results[1]['task']['formatted_duration'], '1 hour 15 min')
+        self.assertEqual(Task.objects.get(pk=results[1]['id']).project.slug, 'home')
+
+        self.keep.refresh_from_db()
+        self.assertTrue(self.keep.completed)
+        self.assertGreater(self.keep.updated_at, self.keep.created_at)
+        self.assertFalse(Task.objects.filter(id=self.drop.id).exists())
+        self.assertEqual(Task.objects.count(), 3)
+        self.assertEqual(TaskStatCounter.stored_counts(), TaskStatCounter.live_counts())
+
+    def test_invalid_item_rejects_whole_batch(self):
+        response = self.post_batch([
+            {'op': 'create', 'data': {'title': 'Fine', 'project': 'home'}},
+            {'op': 'create', 'data': {'title': 'No duration', 'has_specific_time': False,
+                                      'duration_hours': 0, 'duration_minutes': 0}},
+            {'op': 'update', 'id': 999999, 'data': {'title': 'Ghost'}},
+            {'op': 'create', 'data': {'title': 'Bad importance', 'importance': 'whenever'}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        results = response.json()['results']
+        self.assertNotIn('error', results[0])
+        self.assertEqual(results[1]['error'], 'Duration must be greater than 0')
+        self.assertIn('not found', results[2]['error'])
+        self.assertIn('error', results[3])
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertFalse(Project.objects.filter(slug='home').exists())
+
+    def test_batch_query_count_does_not_grow_per_task(self):
+        operations = [{'op': 'create', 'data': {'title': f'Task {index}'}} for index in range(200)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_batch(operations)
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(queries), 20)
+
+
+class TaskPriorityRankTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        for importance in ['medium', 'critical', 'low', 'high']:
+            Task.objects.create(title=importance, importance=importance, user=self.user)
+
+    def test_rank_follows_importance(self):
+        task = Task.objects.get(title='low')
+        self.assertEqual(task.priority_rank, 1)
+        task.importance = 'critical'
+        task.save()
+        self.assertEqual(Task.objects.get(pk=task.pk).priority_rank, 4)
+
+    def test_list_is_sorted_by_urgency(self):
+        titles = [task['title'] for task in self.client.get('/api/tasks/').json()['tasks']]
+        self.assertEqual(titles, ['critical', 'high', 'medium', 'low'])
+
+    def test_list_queries_need_no_temp_sort(self):
+        filters = [
+            {},
+            {'completed': False},
+            {'user': self.user, 'completed': False},
+            {'scheduled_date': datetime.date(2025, 1, 1)},
+            {'project_id': 1},
+        ]
+        for lookup in filters:
+            queryset = Task.objects.filter(**lookup).order_by(*TASK_LIST_ORDERING)
+            plan = queryset.explain()
+            self.assertNotIn('TEMP B-TREE', plan, plan)
+
+
+class TeamProjectListingTest(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='password')
+        for index in range(3):
+            member = User.objects.create_user(username=f'member{index}', password='password')
+            team = Team.objects.create(name=f'Team {index}', created_by=self.owner)
+            TeamMembership.objects.create(user=self.owner, team=team, role='owner')
+            TeamMembership.objects.create(user=member, team=team, is_active=index != 0)
+            Task.objects.create(title=f'Member task {index}', project=get_project('work'), user=member)
+            Project.objects.create(name=f'Project {index}', slug=f'project-{index}', user=self.owner, team=team)
+        Task.objects.create(title='Owner task', project=get_project('project-1'), user=self.owner)
+        Task.objects.create(title='Owner done', project=get_project('project-1'), completed=True, user=self.owner)
+
+    def test_annotated_counts_match_properties(self):
+        for team in Team.objects.with_counts():
+            plain = Team.objects.get(pk=team.pk)
+            self.assertEqual(team.member_count, plain.member_count)
+            self.assertEqual(team.task_count, plain.task_count)
+        for project in Project.objects.with_counts():
+            plain = Project.objects.get(pk=project.pk)
+            self.assertEqual(project.task_count, plain.task_count)
+            self.assertEqual(project.completed_task_count, plain.completed_task_count)
+            self.assertEqual(project.pending_task_count, plain.pending_task_count)
+
+    def test_team_list_query_count_is_constant(self):
+        with self.assertNumQueries(2):
+            teams = self.client.get('/api/teams/').json()['teams']
+        self.assertEqual(len(teams), 3)
+        team0 = next(team for team in teams if team['name'] == 'Team 0')
+        self.assertEqual(team0['member_count'], 1)
+        self.assertEqual(team0['task_count'], 3)
+        self.assertEqual([member['username'] for member in team0['members']], ['owner'])
+
+    def test_project_list_and_detail(self):
+        with self.assertNumQueries(1):
+            projects = self.client.get('/api/projects/').json()['projects']
+        project1 = next(project for project in projects if project['slug'] == 'project-1')
+        self.assertEqual((project1['task_count'], project1['completed_task_count'], project1['pending_task_count']), (2, 1, 1))
+
+        with self.assertNumQueries(1):
+            detail = self.client.get(f"/api/projects/{project1['id']}/").json()
+        self.assertEqual(detail, project1)
+
+    def test_project_list_team_filter(self):
+        team = Team.objects.get(name='Team 1')
+        projects = self.client.get('/api/projects/', {'team': team.id}).json()['projects']
+        self.assertEqual([project['slug'] for project in projects], ['project-1'])
+        for bad in ('abc', '0', '-1'):
+            self.assertEqual(self.client.get('/api/projects/', {'team': bad}).status_code, 400)
+
+
+class TaskSearchTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.plan = Task.objects.create(title='Plan sprint review', description='Collect demos', project=get_project('work'), user=self.user)
+        self.groceries = Task.objects.create(title='Groceries', description='Plan meals for the week', project=get_project('home'), user=self.user)
+        self.gym = Task.objects.create(title='Gym', project=get_project('health'), user=self.user)
+        TaskComment.objects.create(task=self.gym, comment='Remember the planner notebook', user=self.user)
+
+    def search(self, **params):
+        return [task['title'] for task in self.client.get('/api/tasks/', params).json()['tasks']]
+
+    def test_prefix_match_ranked_by_field_weight(self):
+        self.assertEqual(self.search(q='plan'), ['Plan sprint review', 'Groceries', 'Gym'])
+
+    def test_combines_with_filters(self):
+        self.assertEqual(self.search(q='plan', project='home'), ['Groceries'])
+        self.assertEqual(self.search(q='plan sprint'), ['Plan sprint review'])
+
+    def test_index_follows_writes(self):
+        self.plan.title = 'Retrospective'
+        self.plan.description = ''
+        self.plan.save()
+        self.assertEqual(self.search(q='sprint'), [])
+        self.gym.comments.all().delete()
+        self.assertEqual(self.search(q='planner'), [])
+        self.groceries.delete()
+        self.assertEqual(self.search(q='meals'), [])
+
+    def test_search_pages_have_no_cursor(self):
+        payload = self.client.get('/api/tasks/', {'q': 'plan', 'limit': 2}).json()
+        self.assertEqual([task['title'] for task in payload['tasks']], ['Plan sprint review', 'Groceries'])
+        self.assertTrue(payload['has_more'])
+        # Ranks can shift between requests, so there is no cursor to follow; a longer page shows the rest
+        self.assertIsNone(payload['next_cursor'])
+        payload = self.client.get('/api/tasks/', {'q': 'plan', 'limit': 3}).json()
+        self.assertEqual(len(payload['tasks']), 3)
+        self.assertFalse(payload['has_more'])
+        cursor = self.client.get('/api/tasks/', {'limit': 1}).json()['next_cursor']
+        self.assertEqual(self.client.get('/api/tasks/', {'q': 'plan', 'cursor': cursor}).status_code, 400)
+
+    def test_operators_in_input_are_literal(self):
+        self.assertEqual(self.search(q='review OR "gym'), [])
+        self.assertEqual(self.search(q='***'), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM day_planner_task_search')
+        self.assertEqual(self.search(q='gym'), [])
+        call_command('rebuild_task_search', stdout=StringIO())
+        self.assertEqual(self.search(q='gym'), ['Gym'])
+
+
+class AgendaApiTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.monday = datetime.date(2025, 6, 2)
+        tuesday = self.monday + datetime.timedelta(days=1)
+        Task.objects.create(title='Standup', scheduled_date=self.monday, scheduled_start_time=datetime.time(9, 30),
+                            scheduled_end_time=datetime.time(9, 45), user=self.user)
+        Task.objects.create(title='Breakfast', scheduled_date=self.monday, scheduled_start_time=datetime.time(7, 0),
+                            scheduled_end_time=datetime.time(7, 30), user=self.user)
+        Task.objects.create(title='Reading', scheduled_date=self.monday, has_specific_time=False,
+                            duration_minutes=45, user=self.user)
+        Task.objects.create(title='Review', scheduled_date=tuesday, scheduled_start_time=datetime.time(14, 0),
+                            scheduled_end_time=datetime.time(15, 0), project=get_project('work'), user=self.user)
+        Task.objects.create(title='Next week', scheduled_date=self.monday + datetime.timedelta(days=7), user=self.user)
+
+    def test_week_grouped_by_day(self):
+        # The week's tasks, plus the recurring templates whose occurrences fall in it
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/agenda/', {'start': '2025-06-02', 'end': '2025-06-08'})
+        days = response.json()['days']
+        self.assertEqual([day['date'] for day in days][:2], ['2025-06-02', '2025-06-03'])
+        self.assertEqual(len(days), 7)
+        self.assertEqual([task['title'] for task in days[0]['timed']], ['Breakfast', 'Standup'])
+        self.assertEqual([task['title'] for task in days[0]['duration']], ['Reading'])
+        self.assertEqual([task['title'] for task in days[1]['timed']], ['Review'])
+        self.assertTrue(all(not day['timed'] and not day['duration'] for day in days[2:]))
+
+    def test_filters_and_validation(self):
+        days = self.client.get('/api/agenda/', {'start': '2025-06-02', 'end': '2025-06-03', 'project': 'work'}).json()['days']
+        self.assertEqual([task['title'] for day in days for task in day['timed']], ['Review'])
+        self.assertEqual(self.client.get('/api/agenda/', {'start': '2025-06-03', 'end': '2025-06-02'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/agenda/', {'start': '2025-06-02'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/agenda/', {'start': '2025-01-01', 'end': '2025-12-31'}).status_code, 400)
+
+
+class SchedulingTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.day = datetime.date(2025, 6, 2)
+
+    def timed(self, title, start, end, day=None):
+        return Task.objects.create(title=title, scheduled_date=day or self.day, scheduled_start_time=start,
+                                   scheduled_end_time=end, user=self.user)
+
+    def test_find_conflicts_reports_each_overlapping_pair(self):
+        Interval = scheduling.Interval
+        intervals = [Interval(540, 600, 1), Interval(570, 660, 2), Interval(590, 620, 3), Interval(660, 700, 4)]
+        conflicts = scheduling.find_conflicts(intervals)
+        self.assertEqual(
+            sorted((c.first_id, c.second_id, c.start, c.end) for c in conflicts),
+            [(1, 2, 570, 600), (1, 3, 590, 600), (2, 3, 590, 620)],
+        )
+
+    def test_free_slots_and_proposals(self):
+        busy = [scheduling.Interval(600, 660, 1), scheduling.Interval(630, 720, 2)]
+        slots = scheduling.free_slots(busy, 540, 1020, min_minutes=1)
+        self.assertEqual(slots, [(540, 600), (720, 1020)])
+        pending = [
+            scheduling.PendingTask(10, 90, 1, None),
+            scheduling.PendingTask(11, 45, 4, None),
+            scheduling.PendingTask(12, 600, 3, None),
+        ]
+        placements, unplaced = scheduling.propose_placements({self.day: slots}, pending)
+        self.assertEqual(placements, [(11, self.day, 540, 585), (10, self.day, 720, 810)])
+        self.assertEqual(unplaced, [12])
+
+    def test_schedule_endpoints(self):
+        first = self.timed('Call', datetime.time(9, 0), datetime.time(10, 0))
+        second = self.timed('Review', datetime.time(9, 30), datetime.time(11, 0))
+        Task.objects.create(title='Write', scheduled_date=self.day, has_specific_time=False,
+                            duration_hours=1, importance='high', user=self.user)
+        params = {'user': self.user.id, 'start': '2025-06-02', 'end': '2025-06-03'}
+
+        conflicts = self.client.get('/api/schedule/conflicts/', params).json()
+        self.assertEqual(conflicts['total'], 1)
+        self.assertEqual(conflicts['days'][0]['conflicts'][0],
+                         {'task_ids': [first.id, second.id], 'start': '09:30', 'end': '10:00', 'minutes': 30})
+
+        slots = self.client.get('/api/schedule/free-slots/', {**params, 'day_end': '12:00'}).json()
+        self.assertEqual(slots['days'][0]['slots'], [{'start': '11:00', 'end': '12:00', 'minutes': 60}])
+        self.assertEqual(len(slots['days'][1]['slots']), 1)
+
+        proposals = self.client.get('/api/schedule/proposals/', params).json()
+        self.assertEqual([(p['date'], p['start'], p['end']) for p in proposals['placements']],
+                         [('2025-06-02', '11:00', '12:00')])
+        self.assertEqual(proposals['unplaced'], [])
+
+        self.assertEqual(self.client.get('/api/schedule/conflicts/', {'start': '2025-06-02', 'end': '2025-06-03'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/schedule/free-slots/', {**params, 'day_start': '18:00'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/schedule/conflicts/', {**params, 'user': 9999}).status_code, 404)
+
+
+class AsyncTaskApiTest(TestCase):
+    """The async views answer exactly like the sync ones."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        today = timezone.now().date()
+        for index in range(5):
+            Task.objects.create(title=f'Task {index}', importance=['low', 'high'][index % 2],
+                                scheduled_date=today - datetime.timedelta(days=index), project=get_project('work'),
+                                user=self.user)
+        self.task = Task.objects.first()
+
+    async def both(self, view, path, *args, **params):
+        """(sync response, async response) for the same GET, without the list cache"""
+        await sync_to_async(list_cache.get_cache().clear)()
+        sync_response = await sync_to_async(getattr(api, view))(RequestFactory().get(path, params), *args)
+        await sync_to_async(list_cache.get_cache().clear)()
+        async_response = await getattr(async_api, view)(AsyncRequestFactory().get(path, params), *args)
+        return sync_response, async_response
+
+    async def test_list_detail_and_stats_match(self):
+        for params in ({}, {'limit': 2}, {'importance': 'high', 'overdue': 'true'}, {'limit': 'x'}, {'comment_count': 'true'}):
+            sync_response, async_response = await self.both('api_task_list', '/api/tasks/', **params)
+            self.assertEqual(async_response.status_code, sync_response.status_code)
+            self.assertEqual(async_response.content, sync_response.content)
+            self.assertEqual(async_response.get('ETag'), sync_response.get('ETag'))
+
+        sync_response, async_response = await self.both('api_task_detail', '/api/tasks/x/', self.task.id)
+        self.assertEqual(async_response.content, sync_response.content)
+        self.assertEqual(async_response['ETag'], sync_response['ETag'])
+
+        sync_response, async_response = await self.both('api_task_stats', '/api/tasks/stats/')
+        self.assertEqual(json.loads(async_response.content), json.loads(sync_response.content))
+
+    async def test_list_cache_on_database_backend(self):
+        database_cache = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'test_task_lists'}
+        with override_settings(CACHES={**settings.CACHES, settings.TASK_LIST_CACHE_ALIAS: database_cache}):
+            await sync_to_async(call_command)('createcachetable', stdout=StringIO())
+            list_cache.reset_stats()
+            responses = [await async_api.api_task_list(AsyncRequestFactory().get('/api/tasks/')) for _ in range(2)]
+            self.assertEqual([response.status_code for response in responses], [200, 200])
+            self.assertEqual(responses[0].content, responses[1].content)
+            self.assertEqual(list_cache.stats()['hits'], 1)
+
+    async def test_stream_matches_list(self):
+        sync_response, async_response = await self.both('api_task_list', '/api/tasks/', stream='true', chunk_size=2)
+        streamed = b''.join([chunk async for chunk in async_response.streaming_content])
+        full = await sync_to_async(api.api_task_list)(RequestFactory().get('/api/tasks/'))
+        self.assertEqual(json.loads(streamed), json.loads(full.content))
+
+    async def test_conditional_get_and_writes(self):
+        factory = AsyncRequestFactory()
+        first = await async_api.api_task_list(factory.get('/api/tasks/'))
+        again = await async_api.api_task_list(factory.get('/api/tasks/', headers={'If-None-Match': first['ETag']}))
+        self.assertEqual(again.status_code, 304)
+
+        created = await async_api.api_task_list(factory.post(
+            '/api/tasks/', {'title': 'Async', 'has_specific_time': False, 'duration_minutes': 30},
+            content_type='application/json',
+        ))
+        self.assertEqual(created.status_code, 201)
+        task_id = json.loads(created.content)['id']
+        invalid = await async_api.api_task_list(factory.post('/api/tasks/', {'title': ' '}, content_type='application/json'))
+        self.assertEqual(invalid.status_code, 400)
+
+        updated = await async_api.api_task_detail(
+            factory.put(f'/api/tasks/{task_id}/', {'completed': True}, content_type='application/json'), task_id
+        )
+        self.assertTrue(json.loads(updated.content)['completed'])
+        deleted = await async_api.api_task_detail(factory.delete(f'/api/tasks/{task_id}/'), task_id)
+        self.assertEqual(json.loads(deleted.content), {'deleted': True, 'title': 'Async'})
+        self.assertFalse(await Task.objects.filter(id=task_id).aexists())
+        self.assertEqual(await TaskStatCounter.objects.filter(count__gt=0).acount(), 5)
+
+
+class SqlitePragmaTest(TestCase):
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'cache_size': -4000})
+    def test_pragmas_run_on_new_connections(self):
+        new_connection = connections.create_connection('default')
+        try:
+            with new_connection.cursor() as cursor:
+                self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 1234)
+                self.assertEqual(cursor.execute('PRAGMA cache_size').fetchone()[0], -4000)
+        finally:
+            new_connection.close()
+
+
+class TaskSyncApiTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        self.tasks = [Task.objects.create(title=f'Task {index}', user=self.user) for index in range(4)]
+        Task.objects.create(title='Not mine', user=self.other)
+
+    def sync(self, since=None):
+        params = {'user': self.user.id}
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/tasks/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_sync_returns_everything(self):
+        payload = self.sync()
+        self.assertTrue(payload['reset'])
+        self.assertEqual(sorted(task['title'] for task in payload['tasks']), ['Task 0', 'Task 1', 'Task 2', 'Task 3'])
+        self.assertEqual(payload['deleted'], [])
+
+    def test_delta_has_changes_and_deletions_only(self):
+        watermark = self.sync()['watermark']
+        # Rows written before the watermark fall outside the overlap window
+        Task.objects.filter(id__in=[task.id for task in self.tasks]).update(
+            updated_at=timezone.now() - datetime.timedelta(minutes=5)
+        )
+        self.client.put(f'/api/tasks/{self.tasks[0].id}/', json.dumps({'completed': True}),
+                        content_type='application/json')
+        self.client.delete(f'/api/tasks/{self.tasks[1].id}/')
+        self.client.post(f'/tasks/{self.tasks[2].id}/delete/')
+        Task.objects.create(title='New', user=self.user)
+
+        with self.assertNumQueries(3):
+            payload = self.sync(watermark)
+        self.assertFalse(payload['reset'])
+        self.assertEqual([task['title'] for task in payload['tasks']], ['Task 0', 'New'])
+        self.assertEqual(payload['deleted'], [self.tasks[1].id, self.tasks[2].id])
+
+    def test_stale_or_invalid_watermarks(self):
+        stale = (timezone.now() - datetime.timedelta(days=60)).isoformat()
+        self.assertTrue(self.sync(stale)['reset'])
+        response = self.client.get('/api/tasks/sync/', {'user': self.user.id, 'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/tasks/sync/').status_code, 400)
+
+    def test_tombstones_survive_user_deletion_and_are_pruned(self):
+        self.other.delete()
+        self.assertEqual(TaskTombstone.objects.count(), 1)
+        TaskTombstone.objects.update(deleted_at=timezone.now() - datetime.timedelta(days=31))
+        call_command('prune_task_tombstones', stdout=StringIO())
+        self.assertFalse(TaskTombstone.objects.exists())
+
+
+class ChangeFeedTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.team = Team.objects.create(name='Team', created_by=self.user)
+
+    async def test_replay_is_scoped_and_resumes_after_event_id(self):
+        feed = change_feed.ChangeFeed(replay_size=3)
+        first = feed.publish('created', 1, None, {'id': 10})
+        feed.publish('created', 2, None, {'id': 11})
+        third = feed.publish('updated', 1, 5, {'id': 10})
+
+        subscriber, backlog, reset = feed.subscribe(('user', 1), first.id)
+        self.assertEqual((backlog, reset), ([third], False))
+        _, backlog, _ = feed.subscribe(('team', 5), first.id)
+        self.assertEqual(backlog, [third])
+
+        feed.publish('deleted', 1, None, {'id': 10})
+        await asyncio.sleep(0)
+        self.assertEqual(json.loads((await subscriber.queue.get()).message.split('data: ')[1]),
+                         {'type': 'deleted', 'task': {'id': 10}})
+
+        feed.publish('created', 2, None, {'id': 12})
+        self.assertTrue(feed.subscribe(('user', 1), first.id)[2])
+        self.assertTrue(feed.subscribe(('user', 1), 'elsewhere-1')[2])
+        feed.unsubscribe(subscriber)
+        self.assertEqual(feed.subscriber_count(), 3)
+
+    def test_task_writes_publish_on_commit(self):
+        with mock.patch.object(change_feed.feed, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                task = Task.objects.create(title='Feed', user=self.user, team=self.team)
+            task_id = task.id
+            self.assertEqual(publish.call_args.args[:3], ('created', self.user.id, self.team.id))
+            self.assertEqual(publish.call_args.args[3]['title'], 'Feed')
+
+            with self.captureOnCommitCallbacks(execute=True):
+                task.delete()
+            self.assertEqual(publish.call_args.args, ('deleted', self.user.id, self.team.id, {'id': task_id}))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/tasks/batch/', {'operations': [{'op': 'create', 'data': {'title': 'Bulk'}}]},
+                                            content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(publish.call_args.args[0], 'created')
+            self.assertEqual(publish.call_args.args[3]['title'], 'Bulk')
+
+    def test_event_stream_needs_asgi(self):
+        self.assertEqual(self.client.get('/api/tasks/events/', {'user': self.user.id}).status_code, 501)
+
+    async def test_event_stream(self):
+        factory = AsyncRequestFactory()
+        self.assertEqual((await async_api.api_task_events(factory.get('/api/tasks/events/'))).status_code, 400)
+        self.assertEqual((await async_api.api_task_events(
+            factory.get('/api/tasks/events/', {'team': self.team.id}))).status_code, 200)
+        with self.assertRaises(Http404):
+            await async_api.api_task_events(factory.get('/api/tasks/events/', {'user': self.user.id + 100}))
+
+        missed = change_feed.feed.publish('created', self.user.id, None, {'id': 1})
+        since = change_feed.feed.publish('created', self.user.id, None, {'id': 2}).id
+        response = await async_api.api_task_events(
+            factory.get('/api/tasks/events/', {'user': self.user.id}, headers={'Last-Event-ID': missed.id})
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        self.assertIn(f'id: {since}\n'.encode(), await anext(stream))
+
+        subscribers = change_feed.feed.subscriber_count()
+        change_feed.feed.publish('updated', self.user.id, None, {'id': 2})
+        self.assertIn(b'event: updated\n', await asyncio.wait_for(anext(stream), 1))
+
+        # A client disconnect cancels the response task while it waits for the next event
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(change_feed.feed.subscriber_count(), subscribers - 1)
+
+
+class DatasetBenchmarkTest(TestCase):
+
+    def test_generated_dataset_is_valid(self):
+        call_command('generate_dataset', users=6, teams=2, tasks_per_user=20, comments_per_task=1, stdout=StringIO())
+        tasks = Task.objects.filter(user__username__startswith='dataset_')
+        self.assertEqual(tasks.count(), 120)
+        self.assertTrue(tasks.filter(has_specific_time=True).exists())
+        self.assertTrue(tasks.filter(has_specific_time=False).exists())
+        for task in tasks:
+            task.full_clean()
+        self.assertTrue(TeamMembership.objects.filter(role='owner').exists())
+        self.assertTrue(Project.objects.filter(slug__startswith='dataset-').exists())
+        self.assertTrue(TaskComment.objects.exists())
+        self.assertEqual(TaskStatCounter.stored_counts(), TaskStatCounter.live_counts())
+
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', users=2, stdout=StringIO())
+        call_command('generate_dataset', users=2, teams=1, tasks_per_user=5, replace=True, stdout=StringIO())
+        self.assertEqual(Task.objects.count(), 10)
+
+    def test_endpoint_benchmark_writes_json(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_endpoints', stdout=StringIO())
+        call_command('generate_dataset', users=4, teams=2, tasks_per_user=20, stdout=StringIO())
+        task_count = Task.objects.count()
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('bench_endpoints', requests=2, warmup=0, output=output.name, stdout=StringIO())
+            report = json.load(output)
+        names = [result['name'] for result in report['endpoints']]
+        self.assertIn('task stats', names)
+        self.assertEqual(names[-3:], ['task create', 'task update', 'task delete'])
+        for result in report['endpoints']:
+            self.assertEqual(result['errors'], 0, result['name'])
+            self.assertGreater(result['queries'], 0, result['name'])
+        self.assertEqual(report['dataset']['tasks'], task_count)
+        self.assertEqual(Task.objects.count(), task_count)
+
+
+class RequestInstrumentationTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.tasks = [Task.objects.create(title=f'Task {index}', user=self.user) for index in range(6)]
+
+    def test_off_by_default(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/tasks/'))
+
+    @override_settings(REQUEST_INSTRUMENTATION=True, SLOW_QUERY_THRESHOLD_MS=0)
+    def test_server_timing_logs_and_slow_queries(self):
+        with self.assertLogs('tasks.instrumentation', 'INFO') as logs:
+            response = self.client.get('/api/tasks/', {'limit': 2})
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="2 queries", serialize;dur=[\d.]+, view;dur=[\d.]+$')
+
+        request_lines = [record for record in logs.records if record.name == 'tasks.instrumentation']
+        self.assertEqual(len(request_lines), 1)
+        metrics = request_lines[0].request_metrics
+        self.assertEqual((metrics['path'], metrics['status'], metrics['queries']), ('/api/tasks/', 200, 2))
+        slow = [record for record in logs.records if record.getMessage().startswith('Slow query')]
+        self.assertEqual(len(slow), 2)
+
+    def test_repeated_query_shapes_are_flagged(self):
+        self.assertEqual(
+            instrumentation.sql_shape("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            "SELECT * FROM t WHERE id IN (?, ...) AND name = ? LIMIT ?",
+        )
+        metrics = instrumentation.RequestMetrics()
+        with connection.execute_wrapper(metrics.record_query):
+            titles = [Task.objects.get(id=task.id).title for task in self.tasks]
+            Task.objects.filter(id__in=[task.id for task in self.tasks]).count()
+        self.assertEqual(len(titles), 6)
+        self.assertEqual(metrics.queries, 7)
+        [(shape, count)] = metrics.repeated_shapes()
+        self.assertEqual(count, 6)
+        self.assertIn('WHERE "day_planner_tasks"."id" = ?', shape)
+
+
+class RequestProfilingTest(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.user = User.objects.create_user(username='testuser', password='password')
+        Task.objects.create(title='Profiled', user=self.user)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_staff_requests_are_profiled_on_demand(self):
+        with override_settings(REQUEST_PROFILING_DIR=self.directory):
+            self.client.force_login(self.staff)
+            plain = self.client.get('/api/tasks/')
+            self.assertNotIn('X-Profile-Id', plain)
+            self.assertEqual(os.listdir(self.directory), [])
+
+            response = self.client.get('/api/tasks/', headers={'X-Profile': '1'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), plain.json())
+            profile_id = response['X-Profile-Id']
+            self.assertEqual(sorted(os.listdir(self.directory)), [f'{profile_id}.prof', f'{profile_id}.txt'])
+            with open(os.path.join(self.directory, f'{profile_id}.txt')) as summary:
+                text = summary.read()
+            self.assertTrue(text.startswith('GET /api/tasks/ -> 200'))
+            self.assertIn('api_task_list', text)
+
+            self.assertIn('X-Profile-Id', self.client.get('/api/tasks/stats/', {'profile': '1'}))
+
+    def test_ignored_for_other_users_and_when_off(self):
+        with override_settings(REQUEST_PROFILING_DIR=self.directory):
+            self.assertNotIn('X-Profile-Id', self.client.get('/api/tasks/', headers={'X-Profile': '1'}))
+            self.client.force_login(self.user)
+            self.assertNotIn('X-Profile-Id', self.client.get('/api/tasks/', headers={'X-Profile': '1'}))
+        # Middleware is loaded once per handler, so a new client sees the setting off
+        client = Client()
+        client.force_login(self.staff)
+        self.assertNotIn('X-Profile-Id', client.get('/api/tasks/', headers={'X-Profile': '1'}))
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class TaskTransferTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.target = User.objects.create_user(username='target', password='password')
+        today = timezone.now().date()
+        for index in range(60):
+            timed = index % 2 == 0
+            Task.objects.create(
+                title=f'Task {index}', description='Line one\nline "two", three' if index == 0 else None,
+                scheduled_date=today + datetime.timedelta(days=index), has_specific_time=timed,
+                scheduled_start_time=datetime.time(9, 0) if timed else None,
+                scheduled_end_time=datetime.time(10, 30) if timed else None,
+                duration_minutes=None if timed else 45, importance=['low', 'high'][index % 2],
+                project=get_project('work'), user=self.user,
+            )
+        Task.objects.create(title='Someone else', user=self.target)
+
+    def export(self, **params):
+        response = self.client.get('/api/tasks/export/', {'user': self.user.id, **params})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_export_formats(self):
+        lines = self.export().decode().splitlines()
+        self.assertEqual(len(lines), 60)
+        first = json.loads(lines[0])
+        self.assertEqual((first['title'], first['scheduled_start_time'], first['user']), ('Task 0', '09:00:00', self.user.id))
+
+        rows = list(csv.DictReader(io.StringIO(self.export(format='csv', importance='high').decode())))
+        self.assertEqual(len(rows), 30)
+        self.assertEqual((rows[0]['has_specific_time'], rows[0]['duration_minutes']), ('false', '45'))
+        self.assertEqual(self.client.get('/api/tasks/export/', {'format': 'xml'}).status_code, 400)
+
+    def test_csv_round_trip_into_another_user(self):
+        upload = SimpleUploadedFile('tasks.csv', self.export(format='csv'), content_type='text/csv')
+        response = self.client.post(f'/api/tasks/import/?user={self.target.id}&batch_size=25', {'file': upload})
+        self.assertEqual(response.json(), {'created': 60, 'error_count': 0, 'errors': [], 'offset': 60})
+
+        def portable(user):
+            return list(Task.objects.filter(user=user).exclude(title='Someone else').order_by('title').values_list(
+                'title', 'description', 'scheduled_date', 'scheduled_start_time', 'duration_minutes', 'importance',
+            ))
+        self.assertEqual(portable(self.target), portable(self.user))
+        self.assertEqual(TaskStatCounter.stored_counts(), TaskStatCounter.live_counts())
+
+        # Importing again moves existing counters rather than creating new ones
+        self.client.post(f'/api/tasks/import/?user={self.target.id}', self.export(), content_type='application/x-ndjson')
+        self.assertEqual(TaskStatCounter.stored_counts(), TaskStatCounter.live_counts())
+
+    def test_invalid_lines_are_reported_and_skipped(self):
+        body = '\n'.join([
+            json.dumps({'title': 'Good', 'has_specific_time': False, 'duration_minutes': 30}),
+            '{not json',
+            json.dumps({'title': '  '}),
+            json.dumps({'title': 'No duration', 'has_specific_time': False}),
+            '',
+            json.dumps({'title': 'Bad importance', 'importance': 'urgent'}),
+            json.dumps({'title': 'Bad flag', 'completed': 'maybe'}),
+            json.dumps({'title': 'Also good', 'scheduled_start_time': '09:00', 'scheduled_end_time': '10:00'}),
+        ])
+        response = self.client.post(f'/api/tasks/import/?user={self.target.id}', body, content_type='application/x-ndjson')
+        payload = response.json()
+        self.assertEqual((payload['created'], payload['offset']), (2, 8))
+        self.assertEqual([error['line'] for error in payload['errors']], [2, 3, 4, 6, 7])
+        self.assertIn('Duration must be greater than 0 minutes', payload['errors'][2]['error'])
+
+        resumed = self.client.post(f'/api/tasks/import/?user={self.target.id}&offset=7', body,
+                                   content_type='application/x-ndjson').json()
+        self.assertEqual((resumed['created'], resumed['errors']), (1, []))
+        self.assertEqual(self.client.post('/api/tasks/import/', body, content_type='application/x-ndjson').status_code, 400)
+
+    def test_rejected_lines_create_no_projects(self):
+        body = '\n'.join([
+            json.dumps({'title': 'No duration', 'has_specific_time': False, 'project': 'home'}),
+            json.dumps({'title': 'Good', 'has_specific_time': False, 'duration_minutes': 30, 'project': 'finance'}),
+        ])
+        payload = self.client.post(f'/api/tasks/import/?user={self.target.id}', body,
+                                   content_type='application/x-ndjson').json()
+        self.assertEqual((payload['created'], payload['error_count']), (1, 1))
+        self.assertFalse(Project.objects.filter(slug='home').exists())
+        self.assertEqual(Task.objects.get(title='Good').project.slug, 'finance')
+
+    def test_commands_resume_after_a_failed_batch(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tasks.ndjson')
+            call_command('export_tasks', user=self.user.id, output=path, stderr=StringIO())
+
+            real_bulk_create = Task.objects.bulk_create
+            calls = []
+
+            def failing_bulk_create(tasks, *args, **kwargs):
+                calls.append(len(tasks))
+                if len(calls) == 3:
+                    raise DatabaseError('disk I/O error')
+                return real_bulk_create(tasks, *args, **kwargs)
+
+            with mock.patch.object(Task.objects, 'bulk_create', failing_bulk_create):
+                with self.assertRaisesMessage(CommandError, 'resume with --offset 40'):
+                    call_command('import_tasks', path, user='target', batch_size=20, stdout=StringIO())
+            self.assertEqual(Task.objects.filter(user=self.target).count(), 41)
+
+            out = StringIO()
+            call_command('import_tasks', path, user='target', offset=40, stdout=out)
+            self.assertIn('Imported 20 tasks', out.getvalue())
+        self.assertEqual(Task.objects.filter(user=self.target).count(), 61)
+
+    async def test_asgi_export_streams_asynchronously(self):
+        request = AsyncRequestFactory().get('/api/tasks/export/', {'user': self.user.id, 'format': 'csv'})
+        response = await sync_to_async(api.api_task_export)(request)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        sync_content = await sync_to_async(self.export)(format='csv')
+        self.assertEqual(content, sync_content)
+
+
+class CalendarFeedTest(TestCase):
+
+    def setUp(self):
+        ical.get_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.team = Team.objects.create(name='Planning, Inc', created_by=self.user)
+        self.meeting = Task.objects.create(
+            title='Review; budget, Q4', description='Bring notes\nand numbers', scheduled_date=datetime.date(2026, 3, 2),
+            scheduled_start_time=datetime.time(9, 0), scheduled_end_time=datetime.time(10, 30),
+            importance='critical', project=get_project('work'), user=self.user, team=self.team,
+        )
+        self.chore = Task.objects.create(
+            title='Laundry', has_specific_time=False, duration_minutes=45,
+            scheduled_date=datetime.date(2026, 3, 3), completed=True, user=self.user,
+        )
+        Task.objects.create(title='Someday', has_specific_time=False, duration_minutes=45, user=self.user)
+
+    def feed(self, path, **headers):
+        return self.client.get(path, headers=headers)
+
+    def test_renders_timed_and_all_day_events(self):
+        response = self.feed(f'/api/calendar/users/{self.user.id}.ics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('DTSTART:20260302T090000\r\nDTEND:20260302T103000\r\n', body)
+        self.assertIn('SUMMARY:Review\\; budget\\, Q4\r\n', body)
+        self.assertIn('DESCRIPTION:Bring notes\\nand numbers\r\n', body)
+        self.assertIn('PRIORITY:1\r\n', body)
+        self.assertIn('DTSTART;VALUE=DATE:20260303\r\nDTEND;VALUE=DATE:20260304\r\n', body)
+        self.assertIn('SUMMARY:✓ Laundry\r\n', body)
+        self.assertNotIn('Someday', body)
+
+        team_body = self.feed(f'/api/calendar/teams/{self.team.id}.ics').content.decode()
+        self.assertIn('X-WR-CALNAME:Planning\\, Inc\r\n', team_body)
+        self.assertEqual(team_body.count('BEGIN:VEVENT'), 1)
+        self.assertEqual(self.feed('/api/calendar/teams/999.ics').status_code, 404)
+
+    def test_unchanged_feed_costs_one_query(self):
+        path = f'/api/calendar/users/{self.user.id}.ics'
+        response = self.feed(path)
+        with mock.patch.object(ical, 'render_event') as render:
+            with self.assertNumQueries(1):
+                unchanged = self.feed(path, if_none_match=response['ETag'])
+            with self.assertNumQueries(1):
+                since = self.feed(path, if_modified_since=response['Last-Modified'])
+        self.assertEqual((unchanged.status_code, since.status_code), (304, 304))
+        render.assert_not_called()
+
+    def test_only_changed_events_are_rendered(self):
+        path = f'/api/calendar/users/{self.user.id}.ics'
+        etag = self.feed(path)['ETag']
+        self.chore.title = 'Ironing'
+        self.chore.save()
+
+        with mock.patch.object(ical, 'render_event', wraps=ical.render_event) as render:
+            response = self.feed(path, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(render.call_count, 1)
+        self.assertIn('Ironing', response.content.decode())
+
+    def test_delete_changes_etag_and_last_modified(self):
+        path = f'/api/calendar/teams/{self.team.id}.ics'
+        response = self.feed(path)
+        self.meeting.delete()
+        # Last-Modified has whole seconds; move the delete past the first response's
+        TaskTombstone.objects.update(deleted_at=timezone.now() + datetime.timedelta(minutes=5))
+        self.assertEqual(TaskTombstone.objects.get().team_id, self.team.id)
+
+        self.assertEqual(self.feed(path, if_none_match=response['ETag']).status_code, 200)
+        changed = self.feed(path, if_modified_since=response['Last-Modified'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotIn('BEGIN:VEVENT', changed.content.decode())
+
+    def test_folds_long_lines_between_characters(self):
+        line = 'SUMMARY:' + 'é' * 80
+        folded = ical.fold(line)
+        parts = folded.split('\r\n')[:-1]
+        self.assertTrue(all(len(part.encode()) <= 75 for part in parts))
+        self.assertEqual(parts[0] + ''.join(part[1:] for part in parts[1:]), line)
+        self.assertEqual(ical.fold('SHORT:x'), 'SHORT:x\r\n')
+
+
+class RecurringTaskTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.monday = datetime.date(2025, 6, 2)
+        self.standup = Task.objects.create(
+            title='Standup', scheduled_date=self.monday, scheduled_start_time=datetime.time(9, 0),
+            scheduled_end_time=datetime.time(9, 15), user=self.user,
+        )
+
+    def repeat(self, task, **rule):
+        return self.client.put(f'/api/tasks/{task.id}/recurrence/', json.dumps(rule), content_type='application/json')
+
+    def occurrence(self, task, day, method='put', **fields):
+        return getattr(self.client, method)(
+            f'/api/tasks/{task.id}/occurrences/{day}/', json.dumps(fields), content_type='application/json',
+        )
+
+    def agenda_dates(self, start, end, title='Standup'):
+        days = self.client.get('/api/agenda/', {'start': start, 'end': end}).json()['days']
+        return [day['date'] for day in days for task in day['timed'] + day['duration'] if task['title'] == title]
+
+    def test_occurrence_dates(self):
+        Rule = recurrence.Rule
+        first = datetime.date(2025, 1, 31)
+        monthly = recurrence.occurrence_dates(first, Rule('monthly', 1, 0, None), first, datetime.date(2025, 6, 30))
+        self.assertEqual([day.isoformat() for day in monthly], ['2025-01-31', '2025-03-31', '2025-05-31'])
+
+        weekly = Rule('weekly', 2, recurrence.weekday_mask(['MO', 'TH']), None)
+        window = recurrence.occurrence_dates(self.monday, weekly, datetime.date(2030, 1, 1), datetime.date(2030, 1, 31))
+        dates = list(window)
+        self.assertTrue(dates and all(day.weekday() in (0, 3) for day in dates))
+        self.assertTrue(all((day - self.monday).days // 7 % 2 == 0 for day in dates))
+
+        daily = Rule('daily', 3, 0, datetime.date(2025, 6, 11))
+        self.assertEqual(len(list(recurrence.occurrence_dates(self.monday, daily, self.monday, datetime.date(2026, 1, 1)))), 4)
+        self.assertEqual(recurrence.last_occurrence(self.monday, 'weekly', 1, 0, count=3), datetime.date(2025, 6, 16))
+
+    def test_rule_validation(self):
+        response = self.repeat(self.standup, frequency='weekly', weekdays=['MO', 'WE'], count=4)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['weekdays'], ['MO', 'WE'])
+        self.assertEqual(TaskRecurrence.objects.get().ends_on, datetime.date(2025, 6, 11))
+        self.assertTrue(self.client.get(f'/api/tasks/{self.standup.id}/').json()['is_recurring'])
+
+        self.assertEqual(self.repeat(self.standup, frequency='hourly').status_code, 400)
+        self.assertEqual(self.repeat(self.standup, frequency='weekly', weekdays=['TU']).status_code, 400)
+        self.assertEqual(self.repeat(self.standup, frequency='daily', count=2, until='2025-07-01').status_code, 400)
+        undated = Task.objects.create(title='Someday', has_specific_time=False, duration_minutes=10, user=self.user)
+        self.assertEqual(self.repeat(undated, frequency='daily').status_code, 400)
+
+        # Moving a counted rule's first occurrence moves its last one
+        self.standup.refresh_from_db()
+        self.standup.scheduled_date = self.monday + datetime.timedelta(days=7)
+        self.standup.save()
+        self.assertEqual(TaskRecurrence.objects.get().ends_on, datetime.date(2025, 6, 18))
+
+    def test_moving_template_keeps_rule_in_step(self):
+        self.repeat(self.standup, frequency='daily', count=3)
+        response = self.client.post('/api/tasks/batch/', json.dumps([
+            {'op': 'update', 'id': self.standup.id, 'data': {'scheduled_date': '2026-02-01'}},
+        ]), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(TaskRecurrence.objects.get().ends_on, datetime.date(2026, 2, 3))
+        self.assertEqual(self.agenda_dates('2026-02-01', '2026-02-05'), ['2026-02-01', '2026-02-02', '2026-02-03'])
+
+        # A weekly rule's weekdays must include the new first date
+        self.repeat(self.standup, frequency='weekly', weekdays=['SU', 'MO'])
+        put = self.client.put(f'/api/tasks/{self.standup.id}/', json.dumps({'scheduled_date': '2026-02-03'}),
+                              content_type='application/json')
+        self.assertEqual(put.status_code, 400)
+        batch = self.client.post('/api/tasks/batch/', json.dumps([
+            {'op': 'update', 'id': self.standup.id, 'data': {'scheduled_date': '2026-02-03'}},
+        ]), content_type='application/json')
+        self.assertEqual(batch.status_code, 400)
+        self.assertIn('weekdays', batch.json()['results'][0]['error'])
+        self.standup.refresh_from_db()
+        self.assertEqual(self.standup.scheduled_date, datetime.date(2026, 2, 1))
+
+    def test_agenda_and_list_expand_occurrences(self):
+        self.repeat(self.standup, frequency='daily', interval=2)
+        self.assertEqual(self.agenda_dates('2026-01-01', '2026-01-06'), ['2026-01-02', '2026-01-04', '2026-01-06'])
+
+        tasks = self.client.get('/api/tasks/', {'date': '2026-01-04'}).json()['tasks']
+        self.assertEqual([(task['id'], task['occurrence_date']) for task in tasks], [(self.standup.id, '2026-01-04')])
+        self.assertEqual(tasks[0]['scheduled_date'], '2026-01-04')
+        self.assertEqual(self.client.get('/api/tasks/', {'date': '2026-01-03'}).json()['tasks'], [])
+        # Without a date filter the template is listed once
+        self.assertEqual(len(self.client.get('/api/tasks/').json()['tasks']), 1)
+        self.assertFalse(Task.objects.overdue().exists())
+
+    def test_occurrence_exceptions_are_sparse(self):
+        self.repeat(self.standup, frequency='daily')
+        etag = self.client.get('/api/tasks/', {'date': '2025-06-04'})['ETag']
+
+        self.assertEqual(self.occurrence(self.standup, '2025-06-03', cancelled=True).status_code, 200)
+        self.occurrence(self.standup, '2025-06-04', completed=True)
+        self.occurrence(self.standup, '2025-06-05', scheduled_date='2025-06-07', scheduled_start_time='10:00:00')
+        self.assertEqual(TaskOccurrenceException.objects.count(), 3)
+        self.assertEqual(Task.objects.count(), 1)
+
+        self.assertEqual(self.agenda_dates('2025-06-02', '2025-06-08'),
+                         ['2025-06-02', '2025-06-04', '2025-06-06', '2025-06-07', '2025-06-07', '2025-06-08'])
+        response = self.client.get('/api/tasks/', {'date': '2025-06-04'}, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['tasks'][0]['completed'])
+        moved = [task for task in self.client.get('/api/tasks/', {'date': '2025-06-07'}).json()['tasks']
+                 if task['occurrence_date'] == '2025-06-05']
+        self.assertEqual(moved[0]['scheduled_start_time'], '10:00')
+
+        # Restoring an occurrence, by DELETE or by clearing its changes, drops its row
+        self.occurrence(self.standup, '2025-06-03', method='delete')
+        self.occurrence(self.standup, '2025-06-04', completed=None)
+        self.assertEqual(TaskOccurrenceException.objects.count(), 1)
+        self.assertEqual(self.occurrence(self.standup, '2025-06-03', completed=True).status_code, 200)
+        self.assertEqual(self.occurrence(self.standup, '2025-06-01', completed=True).status_code, 404)
+        self.assertEqual(self.occurrence(self.standup, '2025-06-03', colour='red').status_code, 400)
+
+        self.client.delete(f'/api/tasks/{self.standup.id}/recurrence/')
+        self.assertFalse(TaskOccurrenceException.objects.exists())
+        self.assertEqual(self.agenda_dates('2025-06-02', '2025-06-08'), ['2025-06-02'])
+
+    def test_schedule_sees_occurrences(self):
+        self.repeat(self.standup, frequency='weekly')
+        review = Task.objects.create(
+            title='Review', scheduled_date=datetime.date(2025, 6, 16), scheduled_start_time=datetime.time(9, 10),
+            scheduled_end_time=datetime.time(10, 0), user=self.user,
+        )
+        conflicts = self.client.get(
+            '/api/schedule/conflicts/', {'user': self.user.id, 'start': '2025-06-10', 'end': '2025-06-20'},
+        ).json()
+        self.assertEqual(conflicts['total'], 1)
+        self.assertEqual(conflicts['days'][0]['conflicts'][0]['task_ids'], sorted([self.standup.id, review.id]))
+
+    def test_calendar_feed_has_rule_and_exceptions(self):
+        ical.get_cache().clear()
+        self.repeat(self.standup, frequency='weekly', weekdays=['MO', 'TH'], until='2025-07-31')
+        self.occurrence(self.standup, '2025-06-05', cancelled=True)
+        self.occurrence(self.standup, '2025-06-09', completed=True, scheduled_start_time='11:00:00')
+        body = self.client.get(f'/api/calendar/users/{self.user.id}.ics').content.decode()
+        self.assertIn('RRULE:FREQ=WEEKLY;BYDAY=MO,TH;UNTIL=20250731T235959\r\n', body)
+        self.assertIn('EXDATE:20250605T090000\r\n', body)
+        self.assertIn('RECURRENCE-ID:20250609T090000\r\nDTSTART:20250609T110000\r\n', body)
+        self.assertIn('SUMMARY:✓ Standup\r\n', body)
+
+
+class TaskCommentApiTest(TestCase):
+
+    def setUp(self):
+        list_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.task = Task.objects.create(title='Plan', user=self.user)
+        self.quiet = Task.objects.create(title='Quiet', user=self.user)
+        created_at = timezone.now()
+        comments = TaskComment.objects.bulk_create(
+            TaskComment(task=self.task, user=self.user, comment=f'Note {index}') for index in range(5)
+        )
+        # Two comments share a timestamp so the cursor has to break the tie by id
+        for offset, comment in zip([0, 1, 2, 2, 3], comments):
+            TaskComment.objects.filter(id=comment.id).update(created_at=created_at + datetime.timedelta(minutes=offset))
+
+    def test_pages_walk_every_comment_newest_first(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            # The task check and the page, with users joined in
+            with self.assertNumQueries(2):
+                payload = self.client.get(f'/api/tasks/{self.task.id}/comments/', params).json()
+            seen.extend(comment['comment'] for comment in payload['comments'])
+            cursor = payload['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, ['Note 4', 'Note 3', 'Note 2', 'Note 1', 'Note 0'])
+        self.assertEqual(payload['comments'][0]['user'], {'id': self.user.id, 'username': 'testuser'})
+        self.assertEqual(self.client.get(f'/api/tasks/{self.task.id}/comments/', {'cursor': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/tasks/999/comments/').status_code, 404)
+
+    def test_post_comment(self):
+        response = self.client.post(f'/api/tasks/{self.quiet.id}/comments/', json.dumps({'comment': ' Done '}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['comment'], 'Done')
+        self.assertEqual(self.quiet.comments.count(), 1)
+        empty = self.client.post(f'/api/tasks/{self.quiet.id}/comments/', json.dumps({'comment': ''}),
+                                 content_type='application/json')
+        self.assertEqual(empty.status_code, 400)
+
+    def test_list_comment_count(self):
+        self.assertNotIn('comment_count', self.client.get('/api/tasks/').json()['tasks'][0])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/', {'comment_count': 'true'})
+        # ETag aggregate, comment version and one list query, however many tasks
+        self.assertEqual(len(queries), 3)
+        counts = {task['id']: task['comment_count'] for task in response.json()['tasks']}
+        self.assertEqual(counts, {self.task.id: 5, self.quiet.id: 0})
+        page = self.client.get('/api/tasks/', {'comment_count': 'true', 'limit': 1}).json()['tasks']
+        self.assertIn('comment_count', page[0])
+
+        TaskComment.objects.create(task=self.quiet, user=self.user, comment='First')
+        changed = self.client.get('/api/tasks/', {'comment_count': 'true'}, headers={'if_none_match': response['ETag']})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual({task['id']: task['comment_count'] for task in changed.json()['tasks']}[self.quiet.id], 1)
+        # Lists without counts keep their ETag
+        plain = self.client.get('/api/tasks/')
+        TaskComment.objects.create(task=self.quiet, user=self.user, comment='Second')
+        self.assertEqual(self.client.get('/api/tasks/', headers={'if_none_match': plain['ETag']}).status_code, 304)
+
+
+class TaskProjectTest(TestCase):
+
+    def setUp(self):
+        list_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.side = Project.objects.create(name='Side Gig', slug='side-gig', color='#111111', user=self.user)
+
+    def create(self, project):
+        data = {'title': 'Plan', 'project': project, 'has_specific_time': False, 'duration_minutes': 30}
+        return self.client.post('/api/tasks/', json.dumps(data), content_type='application/json')
+
+    def test_api_speaks_slugs(self):
+        response = self.create('work')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['project'], 'work')
+        self.assertEqual(response.json()['project_info'], {'name': 'Work Tasks', 'color': '#3b82f6'})
+        # Built-in projects are created on first use
+        work = Project.objects.get(slug='work')
+        self.assertEqual(Task.objects.get(pk=response.json()['id']).project, work)
+
+        self.assertEqual(self.create('side-gig').json()['project_info'], {'name': 'Side Gig', 'color': '#111111'})
+        self.assertEqual(self.create('nope').status_code, 400)
+        listed = self.client.get('/api/tasks/', {'project': 'side-gig'}).json()['tasks']
+        self.assertEqual([task['project'] for task in listed], ['side-gig'])
+        self.assertEqual(self.client.get('/api/tasks/', {'project': 'nope'}).json()['tasks'], [])
+
+    def test_builtin_slug_with_taken_name(self):
+        # The API writes as the demo user
+        demo_user = User.objects.create_user(username='demo_user')
+        Project.objects.create(name='Home & Family', slug='family', user=demo_user)
+        response = self.create('home')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['project_info']['name'], 'Home & Family (home)')
+
+    def test_metadata_comes_from_memory(self):
+        task = Task.objects.create(title='Plan', project=self.side, user=self.user)
+        project_cache.info(task.project_id)
+        with self.assertNumQueries(0):
+            self.assertEqual(project_cache.slug(task.project_id), 'side-gig')
+            self.assertEqual(project_cache.id_for_slug('side-gig'), self.side.id)
+        # Projects created elsewhere (bulk_create sends no signals) reload the map once
+        later = Project.objects.bulk_create([Project(name='Later', slug='later', user=self.user)])[0]
+        with self.assertNumQueries(1):
+            self.assertEqual(project_cache.info(later.id), {'name': 'Later', 'color': '#3b82f6'})
+
+    def test_unknown_projects_do_not_reload(self):
+        project_cache.id_for_slug('nope')
+        project_cache.get(999999)
+        with self.assertNumQueries(0):
+            self.assertIsNone(project_cache.id_for_slug('nope'))
+            self.assertIsNone(project_cache.get(999999))
+        # Until a project write drops the map
+        nope = Project.objects.create(name='Nope', slug='nope', user=self.user)
+        self.assertEqual(project_cache.id_for_slug('nope'), nope.id)
+
+    def test_rename_changes_task_payloads(self):
+        task = Task.objects.create(title='Plan', project=self.side, user=self.user)
+        response = self.client.get('/api/tasks/', {'project': 'side-gig'})
+        self.side.name = 'Main Gig'
+        self.side.save()
+        changed = self.client.get('/api/tasks/', {'project': 'side-gig'}, headers={'if_none_match': response['ETag']})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['tasks'][0]['project_info']['name'], 'Main Gig')
+        self.assertGreater(Task.objects.get(pk=task.pk).updated_at, task.updated_at)
+
+    def test_delete_unassigns_tasks(self):
+        task = Task.objects.create(title='Plan', project=self.side, user=self.user)
+        self.side.delete()
+        task.refresh_from_db()
+        self.assertIsNone(task.project)
+        self.assertEqual(TaskStatCounter.stored_counts(), TaskStatCounter.live_counts())
+        self.assertEqual(self.client.get('/api/tasks/stats/').json()['stats']['by_project']['unassigned']['total'], 1)
+        self.assertEqual(self.client.get('/api/tasks/', {'project': 'side-gig'}).json()['tasks'], [])
+
+    def test_project_choices(self):
+        Project.objects.create(name='Archived', slug='archived', is_active=False, user=self.user)
+        projects = self.client.get('/api/projects/choices/').json()['projects']
+        self.assertEqual(projects, [
+            {'id': '', 'name': 'No Project', 'color': '#6b7280'},
+            {'id': 'side-gig', 'name': 'Side Gig', 'color': '#111111'},
+        ])
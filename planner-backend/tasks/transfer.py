@@ -0,0 +1,278 @@
+"""Streaming export and batched import of tasks as NDJSON or CSV
+
+Export reads rows from a ``values_list().iterator()`` cursor and encodes one line
+at a time, so memory stays flat however many tasks match. Import consumes an
+iterable of lines (an open file, an upload or the request body) one record at a
+time. Each record gets the same ``full_clean`` validation as a saved task,
+including ``Task.clean``'s time/duration rules. Valid tasks are inserted with
+``bulk_create``, one transaction per batch. Invalid records are reported by line
+number and skipped.
+
+Line numbers count data records from 1 (the CSV header is not a record). A failed
+import resumes by passing the reported offset: records up to and including it are
+skipped.
+"""
+import codecs
+import csv
+import itertools
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import change_feed, project_cache
+from .models import Task, TaskStatCounter
+from .signals import record_bulk_changes
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+EXPORT_FIELDS = (
+    'id', 'title', 'description', 'scheduled_date', 'has_specific_time', 'scheduled_start_time',
+    'scheduled_end_time', 'duration_hours', 'duration_minutes', 'completed', 'importance', 'project',
+    'user', 'team', 'created_at', 'updated_at',
+)
+EXPORT_CHUNK_SIZE = 2000
+# Exported as the project's slug, as the API shows it
+PROJECT_INDEX = EXPORT_FIELDS.index('project')
+
+# Columns read back on import; ids, owners and timestamps come from the target instead
+BOOLEAN_FIELDS = ('has_specific_time', 'completed')
+INTEGER_FIELDS = ('duration_hours', 'duration_minutes')
+TEXT_FIELDS = (
+    'title', 'description', 'scheduled_date', 'scheduled_start_time', 'scheduled_end_time', 'importance', 'project',
+)
+IMPORT_FIELDS = TEXT_FIELDS + BOOLEAN_FIELDS + INTEGER_FIELDS
+
+IMPORT_BATCH_SIZE = 500
+# Checked against the whole batch by the importer (or, for project, resolved from
+# its slug) rather than per row
+IMPORT_CLEAN_EXCLUDE = ['user', 'team', 'category', 'project']
+MAX_REPORTED_ERRORS = 1000
+
+
+def export_rows(tasks):
+    return tasks.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class _LineBuffer:
+    """Write target for csv.writer that hands back each encoded line"""
+
+    def write(self, value):
+        return value
+
+
+def _with_project_slug(row):
+    return (*row[:PROJECT_INDEX], project_cache.slug(row[PROJECT_INDEX]), *row[PROJECT_INDEX + 1:])
+
+
+def encode_rows(rows, format, header=True):
+    """Export lines for tuples in ``EXPORT_FIELDS`` order"""
+    rows = map(_with_project_slug, rows)
+    if format == 'csv':
+        writer = csv.writer(_LineBuffer())
+        if header:
+            yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow([_csv_value(value) for value in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(tasks, format):
+    """Lines of ``tasks`` in ``format``, read through a server-side cursor"""
+    return encode_rows(export_rows(tasks), format)
+
+
+async def aexport_lines(tasks, format):
+    """``export_lines`` for ASGI responses, fetching each chunk off the event loop"""
+    from .async_api import row_chunks
+
+    if format == 'csv':
+        yield next(encode_rows([], format))
+    # Encoding looks up project slugs, which may (re)load the project cache
+    encode = sync_to_async(lambda chunk: ''.join(encode_rows(chunk, format, header=False)))
+    async for chunk in row_chunks(tasks.order_by('id').values_list(*EXPORT_FIELDS), EXPORT_CHUNK_SIZE):
+        yield await encode(chunk)
+
+
+def _text_lines(lines):
+    """Decode byte lines (uploads, request bodies) as UTF-8, dropping a leading BOM"""
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    if isinstance(first, str):
+        yield first.removeprefix('\ufeff')
+        yield from lines
+    else:
+        yield from codecs.iterdecode(itertools.chain([first], lines), 'utf-8-sig')
+
+
+def ndjson_records(lines, offset=0):
+    """(line, record, error) per line; blank lines are numbered but skipped"""
+    for number, line in enumerate(_text_lines(lines), 1):
+        if number <= offset or not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield number, None, 'Expected a JSON object'
+            continue
+        yield number, record, None
+
+
+def csv_records(lines, offset=0):
+    """(line, record, error) per CSV row after the header"""
+    reader = csv.DictReader(_text_lines(lines))
+    records = enumerate(reader, 1)
+    number = 0
+    while True:
+        try:
+            number, record = next(records)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # The reader cannot recover its position in the file
+            raise ValueError(f'Unreadable CSV after line {number}: {e}')
+        if number <= offset:
+            continue
+        if None in record:
+            yield number, None, f'Expected {len(reader.fieldnames)} columns, got {len(reader.fieldnames) + len(record[None])}'
+            continue
+        yield number, record, None
+
+
+def parse_records(lines, format, offset=0):
+    return csv_records(lines, offset) if format == 'csv' else ndjson_records(lines, offset)
+
+
+def _coerce(name, value):
+    if name in BOOLEAN_FIELDS:
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in ('true', '1', 'yes'):
+            return True
+        if str(value).lower() in ('false', '0', 'no'):
+            return False
+        raise ValueError(f'{name} must be true or false, got {value!r}')
+    if name in INTEGER_FIELDS:
+        if isinstance(value, bool):
+            raise ValueError(f'{name} must be a whole number, got {value!r}')
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be a whole number, got {value!r}')
+    if not isinstance(value, str):
+        raise ValueError(f'{name} must be a string, got {value!r}')
+    return value.strip()
+
+
+def build_task(record, user, team=None):
+    """(unsaved validated Task, built-in project slug it still needs or None) for an import record
+
+    Writes nothing: ``TaskImporter.flush`` creates the project along with the row.
+    Raises ValueError or ValidationError.
+    """
+    fields = {}
+    for name in IMPORT_FIELDS:
+        value = record.get(name)
+        # Missing, null and empty CSV cells all leave the model default
+        if value is None or value == '':
+            continue
+        fields[name] = _coerce(name, value)
+    if not fields.get('title'):
+        raise ValueError('Title is required')
+    new_project = None
+    if 'project' in fields:
+        slug = fields.pop('project')
+        fields['project_id'] = project_cache.resolve(slug, user.id, create=False)
+        if fields['project_id'] is None:
+            new_project = slug
+    task = Task(user=user, team=team, **fields)
+    task.full_clean(exclude=IMPORT_CLEAN_EXCLUDE, validate_unique=False)
+    return task, new_project
+
+
+class TaskImporter:
+    """Insert tasks from parsed records in batches, keeping count for resuming
+
+    After ``run`` returns or raises, ``offset`` is the last line whose outcome is
+    final: every record up to it was inserted or reported as an error.
+    """
+
+    def __init__(self, user, team=None, batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+        self.user = user
+        self.team = team
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.offset = 0
+
+    def run(self, records, offset=0):
+        self.offset = offset
+        batch = []
+        last_line = offset
+        for number, record, error in records:
+            last_line = number
+            if error is None:
+                try:
+                    batch.append(build_task(record, self.user, self.team))
+                except ValidationError as e:
+                    error = '; '.join(e.messages)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                self.error(number, error)
+            if len(batch) >= self.batch_size:
+                self.flush(batch, last_line)
+                batch = []
+        self.flush(batch, last_line)
+        return self
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def flush(self, batch, last_line):
+        if batch:
+            with transaction.atomic():
+                for task, new_project in batch:
+                    if new_project:
+                        task.project_id = project_cache.resolve(new_project, task.user_id)
+                tasks = [task for task, _ in batch]
+                Task.objects.bulk_create(tasks)
+                # bulk_create sends no signals: counters, list cache and change feed by hand
+                record_bulk_changes((None, TaskStatCounter.key_for(task)) for task in tasks)
+                for task in tasks:
+                    change_feed.publish_on_commit('created', task)
+            self.created += len(batch)
+        self.offset = last_line
+        if self.on_batch and batch:
+            self.on_batch(self)
+
+    def summary(self):
+        return {
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'offset': self.offset,
+        }
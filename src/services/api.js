@@ -172,46 +172,13 @@ const api = {
   // Get task statistics
   getTaskStats: async () => {
     try {
-      const tasks = await api.getTasks();
-      
-      const stats = {
-        total: tasks.length,
-        completed: tasks.filter(t => t.completed).length,
-        pending: tasks.filter(t => !t.completed).length,
-        overdue: tasks.filter(t => t.is_overdue && !t.completed).length,
-        today: tasks.filter(t => {
-          const today = new Date().toISOString().split('T')[0];
-          return t.scheduled_date === today;
-        }).length,
-        by_priority: {
-          critical: tasks.filter(t => t.importance === 'critical' && !t.completed).length,
-          high: tasks.filter(t => t.importance === 'high' && !t.completed).length,
-          medium: tasks.filter(t => t.importance === 'medium' && !t.completed).length,
-          low: tasks.filter(t => t.importance === 'low' && !t.completed).length,
-        },
-        by_project: {}
-      };
+      const response = await fetch(`${API_URL}/tasks/stats/`);
 
-      // Calculate stats by project
-      tasks.forEach(task => {
-        const project = task.project || 'unassigned';
-        if (!stats.by_project[project]) {
-          stats.by_project[project] = {
-            total: 0,
-            completed: 0,
-            pending: 0
-          };
-        }
-        
-        stats.by_project[project].total++;
-        if (task.completed) {
-          stats.by_project[project].completed++;
-        } else {
-          stats.by_project[project].pending++;
-        }
-      });
-
-      return stats;
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      }
+      const data = await response.json();
+      return data.stats;
     } catch (error) {
       console.error('Error calculating task stats:', error);
       return {
@@ -226,6 +193,53 @@ const api = {
     }
   },
 
+  // Get a user's tasks changed or deleted since the watermark of the previous sync
+  syncTasks: async (userId, since = null) => {
+    try {
+      const params = new URLSearchParams({ user: userId });
+      if (since) {
+        params.set('since', since);
+      }
+      const response = await fetch(`${API_URL}/tasks/sync/?${params}`);
+
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      }
+      return await response.json();
+    } catch (error) {
+      console.error('Error syncing tasks:', error);
+      throw error;
+    }
+  },
+
+  // Listen for a user's task changes; the browser resumes from the last event id on reconnect.
+  // onReset means events were missed and the caller should syncTasks again. Returns a close function.
+  subscribeToTaskEvents: (userId, onChange, onReset) => {
+    const source = new EventSource(`${API_URL}/tasks/events/?user=${encodeURIComponent(userId)}`);
+    ['created', 'updated', 'deleted'].forEach((type) => {
+      source.addEventListener(type, (event) => onChange(JSON.parse(event.data)));
+    });
+    source.addEventListener('reset', () => onReset?.());
+    return () => source.close();
+  },
+
+  // Get tasks between two dates (YYYY-MM-DD), grouped per day
+  getAgenda: async (start, end, filters = {}) => {
+    try {
+      const params = new URLSearchParams({ ...filters, start, end });
+      const response = await fetch(`${API_URL}/agenda/?${params}`);
+
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      }
+      const data = await response.json();
+      return data.days;
+    } catch (error) {
+      console.error('Error fetching agenda:', error);
+      throw error;
+    }
+  },
+
   // Utility function to format API errors
   formatError: (error) => {
     if (error.message) {